@@ -1,14 +1,23 @@
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from typing import Any, Callable
+import asyncio
 import os
 from dotenv import load_dotenv
 
+try:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+except ImportError:
+    async_sessionmaker = create_async_engine = None
+
 load_dotenv()
 
 # Configuração do banco de dados
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./autou.db")
 ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
+# Sessão assíncrona nas rotas (asyncpg/aiosqlite); sem os drivers, a sessão síncrona roda em threads
+ASYNC_DATABASE = os.getenv("ASYNC_DATABASE", "True").lower() == "true"
 
 # Configurações específicas para cada tipo de banco
 if "sqlite" in DATABASE_URL:
@@ -37,6 +46,46 @@ else:
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+def async_database_url(url: str) -> str:
+    """URL equivalente com driver assíncrono (asyncpg para PostgreSQL, aiosqlite para SQLite)"""
+    if url.startswith("postgresql"):
+        return "postgresql+asyncpg://" + url.split("://", 1)[1]
+    if url.startswith("sqlite"):
+        return "sqlite+aiosqlite://" + url.split("://", 1)[1]
+    return url
+
+def _create_async_engine():
+    if not ASYNC_DATABASE or create_async_engine is None:
+        return None
+    url = async_database_url(engine.url.render_as_string(hide_password=False))
+    try:
+        if url.startswith("sqlite"):
+            return create_async_engine(url, echo=False)
+        return create_async_engine(url, echo=False, pool_pre_ping=True, pool_recycle=300)
+    except Exception as e:
+        print(f" Driver assíncrono indisponível ({e}); rotas usarão a sessão síncrona em threads")
+        return None
+
+async_engine = _create_async_engine()
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False) if async_engine is not None else None
+
+class ThreadedSession:
+    """
+    Substituto da AsyncSession sem driver assíncrono: o mesmo run_sync, executado em uma
+    thread do pool para não bloquear o event loop
+    """
+
+    def __init__(self, session: Session):
+        self.sync_session = session
+
+    async def run_sync(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        return await asyncio.to_thread(fn, self.sync_session, *args, **kwargs)
+
+    async def close(self):
+        # Direto no loop (só devolve a conexão ao pool): esperar uma thread livre aqui
+        # travaria quando todas estão ocupadas aguardando conexões
+        self.sync_session.close()
+
 def get_db():
     """Dependency para obter sessão do banco de dados"""
     db = SessionLocal()
@@ -45,6 +94,20 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    """
+    Dependency assíncrona para as rotas async.
+
+    Os serviços continuam recebendo uma Session: chame-os com `await db.run_sync(fn, ...)`,
+    que executa `fn(session, ...)` com I/O assíncrono (ou em uma thread, sem o driver).
+    Atributos expirados (ex.: após commit) não podem ser lidos fora do run_sync.
+    """
+    db = AsyncSessionLocal() if AsyncSessionLocal is not None else ThreadedSession(SessionLocal())
+    try:
+        yield db
+    finally:
+        await db.close()
+
 def create_tables():
     """Cria todas as tabelas no banco de dados"""
     Base.metadata.create_all(bind=engine)
@@ -0,0 +1,86 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from config.database import get_async_db
+from services.model_health import get_model_health_tracker
+from services.generation_scheduler import get_hedged_scheduler
+from services.generation_client import get_generation_client
+from services.rate_limiter import get_rate_limiter
+from services.request_coalescer import get_request_coalescer
+from services.response_cache_service import ResponseCacheService
+from services.prompt_budget import get_budget_stats
+from services.hybrid_prompt_service import get_prompt_cache
+from services.prompt_change_service import get_prompt_change_listener
+from services.cpu_executor import get_cpu_executor
+from services.historico_writer import get_historico_writer
+from services.record_count_service import RecordCountService, HISTORICO_COUNTS, PROMPT_COUNTS
+from data.ai_models import HUGGINGFACE_GENERATION_MODELS
+
+router = APIRouter()
+
+@router.get("/generation/models")
+async def get_generation_models_health():
+    """Placar de saúde dos modelos de geração (estado do circuito e motivo, sucesso, latência, 429)"""
+    tracker = get_model_health_tracker()
+    return {
+        "enabled": get_generation_client() is not None,
+        "preference_order": HUGGINGFACE_GENERATION_MODELS,
+        "effective_order": tracker.order(HUGGINGFACE_GENERATION_MODELS),
+        "models": tracker.scoreboard(HUGGINGFACE_GENERATION_MODELS),
+        "hedging": get_hedged_scheduler().get_stats(),
+        "rate_limit": get_rate_limiter().get_stats(),
+        "coalescing": get_request_coalescer().get_stats(),
+        "prompt_budget": get_budget_stats()
+    }
+
+@router.post("/generation/models/reset")
+async def reset_generation_models_health(model: str = None):
+    """Fecha os circuitos e zera o placar (de um modelo ou de todos)"""
+    if model and model not in HUGGINGFACE_GENERATION_MODELS:
+        raise HTTPException(status_code=404, detail="Modelo não encontrado")
+    get_model_health_tracker().reset(model)
+    return {"message": "Placar reiniciado com sucesso"}
+
+@router.get("/prompt-cache")
+async def get_prompt_cache_stats():
+    """Cache de prompts do processo (versão, acertos, cargas do banco) e propagação de alterações"""
+    cache = get_prompt_cache()
+    cache.check_version()
+    return dict(cache.get_stats(), changes=get_prompt_change_listener().get_stats())
+
+@router.get("/executor")
+async def get_executor_stats():
+    """Pool de CPU (classificação e extração de PDFs): fila, espera, duração e recusas"""
+    return get_cpu_executor().get_stats()
+
+@router.get("/historico-writer")
+async def get_historico_writer_stats():
+    """Gravação do histórico em segundo plano: eventos pendentes, gravados, lotes e descartes"""
+    return get_historico_writer().get_stats()
+
+@router.get("/counts")
+async def get_record_counts(db: AsyncSession = Depends(get_async_db)):
+    """Contadores de registros: histórico por ação e prompts ativos por categoria"""
+    def load(session):
+        service = RecordCountService(session)
+        return {entity: service.get_counts(entity) for entity in (HISTORICO_COUNTS, PROMPT_COUNTS)}
+    return await db.run_sync(load)
+
+@router.post("/counts/rebuild")
+async def rebuild_record_counts(db: AsyncSession = Depends(get_async_db)):
+    """Recalcula os contadores com COUNT(*) (após gravações feitas fora da API)"""
+    return await db.run_sync(lambda session: RecordCountService(session).rebuild())
+
+@router.get("/response-cache")
+async def get_response_cache_stats(db: AsyncSession = Depends(get_async_db)):
+    """Estatísticas do cache persistente de respostas sugeridas"""
+    return await db.run_sync(lambda session: ResponseCacheService(session).get_stats())
+
+@router.post("/response-cache/evict")
+async def evict_response_cache(db: AsyncSession = Depends(get_async_db)):
+    """Remove entradas expiradas e o excesso acima do limite de tamanho"""
+    return {"removed": await db.run_sync(lambda session: ResponseCacheService(session).evict())}
+
+@router.delete("/response-cache")
+async def clear_response_cache(db: AsyncSession = Depends(get_async_db)):
+    """Remove todas as respostas em cache"""
+    return {"removed": await db.run_sync(lambda session: ResponseCacheService(session).invalidate())}
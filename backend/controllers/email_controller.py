@@ -1,18 +1,45 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from config.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from config.database import get_async_db, SessionLocal
 from services.email_service import EmailService
 from services.classification_service import ClassificationService
-from services.nlp_service import NLPService
-from services.ai_service import AIService
 from services.file_service import FileService
+from services.classification_cache import get_classification_cache, CLASSIFICATION_CACHE_TTL
+from services.email_processing_service import EmailProcessingService
 from services.historico_service import HistoricoService
+from services.historico_writer import HISTORICO_LOG_VIEWS
+from services.unit_of_work import UnitOfWork
+from services.keyset_pagination import InvalidCursor, NEXT_CURSOR_HEADER, next_cursor
+from services.cpu_executor import ExecutorSaturated, TaskTimeout
+from services.ai_service import AIService
+from services.hybrid_prompt_service import get_prompt_version
+from services.generation_client import Deadline
+from services.generation_job_service import get_generation_job_service, ASYNC_GENERATION, FINISHED_STATES
 from schemas.email import EmailCreate, EmailResponse
-from schemas.classification import ClassificationCreate, EmailClassificationResponse
+from schemas.classification import (
+    ClassificationCreate, EmailClassificationResponse, BatchClassificationItem, BatchClassificationResponse,
+    ClassifyRequest, ClassifyResponse, GenerationJobResponse
+)
 from schemas.historico import HistoricoWithDetails
-from typing import Optional
+from pydantic import ValidationError
+from typing import Any, Awaitable, Callable, Optional
+import asyncio
+import hashlib
+import json
+import os
 import time
 
+BATCH_MAX_EMAILS = int(os.getenv("BATCH_MAX_EMAILS", 1000))
+GENERATION_SSE_TIMEOUT = float(os.getenv("GENERATION_SSE_TIMEOUT", 120))
+GENERATION_SSE_INTERVAL = float(os.getenv("GENERATION_SSE_INTERVAL", 0.25))
+# Upload sem o campo stream_response: transmitir a resposta sugerida em streaming por padrão
+STREAM_RESPONSE = os.getenv("STREAM_RESPONSE", "False").lower() == "true"
+# Lotes geram as respostas na fila de geração por padrão (uma chamada ao modelo por item na requisição
+# estouraria o tempo de resposta); async_generation=false gera dentro da requisição
+BATCH_ASYNC_GENERATION = os.getenv("BATCH_ASYNC_GENERATION", "True").lower() == "true"
+
 router = APIRouter()
 
 @router.post("/upload-text", response_model=EmailClassificationResponse)
@@ -21,26 +48,31 @@ async def upload_text_email(
     subject: Optional[str] = Form(None),
     sender: Optional[str] = Form(None),
     recipient: Optional[str] = Form(None),
-    db: Session = Depends(get_db)
+    async_generation: Optional[bool] = Form(None),
+    stream_response: Optional[bool] = Form(None),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Processar email a partir de entrada de texto direta"""
     try:
         if not content.strip():
             raise HTTPException(status_code=400, detail="Conteúdo do email é obrigatório")
         
-        # Criar registro do email
-        email_service = EmailService(db)
         email_data = EmailCreate(
             subject=subject,
             content=content,
             sender=sender,
             recipient=recipient
         )
-        email = email_service.create_email(email_data)
         
-        # Processar classificação
-        result = await process_email_classification(email, db)
+        # Processar classificação (o email é gravado junto com a classificação)
+        result = await process_email_classification(email_data, db, async_generation, stream_response)
         return result
+    except HTTPException:
+        raise
+    except ExecutorSaturated:
+        raise HTTPException(status_code=503, detail="Servidor ocupado, tente novamente em instantes")
+    except TaskTimeout:
+        raise HTTPException(status_code=504, detail="Tempo esgotado ao classificar o email")
     except Exception as e:
         print(f"Erro no upload-text: {e}")
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
@@ -51,7 +83,9 @@ async def upload_file_email(
     subject: Optional[str] = Form(None),
     sender: Optional[str] = Form(None),
     recipient: Optional[str] = Form(None),
-    db: Session = Depends(get_db)
+    async_generation: Optional[bool] = Form(None),
+    stream_response: Optional[bool] = Form(None),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Processar email a partir de arquivo enviado"""
     # Validar arquivo
@@ -62,13 +96,16 @@ async def upload_file_email(
     
     # Extrair texto do arquivo
     file_content = await file.read()
-    content = file_service.extract_text_from_file(file_content, file.filename)
+    try:
+        content = await file_service.aextract_text_from_file(file_content, file.filename)
+    except ExecutorSaturated:
+        raise HTTPException(status_code=503, detail="Servidor ocupado, tente novamente em instantes")
+    except TaskTimeout:
+        raise HTTPException(status_code=504, detail="Tempo esgotado ao extrair o texto do arquivo")
     
     if not content:
         raise HTTPException(status_code=400, detail="Não foi possível extrair texto do arquivo")
     
-    # Criar registro do email
-    email_service = EmailService(db)
     email_data = EmailCreate(
         subject=subject,
         content=content,
@@ -77,59 +114,31 @@ async def upload_file_email(
         file_name=file.filename,
         file_type=file.content_type
     )
-    email = email_service.create_email(email_data)
     
-    # Processar classificação
-    result = await process_email_classification(email, db)
+    # Processar classificação (o email é gravado junto com a classificação)
+    try:
+        result = await process_email_classification(email_data, db, async_generation, stream_response)
+    except ExecutorSaturated:
+        raise HTTPException(status_code=503, detail="Servidor ocupado, tente novamente em instantes")
+    except TaskTimeout:
+        raise HTTPException(status_code=504, detail="Tempo esgotado ao classificar o email")
     return result
 
-async def process_email_classification(email, db: Session) -> EmailClassificationResponse:
-    """Processar classificação de email usando serviços de IA e NLP"""
-    start_time = time.time()
-    
-    # Inicializar serviços
-    nlp_service = NLPService()
-    ai_service = AIService(db)  # Passar sessão do banco para usar prompts híbridos
-    classification_service = ClassificationService(db)
-    historico_service = HistoricoService(db)
-    
-    # Pré-processar texto com NLP
-    features = nlp_service.extract_features(email.content)
-    
-    # Obter classificação de IA
-    ai_result = ai_service.classify_email(email.content)
-    
-    # Gerar resposta sugerida
-    suggested_response = ai_service.generate_response(email.content, ai_result['category'])
-    
-    # Determinar subcategoria
-    subcategory = None
-    # Novo sistema: subcategory vem diretamente do resultado
-    if ai_result.get('subcategory'):
-        subcategory = ai_result['subcategory']
-    # Fallback para sistema antigo (compatibilidade)
-    elif ai_result['category'] == 'Produtivo' and ai_result.get('primary_topic'):
-        subcategory = ai_result['primary_topic']
-    elif ai_result['category'] == 'Improdutivo' and ai_result.get('primary_unproductive_category'):
-        subcategory = ai_result['primary_unproductive_category']
-    
-    # Criar registro de classificação
-    classification_data = ClassificationCreate(
-        email_id=email.id,
-        category=ai_result['category'],
-        subcategory=subcategory,
-        confidence_score=ai_result['confidence'],
-        suggested_response=suggested_response,
-        processing_time=time.time() - start_time
-    )
-    classification = classification_service.create_classification(classification_data)
-    
-    # Registrar no histórico
-    historico_service.log_email_created(
-        email_id=email.id,
-        classification_id=classification.id
-    )
-    
+def run_processing(fn: Callable[[EmailProcessingService], Any]) -> Awaitable[Any]:
+    """
+    Executar a análise (CPU e chamadas síncronas ao modelo) fora do event loop, em uma thread
+    com sessão síncrona própria
+    """
+    def call():
+        db = SessionLocal()
+        try:
+            return fn(EmailProcessingService(db))
+        finally:
+            db.close()
+    return asyncio.to_thread(call)
+
+def email_classification_response(email, classification, **extra) -> EmailClassificationResponse:
+    """Montar a resposta lendo os atributos dentro da sessão (ver get_async_db)"""
     return EmailClassificationResponse(
         email={
             "id": email.id,
@@ -143,49 +152,435 @@ async def process_email_classification(email, db: Session) -> EmailClassificatio
             "created_at": email.created_at,
             "updated_at": email.updated_at
         },
-        classification=classification
+        classification=classification,
+        **extra
+    )
+
+async def process_email_classification(email_data: EmailCreate, db: AsyncSession, async_generation: Optional[bool] = None,
+                                       stream_response: Optional[bool] = None) -> EmailClassificationResponse:
+    """
+    Processar classificação de email usando serviços de IA e NLP
+    
+    Email, classificação, histórico e fingerprint são gravados em uma única transação
+    (UnitOfWork), depois da análise: nenhuma transação fica aberta enquanto o modelo responde.
+    Com geração assíncrona, a classificação é devolvida sem esperar a resposta sugerida,
+    que chega depois via /generation-jobs/{generation_job_id}. Com streaming, o cliente
+    abre response_stream_url e recebe a resposta trecho a trecho.
+    """
+    start_time = time.time()
+    deadline = Deadline.after()
+    if stream_response is None:
+        stream_response = STREAM_RESPONSE
+    if async_generation is None:
+        async_generation = ASYNC_GENERATION
+    
+    # Cache exato > quase-duplicata > análise completa com geração de resposta
+    result = await run_processing(lambda processing_service: processing_service.process(
+        email_data.content, defer_generation=async_generation or stream_response, deadline=deadline
+    ))
+    
+    def persist(session: Session):
+        with UnitOfWork(session) as uow:
+            # Criar registros do email e da classificação (flush para obter os IDs)
+            email = uow.emails.create_email(email_data)
+            classification_data = ClassificationCreate(
+                email_id=email.id,
+                category=result.category,
+                subcategory=result.subcategory,
+                confidence_score=result.confidence,
+                suggested_response=result.suggested_response,
+                processing_time=time.time() - start_time
+            )
+            classification = uow.classifications.create_classification(classification_data)
+            
+            # Registrar no histórico
+            uow.historico.log_email_created(
+                email_id=email.id,
+                classification_id=classification.id
+            )
+            
+            # Registrar impressão digital para detecção de quase-duplicatas
+            uow.fingerprints.record(
+                email_id=email.id,
+                classification_id=classification.id,
+                fingerprint=result.fingerprint,
+                derived_from_email_id=result.derived_from_email_id,
+                score=result.similarity
+            )
+        return email_classification_response(
+            email,
+            classification,
+            derived_from_email_id=result.derived_from_email_id,
+            similarity=result.similarity
+        )
+    
+    response = await db.run_sync(persist)
+    
+    # Resposta sugerida gerada em segundo plano e gravada na classificação
+    classification_id = response.classification.id
+    if result.generation_deferred and stream_response:
+        response.response_stream_url = f"/api/emails/classifications/{classification_id}/response-stream"
+    elif result.generation_deferred:
+        response.generation_job_id = get_generation_job_service().submit(
+            [classification_id], email_data.content, result.category, result.analysis, result.cache_key
+        )
+    return response
+
+@router.post("/classify", response_model=ClassifyResponse)
+async def classify_email_dry_run(
+    payload: ClassifyRequest,
+    request: Request,
+    response: Response
+):
+    """
+    Classificar sem gravar email, classificação ou histórico (uso em gateways de email).
+    
+    A resposta sugerida só é gerada com generate_response=true. O ETag é calculado sobre o
+    conteúdo devolvido (categoria, subcategoria, confiança e resposta sugerida) e permite
+    revalidação com If-None-Match: a classificação se repete para o mesmo conteúdo e regras,
+    mas uma resposta gerada de novo (cache expirado) muda o ETag.
+    """
+    if not payload.content.strip():
+        raise HTTPException(status_code=400, detail="Conteúdo do email é obrigatório")
+    
+    deadline = Deadline.after()
+    try:
+        _, result, cached = await run_processing(
+            lambda processing_service: processing_service.classify(payload.content, payload.generate_response, deadline)
+        )
+    except ExecutorSaturated:
+        raise HTTPException(status_code=503, detail="Servidor ocupado, tente novamente em instantes")
+    except TaskTimeout:
+        raise HTTPException(status_code=504, detail="Tempo esgotado ao classificar o email")
+    
+    classification = result['classification']
+    body = {
+        'category': classification['category'],
+        'confidence': classification['confidence'],
+        'subcategory': result['subcategory'],
+        'method': classification.get('method'),
+        'suggested_response': result['suggested_response']
+    }
+    etag = f'"{hashlib.sha1(json.dumps(body, sort_keys=True, ensure_ascii=False).encode()).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": f"private, max-age={CLASSIFICATION_CACHE_TTL}"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    
+    return ClassifyResponse(
+        category=classification['category'],
+        confidence=classification['confidence'],
+        subcategory=result['subcategory'],
+        method=classification.get('method'),
+        suggested_response=result['suggested_response'],
+        cached=cached,
+        processing_time=result['processing_time']
+    )
+
+def parse_batch_body(body: bytes, content_type: str) -> list:
+    """Aceita lista JSON, objeto {"emails": [...]} ou NDJSON (um email por linha)"""
+    text = body.decode('utf-8')
+    if 'ndjson' in content_type or 'jsonlines' in content_type:
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    
+    payload = json.loads(text)
+    if isinstance(payload, dict):
+        payload = payload.get('emails')
+    if not isinstance(payload, list):
+        raise ValueError("Envie uma lista de emails ou um objeto com o campo 'emails'")
+    return payload
+
+@router.post("/classify-batch", response_model=BatchClassificationResponse)
+async def classify_email_batch(
+    request: Request,
+    generate_responses: bool = True,
+    async_generation: bool = BATCH_ASYNC_GENERATION,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Classificar vários emails em uma requisição (JSON ou NDJSON).
+    
+    As respostas sugeridas são geradas em segundo plano (generation_job_id por item) a menos
+    que async_generation=false.
+    
+    Classificação em lote e gravação de emails, classificações e histórico com inserções
+    em massa em uma única transação; erros de validação são reportados por item.
+    """
+    start_time = time.time()
+    try:
+        raw_items = parse_batch_body(await request.body(), request.headers.get('content-type', ''))
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Corpo inválido: {str(e)}")
+    
+    if len(raw_items) > BATCH_MAX_EMAILS:
+        raise HTTPException(status_code=413, detail=f"Máximo de {BATCH_MAX_EMAILS} emails por lote")
+    
+    # Validar itens individualmente para não rejeitar o lote inteiro
+    items = [BatchClassificationItem(index=index) for index in range(len(raw_items))]
+    valid_positions = []
+    emails_data = []
+    for index, raw_item in enumerate(raw_items):
+        try:
+            if not isinstance(raw_item, dict):
+                raise ValueError("Item deve ser um objeto JSON")
+            email_data = EmailCreate(**raw_item)
+            if not email_data.content.strip():
+                raise ValueError("Conteúdo do email é obrigatório")
+        except (ValidationError, ValueError) as e:
+            items[index].error = str(e)
+            continue
+        valid_positions.append(index)
+        emails_data.append(email_data)
+    parse_done = time.time()
+    
+    timings = {'parse': parse_done - start_time}
+    if emails_data:
+        deadline = Deadline.after()
+        
+        def process(processing_service: EmailProcessingService):
+            results = processing_service.process_batch(
+                [email_data.content for email_data in emails_data],
+                generate_response=generate_responses,
+                defer_generation=async_generation,
+                deadline=deadline
+            )
+            return results, processing_service.timings
+        
+        def persist(session: Session):
+            try:
+                persisted = EmailProcessingService(session).persist_batch(emails_data, results)
+            except Exception:
+                session.rollback()
+                raise
+            return [(email.id, classification.id) for email, classification in persisted]
+        
+        try:
+            results, processing_timings = await run_processing(process)
+            timings.update(processing_timings)
+            
+            persist_start = time.time()
+            persisted = await db.run_sync(persist)
+            timings['persist'] = time.time() - persist_start
+        except ExecutorSaturated:
+            raise HTTPException(status_code=503, detail="Servidor ocupado, tente novamente em instantes")
+        except TaskTimeout:
+            raise HTTPException(status_code=504, detail="Tempo esgotado ao classificar o lote")
+        except Exception as e:
+            print(f"Erro no classify-batch: {e}")
+            raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+        
+        # Um job de geração por conteúdo distinto (itens repetidos compartilham o resultado)
+        deferred = {}
+        for result, (_, classification_id) in zip(results, persisted):
+            if result.generation_deferred:
+                deferred.setdefault(id(result), (result, []))[1].append(classification_id)
+        job_ids = {
+            key: get_generation_job_service().submit(
+                classification_ids, result.analysis.content, result.category, result.analysis, result.cache_key
+            )
+            for key, (result, classification_ids) in deferred.items()
+        }
+        
+        for index, result, (email_id, classification_id) in zip(valid_positions, results, persisted):
+            items[index] = BatchClassificationItem(
+                index=index,
+                email_id=email_id,
+                classification_id=classification_id,
+                category=result.category,
+                subcategory=result.subcategory,
+                confidence_score=result.confidence,
+                suggested_response=result.suggested_response,
+                source=result.source,
+                derived_from_email_id=result.derived_from_email_id,
+                similarity=result.similarity,
+                generation_job_id=job_ids.get(id(result))
+            )
+    timings['total'] = time.time() - start_time
+    
+    return BatchClassificationResponse(
+        results=items,
+        total=len(items),
+        processed=len(emails_data),
+        failed=len(items) - len(emails_data),
+        timings=timings
+    )
+
+@router.get("/generation-jobs/stats")
+async def get_generation_job_stats():
+    """Contadores da fila de geração assíncrona"""
+    return get_generation_job_service().get_stats()
+
+@router.get("/generation-jobs/{job_id}", response_model=GenerationJobResponse)
+async def get_generation_job(job_id: str):
+    """Consultar (polling) o estado de um job de geração de resposta"""
+    job = get_generation_job_service().get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job de geração não encontrado")
+    return job
+
+@router.get("/generation-jobs/{job_id}/events")
+async def stream_generation_job(job_id: str):
+    """Acompanhar um job de geração via Server-Sent Events (evento final: completed ou failed)"""
+    job_service = get_generation_job_service()
+    if not job_service.get_job(job_id):
+        raise HTTPException(status_code=404, detail="Job de geração não encontrado")
+    
+    async def events():
+        last_status = None
+        deadline = time.monotonic() + GENERATION_SSE_TIMEOUT
+        while True:
+            job = job_service.get_job(job_id)
+            if job is None:
+                yield "event: error\ndata: {\"detail\": \"Job expirado\"}\n\n"
+                return
+            if job['status'] != last_status:
+                last_status = job['status']
+                yield f"event: {last_status}\ndata: {json.dumps(job, ensure_ascii=False)}\n\n"
+            if last_status in FINISHED_STATES:
+                return
+            if time.monotonic() > deadline:
+                yield "event: timeout\ndata: {}\n\n"
+                return
+            await asyncio.sleep(GENERATION_SSE_INTERVAL)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def save_streamed_response(classification_id: int, content: str, category: str, confidence: float,
+                           subcategory: Optional[str], suggested_response: str):
+    """Gravar a resposta transmitida na classificação (sessão própria: a da requisição já foi fechada)"""
+    db = SessionLocal()
+    try:
+        ClassificationService(db).update_suggested_response(classification_id, suggested_response)
+    except Exception as e:
+        print(f"Erro ao gravar resposta transmitida (classificação {classification_id}): {e}")
+        db.rollback()
+        return
+    finally:
+        db.close()
+    
+    get_classification_cache().set(get_classification_cache().make_key(content, get_prompt_version()), {
+        'classification': {'category': category, 'confidence': confidence},
+        'subcategory': subcategory,
+        'suggested_response': suggested_response
+    })
+
+@router.get("/classifications/{classification_id}/response-stream")
+async def stream_suggested_response(
+    classification_id: int,
+    regenerate: bool = False,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Gerar a resposta sugerida em streaming via Server-Sent Events.
+    
+    Eventos: token (trecho de texto) e done (texto completo, já gravado na classificação).
+    Uma resposta já existente é devolvida direto em done, a menos que regenerate=true.
+    """
+    def prepare(session: Session):
+        classification = ClassificationService(session).get_classification(classification_id)
+        if not classification:
+            raise HTTPException(status_code=404, detail="Classificação não encontrada")
+        email = EmailService(session).get_email(classification.email_id)
+        if not email:
+            raise HTTPException(status_code=404, detail="Email não encontrado")
+        
+        content = email.content
+        category, confidence = classification.category, classification.confidence_score
+        subcategory = classification.subcategory
+        existing_response = classification.suggested_response
+        # Prompt resolvido agora, enquanto a sessão da requisição está aberta
+        chunks = None
+        if regenerate or not existing_response:
+            chunks = AIService(session).stream_response(
+                content, category, subcategory, Deadline.after(), use_cache=not regenerate
+            )
+        return content, category, confidence, subcategory, existing_response, chunks
+    
+    content, category, confidence, subcategory, existing_response, chunks = await db.run_sync(prepare)
+    
+    async def events():
+        if chunks is None:
+            yield sse_event("done", {'classification_id': classification_id, 'suggested_response': existing_response})
+            return
+        
+        parts = []
+        try:
+            async for chunk in chunks:
+                parts.append(chunk)
+                yield sse_event("token", {'text': chunk})
+        except Exception as e:
+            print(f"Erro no streaming da resposta (classificação {classification_id}): {e}")
+            yield sse_event("error", {'detail': str(e)})
+            return
+        
+        suggested_response = "".join(parts).strip()
+        await asyncio.to_thread(
+            save_streamed_response, classification_id, content, category, confidence, subcategory, suggested_response
+        )
+        yield sse_event("done", {'classification_id': classification_id, 'suggested_response': suggested_response})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/cache/stats")
+async def get_classification_cache_stats():
+    """Estatísticas do cache de classificação (acertos, falhas, tamanho)"""
+    return get_classification_cache().get_stats()
+
 @router.get("/emails", response_model=list[EmailResponse])
 async def get_emails(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Obter todos os emails processados"""
-    email_service = EmailService(db)
-    emails = email_service.get_emails(skip=skip, limit=limit)
+    """Obter os emails processados, mais recentes primeiro (offset ou cursor do cabeçalho X-Next-Cursor)"""
+    def load(session: Session):
+        try:
+            return EmailService(session).get_emails(skip=skip, limit=limit, cursor=cursor)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    emails = await db.run_sync(load)
+    cursor_after = next_cursor(emails, limit)
+    if cursor_after:
+        response.headers[NEXT_CURSOR_HEADER] = cursor_after
     return emails
 
 @router.get("/emails/{email_id}", response_model=EmailClassificationResponse)
 async def get_email_with_classification(
     email_id: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Obter email com sua classificação"""
-    email_service = EmailService(db)
-    classification_service = ClassificationService(db)
-    
-    email = email_service.get_email(email_id)
-    if not email:
-        raise HTTPException(status_code=404, detail="Email não encontrado")
-    
-    classification = classification_service.get_classification_by_email(email_id)
-    if not classification:
-        raise HTTPException(status_code=404, detail="Classificação não encontrada")
+    """Obter email com sua classificação (registra a visualização no histórico)"""
+    def load(session: Session):
+        email = EmailService(session).get_email(email_id)
+        if not email:
+            raise HTTPException(status_code=404, detail="Email não encontrado")
+        
+        classification = ClassificationService(session).get_classification_by_email(email_id)
+        if not classification:
+            raise HTTPException(status_code=404, detail="Classificação não encontrada")
+        
+        if HISTORICO_LOG_VIEWS:
+            HistoricoService(session).log_email_viewed(
+                email_id=email.id,
+                classification_id=classification.id,
+                user_agent=request.headers.get("user-agent"),
+                ip_address=request.client.host if request.client else None
+            )
+        return email_classification_response(email, classification)
     
-    return EmailClassificationResponse(
-        email={
-            "id": email.id,
-            "subject": email.subject,
-            "content": email.content,
-            "sender": email.sender,
-            "recipient": email.recipient,
-            "file_name": email.file_name,
-            "file_type": email.file_type,
-            "is_deleted": email.is_deleted,
-            "created_at": email.created_at,
-            "updated_at": email.updated_at
-        },
-        classification=classification
-    )
+    return await db.run_sync(load)
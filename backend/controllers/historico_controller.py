@@ -1,24 +1,49 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from config.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from config.database import get_async_db
 from services.historico_service import HistoricoService
+from services.record_count_service import RecordCountService
+from services.keyset_pagination import InvalidCursor, NEXT_CURSOR_HEADER, next_cursor
 from schemas.historico import HistoricoWithDetails
-from typing import List
+from typing import List, Literal, Optional
 
 router = APIRouter()
 
 @router.get("/historico", response_model=List[HistoricoWithDetails])
 async def get_historico(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Busca histórico de emails classificados"""
-    historico_service = HistoricoService(db)
-    return historico_service.get_historico_with_details(limit=limit, skip=skip)
+    """
+    Busca histórico de emails classificados.
+    
+    Com `cursor` (valor do cabeçalho X-Next-Cursor da página anterior) a paginação é por
+    posição, com custo constante em qualquer profundidade; `skip` continua aceito.
+    """
+    def load(session):
+        try:
+            return HistoricoService(session).get_historico_with_details(limit=limit, skip=skip, cursor=cursor)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    items = await db.run_sync(load)
+    cursor_after = next_cursor(items, limit)
+    if cursor_after:
+        response.headers[NEXT_CURSOR_HEADER] = cursor_after
+    return items
 
 @router.get("/historico/count")
-async def get_historico_count(db: Session = Depends(get_db)):
-    """Conta total de registros no histórico"""
-    historico_service = HistoricoService(db)
-    return {"count": historico_service.get_historico_count()}
+async def get_historico_count(
+    mode: Optional[Literal["summary", "exact", "approximate"]] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Conta emails classificados no histórico.
+    
+    Por padrão lê a tabela de contadores (as_of: última atualização); mode=exact faz o COUNT(*)
+    e mode=approximate usa as estatísticas do PostgreSQL se tiverem no máximo max_age_seconds.
+    """
+    return await db.run_sync(lambda session: RecordCountService(session).historico_count(mode=mode))
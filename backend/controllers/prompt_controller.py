@@ -1,63 +1,96 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from config.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from config.database import get_async_db
 from services.prompt_service import PromptService
-from services.hybrid_prompt_service import HybridPromptService
+from services.prompt_change_service import record_prompt_changes
+from services.response_cache_service import ResponseCacheService
+from services.record_count_service import RecordCountService
+from services.keyset_pagination import InvalidCursor, NEXT_CURSOR_HEADER, next_cursor
 from schemas.prompt import PromptCreate, PromptUpdate, PromptResponse
 from models.prompt import PromptType, PromptCategory, PromptSubcategory
-from typing import List, Optional
+from typing import List, Literal, Optional, Set, Tuple
 
 router = APIRouter()
 
+def active_prompt_contents(prompt_service: PromptService, pairs: Set[Tuple[PromptType, PromptCategory]]) -> Set[str]:
+    """Conteúdo do prompt em uso (ativo mais recente) para cada par tipo/categoria"""
+    contents = set()
+    for prompt_type, category in pairs:
+        prompt = prompt_service.get_active_prompt_by_type_and_category(prompt_type, category)
+        if prompt:
+            contents.add(prompt.content)
+    return contents
+
+def refresh_prompt_caches(db: Session, prompt_service: PromptService,
+                          pairs: Set[Tuple[PromptType, PromptCategory]], previous: Set[str]):
+    """Propaga a alteração aos caches de prompts dos workers e invalida as respostas de prompts fora de uso"""
+    record_prompt_changes(db, pairs)
+    response_cache = ResponseCacheService(db)
+    for content in previous - active_prompt_contents(prompt_service, pairs):
+        response_cache.invalidate(content)
+
 @router.post("/", response_model=PromptResponse)
 async def create_prompt(
     prompt_data: PromptCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Cria um novo prompt"""
-    prompt_service = PromptService(db)
-    try:
+    def create(session: Session):
+        prompt_service = PromptService(session)
+        pairs = {(prompt_data.type, prompt_data.category)}
+        previous = active_prompt_contents(prompt_service, pairs)
         prompt = prompt_service.create_prompt(prompt_data)
         
-        # Invalidar cache do serviço híbrido
-        hybrid_service = HybridPromptService(db)
-        hybrid_service.invalidate_cache()
-        
+        # Invalidar cache do serviço híbrido e respostas do prompt substituído
+        refresh_prompt_caches(session, prompt_service, pairs, previous)
+        session.refresh(prompt)
         return prompt
+    
+    try:
+        return await db.run_sync(create)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Erro ao criar prompt: {str(e)}")
 
 @router.get("/", response_model=List[PromptResponse])
 async def get_prompts(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     prompt_type: Optional[PromptType] = None,
     category: Optional[PromptCategory] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Lista prompts com filtros opcionais"""
-    prompt_service = PromptService(db)
-    
-    if prompt_type and category:
-        prompts = prompt_service.get_prompts_by_type(prompt_type)
-        prompts = [p for p in prompts if p.category == category]
-    elif prompt_type:
-        prompts = prompt_service.get_prompts_by_type(prompt_type)
-    elif category:
-        prompts = prompt_service.get_prompts_by_category(category)
-    else:
-        prompts = prompt_service.get_prompts(skip=skip, limit=limit)
+    """Lista prompts com filtros opcionais (sem filtros, paginada por offset ou pelo cursor do cabeçalho X-Next-Cursor)"""
+    def list_prompts(session: Session):
+        prompt_service = PromptService(session)
+        
+        if prompt_type and category:
+            prompts = prompt_service.get_prompts_by_type(prompt_type)
+            return [p for p in prompts if p.category == category]
+        if prompt_type:
+            return prompt_service.get_prompts_by_type(prompt_type)
+        if category:
+            return prompt_service.get_prompts_by_category(category)
+        try:
+            return prompt_service.get_prompts(skip=skip, limit=limit, cursor=cursor)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
     
+    prompts = await db.run_sync(list_prompts)
+    cursor_after = next_cursor(prompts, limit) if not (prompt_type or category) else None
+    if cursor_after:
+        response.headers[NEXT_CURSOR_HEADER] = cursor_after
     return prompts
 
 @router.get("/{prompt_id}", response_model=PromptResponse)
 async def get_prompt(
     prompt_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Busca um prompt específico por ID"""
-    prompt_service = PromptService(db)
-    prompt = prompt_service.get_prompt(prompt_id)
+    prompt = await db.run_sync(lambda session: PromptService(session).get_prompt(prompt_id))
     if not prompt:
         raise HTTPException(status_code=404, detail="Prompt não encontrado")
     return prompt
@@ -66,47 +99,72 @@ async def get_prompt(
 async def update_prompt(
     prompt_id: int,
     prompt_data: PromptUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Atualiza um prompt existente"""
-    prompt_service = PromptService(db)
-    prompt = prompt_service.update_prompt(prompt_id, prompt_data)
-    if not prompt:
-        raise HTTPException(status_code=404, detail="Prompt não encontrado")
-    
-    # Invalidar cache do serviço híbrido
-    hybrid_service = HybridPromptService(db)
-    hybrid_service.invalidate_cache()
+    def update(session: Session):
+        prompt_service = PromptService(session)
+        current = prompt_service.get_prompt(prompt_id)
+        if not current:
+            raise HTTPException(status_code=404, detail="Prompt não encontrado")
+        pairs = {(current.type, current.category)}
+        if prompt_data.type or prompt_data.category:
+            pairs.add((prompt_data.type or current.type, prompt_data.category or current.category))
+        previous = active_prompt_contents(prompt_service, pairs)
+        
+        prompt = prompt_service.update_prompt(prompt_id, prompt_data)
+        if not prompt:
+            raise HTTPException(status_code=404, detail="Prompt não encontrado")
+        
+        # Invalidar cache do serviço híbrido e respostas geradas com o conteúdo anterior
+        refresh_prompt_caches(session, prompt_service, pairs, previous)
+        session.refresh(prompt)
+        return prompt
     
-    return prompt
+    return await db.run_sync(update)
 
 @router.delete("/{prompt_id}")
 async def delete_prompt(
     prompt_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Remove um prompt (soft delete)"""
-    prompt_service = PromptService(db)
-    success = prompt_service.delete_prompt(prompt_id)
-    if not success:
-        raise HTTPException(status_code=404, detail="Prompt não encontrado")
+    def delete(session: Session):
+        prompt_service = PromptService(session)
+        current = prompt_service.get_prompt(prompt_id)
+        if not current:
+            raise HTTPException(status_code=404, detail="Prompt não encontrado")
+        pairs = {(current.type, current.category)}
+        previous = active_prompt_contents(prompt_service, pairs)
+        
+        success = prompt_service.delete_prompt(prompt_id)
+        if not success:
+            raise HTTPException(status_code=404, detail="Prompt não encontrado")
+        
+        # Invalidar cache do serviço híbrido e respostas do prompt removido
+        refresh_prompt_caches(session, prompt_service, pairs, previous)
+    
+    await db.run_sync(delete)
     return {"message": "Prompt removido com sucesso"}
 
 @router.get("/count/total")
-async def get_prompt_count(db: Session = Depends(get_db)):
-    """Conta total de prompts ativos"""
-    prompt_service = PromptService(db)
-    return {"count": prompt_service.get_prompt_count()}
+async def get_prompt_count(
+    mode: Optional[Literal["summary", "exact", "approximate"]] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Conta total de prompts ativos (contadores por categoria; mode=exact ou approximate como no histórico)"""
+    return await db.run_sync(lambda session: RecordCountService(session).active_prompt_count(mode=mode))
 
 @router.get("/active/{prompt_type}/{category}", response_model=PromptResponse)
 async def get_active_prompt(
     prompt_type: PromptType,
     category: PromptCategory,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Busca o prompt ativo mais recente por tipo e categoria"""
-    prompt_service = PromptService(db)
-    prompt = prompt_service.get_active_prompt_by_type_and_category(prompt_type, category)
+    prompt = await db.run_sync(
+        lambda session: PromptService(session).get_active_prompt_by_type_and_category(prompt_type, category)
+    )
     if not prompt:
         raise HTTPException(status_code=404, detail="Prompt não encontrado para o tipo e categoria especificados")
     return prompt
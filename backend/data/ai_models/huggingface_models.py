@@ -20,8 +20,9 @@ HUGGINGFACE_DEFAULT_CONFIG = {
 }
 
 # Configurações para diferentes tipos de resposta
+# max_input_tokens: orçamento do email dentro do prompt (texto excedente é resumido/descartado)
 HUGGINGFACE_CONFIGS = {
-    "short": {"max_tokens": 200, "temperature": 0.7},    # Respostas rápidas
-    "medium": {"max_tokens": 500, "temperature": 0.7},   # Respostas balanceadas (padrão)
-    "long": {"max_tokens": 800, "temperature": 0.7},     # Respostas detalhadas
+    "short": {"max_tokens": 200, "temperature": 0.7, "max_input_tokens": 600},    # Respostas rápidas
+    "medium": {"max_tokens": 500, "temperature": 0.7, "max_input_tokens": 1200},  # Respostas balanceadas (padrão)
+    "long": {"max_tokens": 800, "temperature": 0.7, "max_input_tokens": 2500},    # Respostas detalhadas
 }
@@ -5,5 +5,6 @@ Separadas em tópicos produtivos e categorias improdutivas
 
 from .business_keywords import BUSINESS_TOPICS
 from .unproductive_keywords import UNPRODUCTIVE_CATEGORIES
+from .context_indicators import CONTEXT_INDICATORS, PERSONAL_RESPONSE_CATEGORIES
 
-__all__ = ['BUSINESS_TOPICS', 'UNPRODUCTIVE_CATEGORIES']
+__all__ = ['BUSINESS_TOPICS', 'UNPRODUCTIVE_CATEGORIES', 'CONTEXT_INDICATORS', 'PERSONAL_RESPONSE_CATEGORIES']
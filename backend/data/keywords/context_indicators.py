@@ -0,0 +1,22 @@
+"""
+Indicadores de contexto usados para ponderar a classificação e a geração de respostas
+"""
+
+# Indicadores de importância empresarial e de spam (classificação por palavras-chave)
+CONTEXT_INDICATORS = {
+    'business_context': ['@', 'empresa', 'company', 'business', 'corp', 'ltd'],
+    'urgent': ['urgente', 'urgent', 'asap', 'imediato', 'immediate', 'prioridade', 'priority'],
+    'professional_tone': ['prezado', 'dear', 'sr', 'sra', 'senhor', 'senhora', 'att', 'atenciosamente'],
+    'meeting': ['reunião', 'meeting', 'agenda', 'schedule', 'horário', 'time'],
+    'project': ['projeto', 'project', 'tarefa', 'task', 'deadline', 'prazo'],
+    'links': ['http', 'www.'],
+    'spam': ['clique aqui', 'click here', 'não perca', 'última chance']
+}
+
+# Categorias pessoais direcionadas ao prompt de spam na geração de respostas
+PERSONAL_RESPONSE_CATEGORIES = {
+    'personal_associations': ['bombeiros', 'associação', 'clube', 'igreja', 'paróquia', 'ong', 'fundação'],
+    'personal_services': ['seguro de carro', 'seguro de casa', 'consórcio', 'financiamento pessoal'],
+    'local_services': ['prefeitura', 'câmara municipal', 'secretaria municipal'],
+    'personal_payments': ['pagamento de multa', 'pagamento de ipva', 'pagamento de iptu', 'condomínio']
+}
@@ -1,20 +1,54 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from config.database import engine, Base, create_tables
 from controllers.email_controller import router as email_router
 from controllers.historico_controller import router as historico_router
 from controllers.prompt_controller import router as prompt_router
+from controllers.admin_controller import router as admin_router
+from services.hybrid_prompt_service import warm_prompt_cache
+from services.prompt_change_service import get_prompt_change_listener, start_prompt_change_listener
+from services.cpu_executor import get_cpu_executor
+from services.historico_writer import get_historico_writer
+from services.generation_job_service import get_generation_job_service
+from services.keyset_pagination import NEXT_CURSOR_HEADER, create_keyset_indexes
+from services.record_count_service import ensure_record_counts
 import os
 
-# Create database tables on startup
-create_tables()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create database tables on startup
+    create_tables()
+
+    # Índices compostos da paginação por cursor (tabelas já existentes não os recebem do create_all)
+    create_keyset_indexes(engine)
+
+    # Contadores do histórico e dos prompts (recalculados só na primeira execução)
+    ensure_record_counts()
+
+    # Carregar os prompts ativos no cache do processo (uma consulta)
+    warm_prompt_cache()
+
+    # Aplicar alterações de prompts feitas em outros workers
+    start_prompt_change_listener()
+
+    # Pool de CPU com as regras de classificação já compiladas em cada worker
+    get_cpu_executor().start()
+
+    yield
+    # Gravar os eventos do histórico ainda na fila antes de encerrar
+    get_historico_writer().stop()
+    get_prompt_change_listener().stop()
+    get_generation_job_service().shutdown()
+    get_cpu_executor().shutdown()
 
 app = FastAPI(
     title="Auto Email Classification API",
     description="API para classificação automática de emails como Produtivo ou Improdutivo",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -24,12 +58,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 # Include routers
 app.include_router(email_router, prefix="/api/emails", tags=["emails"])
 app.include_router(historico_router, prefix="/api", tags=["historico"])
 app.include_router(prompt_router, prefix="/api/prompts", tags=["prompts"])
+app.include_router(admin_router, prefix="/api/admin", tags=["admin"])
 
 @app.get("/")
 async def root():
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, BigInteger, Float, DateTime
+from sqlalchemy.sql import func
+from config.database import Base
+
+class EmailFingerprint(Base):
+    """Impressão digital (SimHash) de emails para detecção de quase-duplicatas"""
+    __tablename__ = "email_fingerprints"
+
+    id = Column(Integer, primary_key=True, index=True)
+    email_id = Column(Integer, nullable=False, index=True)
+    classification_id = Column(Integer, nullable=False)
+    simhash = Column(BigInteger, nullable=False)
+    # Preenchido quando a classificação foi reaproveitada de outro email
+    derived_from_email_id = Column(Integer, nullable=True, index=True)
+    similarity = Column(Float, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from config.database import Base
+
+class PromptGeneration(Base):
+    """Registro de alteração de prompts: o id é a geração que os workers acompanham"""
+    __tablename__ = "prompt_generations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # Par tipo/categoria cujo prompt ativo pode ter mudado
+    prompt_type = Column(String(50), nullable=False)
+    category = Column(String(50), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
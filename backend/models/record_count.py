@@ -0,0 +1,12 @@
+from sqlalchemy import Column, String, BigInteger, DateTime
+from sqlalchemy.sql import func
+from config.database import Base
+
+class RecordCount(Base):
+    """Contador de registros por entidade e chave (ex.: histórico por ação, prompts ativos por categoria)"""
+    __tablename__ = "record_counts"
+
+    entity = Column(String(50), primary_key=True)
+    key = Column(String(100), primary_key=True)
+    count = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
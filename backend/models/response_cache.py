@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, Text, Float, DateTime
+from sqlalchemy.sql import func
+from config.database import Base
+
+class ResponseCacheEntry(Base):
+    """Resposta sugerida gerada por IA, reaproveitada para o mesmo prompt e o mesmo email"""
+    __tablename__ = "response_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # sha256 do prompt resolvido + sha256 do email normalizado
+    cache_key = Column(String(64), nullable=False, unique=True, index=True)
+    prompt_hash = Column(String(64), nullable=False, index=True)
+    suggested_response = Column(Text, nullable=False)
+    hits = Column(Integer, nullable=False, default=0)
+    # Epoch (s): comparações de TTL/LRU independentes do fuso do banco
+    expires_at = Column(Float, nullable=False, index=True)
+    last_used_at = Column(Float, nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
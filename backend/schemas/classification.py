@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 
 class ClassificationBase(BaseModel):
@@ -25,3 +25,57 @@ class ClassificationResponse(ClassificationBase):
 class EmailClassificationResponse(BaseModel):
     email: dict
     classification: ClassificationResponse
+    # Preenchidos quando a classificação foi reaproveitada de um email quase idêntico
+    derived_from_email_id: Optional[int] = None
+    similarity: Optional[float] = None
+    # Preenchido quando a resposta sugerida está sendo gerada em segundo plano
+    generation_job_id: Optional[str] = None
+    # Preenchido quando a resposta sugerida será transmitida em streaming (SSE)
+    response_stream_url: Optional[str] = None
+
+class BatchClassificationItem(BaseModel):
+    index: int
+    email_id: Optional[int] = None
+    classification_id: Optional[int] = None
+    category: Optional[str] = None
+    subcategory: Optional[str] = None
+    confidence_score: Optional[float] = None
+    suggested_response: Optional[str] = None
+    # Origem do resultado: analysis | cache | near_duplicate
+    source: Optional[str] = None
+    derived_from_email_id: Optional[int] = None
+    similarity: Optional[float] = None
+    generation_job_id: Optional[str] = None
+    error: Optional[str] = None
+
+class BatchClassificationResponse(BaseModel):
+    results: List[BatchClassificationItem]
+    total: int
+    processed: int
+    failed: int
+    # Tempo (s) por etapa: parse, lookup, classification, generation, persist, total
+    timings: Dict[str, float]
+
+class ClassifyRequest(BaseModel):
+    content: str
+    subject: Optional[str] = None
+    generate_response: bool = False
+
+class ClassifyResponse(BaseModel):
+    category: str
+    confidence: float
+    subcategory: Optional[str] = None
+    method: Optional[str] = None
+    suggested_response: Optional[str] = None
+    cached: bool = False
+    processing_time: float
+
+class GenerationJobResponse(BaseModel):
+    id: str
+    classification_ids: List[int]
+    # pending | running | completed | failed
+    status: str
+    suggested_response: Optional[str] = None
+    error: Optional[str] = None
+    created_at: float
+    finished_at: Optional[float] = None
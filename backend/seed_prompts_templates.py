@@ -14,6 +14,8 @@ from config.database import SessionLocal, create_tables
 from models.prompt import Prompt, PromptType, PromptCategory, PromptSubcategory
 from models.template import Template, TemplateType, TemplateCategory
 from data.prompts import PRODUCTIVE_PROMPTS, UNPRODUCTIVE_PROMPTS
+from services.record_count_service import RecordCountService
+from services.prompt_change_service import record_prompt_changes
 from data.templates import PRODUCTIVE_TEMPLATES, UNPRODUCTIVE_TEMPLATES, GENERIC_UNPRODUCTIVE_TEMPLATES
 
 def seed_prompts():
@@ -129,6 +131,10 @@ def seed_prompts():
         db.add(db_prompt)
         
         db.commit()
+        # Prompts inseridos direto na tabela: atualizar os contadores
+        RecordCountService(db).rebuild()
+        # e registrar a alteração para que os workers em execução recarreguem os prompts
+        record_prompt_changes(db, db.query(Prompt.type, Prompt.category).distinct().all())
         print("Prompts populados com sucesso!")
         
     except Exception as e:
@@ -1,20 +1,39 @@
 import os
-from typing import Dict, Optional
+from typing import AsyncIterator, Dict, List, Optional
 import time
 from .free_ai_service import FreeAIService
+from .email_analysis import EmailAnalysis
+from .generation_client import Deadline
+from .cpu_executor import CPU_BATCH_TIMEOUT, analyze_batch_task, analyze_task, classify_task, get_cpu_executor
 
 class AIService:
     def __init__(self, db_session=None):
         self.free_ai = FreeAIService(db_session)
         # Sistema focado apenas em serviços gratuitos
 
+    def analyze_email(self, email_content: str) -> EmailAnalysis:
+        """Analisar e classificar o email uma única vez (no pool de CPU; resultado reaproveitado na geração)"""
+        return get_cpu_executor().run(analyze_task, email_content)
+
+    def analyze_batch(self, email_contents: List[str]) -> List[EmailAnalysis]:
+        """Analisar vários emails em lote no pool de CPU (pontuação vetorizada com o classificador linear)"""
+        if not email_contents:
+            return []
+        return get_cpu_executor().run(analyze_batch_task, email_contents, timeout=CPU_BATCH_TIMEOUT)
+
     def classify_email(self, email_content: str) -> Dict[str, any]:
-        """Classificar email como produtivo ou improdutivo usando serviços de IA disponíveis"""
+        """Classificar email como produtivo ou improdutivo (no pool de CPU, com as regras já compiladas)"""
+        
+        return get_cpu_executor().run(classify_task, email_content)
+
+    def generate_response(self, email_content: str, category: str, analysis: EmailAnalysis = None,
+                          deadline: Deadline = None) -> str:
+        """Gerar uma resposta apropriada baseada na categoria do email (dentro do prazo da requisição)"""
         
-        result = self.free_ai.classify_email_huggingface(email_content)
-        return result
+        return self.free_ai.generate_response(email_content, category, analysis, deadline)
 
-    def generate_response(self, email_content: str, category: str) -> str:
-        """Gerar uma resposta apropriada baseada na categoria do email"""
+    def stream_response(self, email_content: str, category: str, subcategory: Optional[str],
+                        deadline: Deadline = None, use_cache: bool = True) -> AsyncIterator[str]:
+        """Gerar a resposta sugerida em streaming (trechos de texto à medida que são gerados)"""
         
-        return self.free_ai.generate_response(email_content, category)
+        return self.free_ai.astream_response(email_content, category, subcategory, deadline, use_cache)
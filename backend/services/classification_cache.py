@@ -0,0 +1,181 @@
+"""
+Cache de resultados de classificação por hash do conteúdo normalizado
+Camadas: LRU em memória (tamanho + TTL) > Redis compartilhado (opcional, REDIS_URL)
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Optional
+from data.keywords import BUSINESS_TOPICS, UNPRODUCTIVE_CATEGORIES, CONTEXT_INDICATORS, PERSONAL_RESPONSE_CATEGORIES
+from .simple_context_classification import (
+    CONTEXT_PATTERNS, UNPRODUCTIVE_PATTERNS, PERSONAL_INDICATORS,
+    PERSONAL_SUBCATEGORY_RULES, FALLBACK_KEYWORDS
+)
+from .linear_classifier import (
+    LINEAR_CLASSIFIER_MODE, LINEAR_CLASSIFIER_MIN_CONFIDENCE, LINEAR_CLASSIFIER_TIE_THRESHOLD, get_linear_classifier
+)
+from .redis_client import get_redis_client
+
+CLASSIFICATION_CACHE_SIZE = int(os.getenv("CLASSIFICATION_CACHE_SIZE", 10000))
+CLASSIFICATION_CACHE_TTL = int(os.getenv("CLASSIFICATION_CACHE_TTL", 3600))  # 1 hora
+
+
+@lru_cache(maxsize=1)
+def get_ruleset_version() -> str:
+    """
+    Hash das regras de classificação: muda automaticamente quando padrões ou palavras-chave mudam.
+    Com o classificador linear ativo, inclui o modo, os limiares e a versão dos pesos carregados
+    (um novo treino não reaproveita classificações do modelo anterior, inclusive no Redis).
+    """
+    rules = [
+        CONTEXT_PATTERNS, UNPRODUCTIVE_PATTERNS, PERSONAL_INDICATORS, PERSONAL_SUBCATEGORY_RULES,
+        FALLBACK_KEYWORDS, BUSINESS_TOPICS, UNPRODUCTIVE_CATEGORIES, CONTEXT_INDICATORS,
+        PERSONAL_RESPONSE_CATEGORIES
+    ]
+    if LINEAR_CLASSIFIER_MODE != 'off':
+        linear_classifier = get_linear_classifier()
+        rules.append({
+            'mode': LINEAR_CLASSIFIER_MODE,
+            'min_confidence': LINEAR_CLASSIFIER_MIN_CONFIDENCE,
+            'tie_threshold': LINEAR_CLASSIFIER_TIE_THRESHOLD,
+            'model': linear_classifier.fingerprint() if linear_classifier is not None else None
+        })
+    serialized = json.dumps(rules, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(serialized.encode('utf-8')).hexdigest()[:12]
+
+
+def normalize_content(content: str) -> str:
+    """Normaliza espaços em branco (maiúsculas são preservadas, pois influenciam a classificação)"""
+    return ' '.join(content.split())
+
+
+class LRUCache:
+    """Cache LRU thread-safe com limite de tamanho e expiração por TTL"""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class ClassificationCache:
+    """
+    Cache do caminho classify_email + generate_response.
+
+    A chave combina o hash do conteúdo normalizado com a versão das regras e a versão dos
+    prompts, então alterações em qualquer um deles invalidam as entradas antigas sem varredura.
+    """
+
+    KEY_PREFIX = "autou:classification:"
+
+    def __init__(self, max_size: int = CLASSIFICATION_CACHE_SIZE, ttl: int = CLASSIFICATION_CACHE_TTL,
+                 redis_client=None):
+        self.local = LRUCache(max_size, ttl)
+        self.ttl = ttl
+        self.redis = redis_client
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+
+    def make_key(self, content: str, prompt_version: Any = 0) -> str:
+        digest = hashlib.sha256(normalize_content(content).encode('utf-8')).hexdigest()
+        return f"{self.KEY_PREFIX}{get_ruleset_version()}:{prompt_version}:{digest}"
+
+    def _count(self, counter: str):
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Busca na memória local e depois no Redis (promovendo para a memória local)"""
+        value = self.local.get(key)
+        if value is not None:
+            self._count('hits')
+            return value
+
+        if self.redis is not None:
+            try:
+                raw = self.redis.get(key)
+                if raw is not None:
+                    value = json.loads(raw)
+                    self.local.set(key, value)
+                    self._count('redis_hits')
+                    return value
+            except Exception as e:
+                print(f"Erro ao ler cache de classificação no Redis: {e}")
+
+        self._count('misses')
+        return None
+
+    def set(self, key: str, value: Dict[str, Any]):
+        self.local.set(key, value)
+        if self.redis is not None:
+            try:
+                self.redis.set(key, json.dumps(value, ensure_ascii=False, default=str), ex=self.ttl)
+            except Exception as e:
+                print(f"Erro ao gravar cache de classificação no Redis: {e}")
+
+    def clear(self):
+        self.local.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.redis_hits + self.misses
+        return {
+            'hits': self.hits,
+            'redis_hits': self.redis_hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits + self.redis_hits) / lookups if lookups else 0.0,
+            'size': len(self.local),
+            'max_size': self.local.max_size,
+            'ttl': self.ttl,
+            'evictions': self.local.evictions,
+            'expirations': self.local.expirations,
+            'redis_enabled': self.redis is not None,
+            'ruleset_version': get_ruleset_version()
+        }
+
+
+@lru_cache(maxsize=1)
+def get_classification_cache() -> ClassificationCache:
+    """Cache compartilhado pelo processo (camada Redis ativada quando REDIS_URL está disponível)"""
+    return ClassificationCache(redis_client=get_redis_client())
@@ -1,17 +1,12 @@
-from sqlalchemy.orm import Session
 from models.classification import Classification
 from schemas.classification import ClassificationCreate
 from typing import List, Optional
+from .session_service import SessionService
 
-class ClassificationService:
-    def __init__(self, db: Session):
-        self.db = db
-
+class ClassificationService(SessionService):
     def create_classification(self, classification_data: ClassificationCreate) -> Classification:
         db_classification = Classification(**classification_data.model_dump())
-        self.db.add(db_classification)
-        self.db.commit()
-        self.db.refresh(db_classification)
+        self._save(db_classification)
         return db_classification
 
     def get_classification(self, classification_id: int) -> Optional[Classification]:
@@ -39,3 +34,12 @@ class ClassificationService:
         db_classification.is_deleted = True
         self.db.commit()
         return True
+
+    def update_suggested_response(self, classification_id: int, suggested_response: str) -> bool:
+        db_classification = self.get_classification(classification_id)
+        if not db_classification:
+            return False
+        
+        db_classification.suggested_response = suggested_response
+        self.db.commit()
+        return True
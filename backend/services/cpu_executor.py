@@ -0,0 +1,224 @@
+"""
+Pool de execução para trabalho de CPU (análise e classificação por regras, extração de texto de PDFs)
+Tira esse trabalho do event loop: threads (padrão) ou processos (contornam o GIL).
+Fila limitada (tarefas além do limite são recusadas), prazo por tarefa e métricas de fila.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional
+from .email_analysis import EmailAnalysis
+
+# thread | process | inline (executa no próprio chamador, sem pool)
+CPU_EXECUTOR = os.getenv("CPU_EXECUTOR", "thread").lower()
+CPU_EXECUTOR_WORKERS = int(os.getenv("CPU_EXECUTOR_WORKERS", os.cpu_count() or 2))
+# Tarefas aguardando além das em execução; acima disso a submissão é recusada
+CPU_EXECUTOR_QUEUE_SIZE = int(os.getenv("CPU_EXECUTOR_QUEUE_SIZE", 64))
+# Prazo (s) por tarefa, incluindo a espera na fila
+CPU_TASK_TIMEOUT = float(os.getenv("CPU_TASK_TIMEOUT", 10))
+CPU_PDF_TIMEOUT = float(os.getenv("CPU_PDF_TIMEOUT", 30))
+CPU_BATCH_TIMEOUT = float(os.getenv("CPU_BATCH_TIMEOUT", 60))
+# Processos iniciados com spawn não herdam threads nem conexões do processo principal
+CPU_EXECUTOR_START_METHOD = os.getenv("CPU_EXECUTOR_START_METHOD", "spawn")
+
+
+class ExecutorSaturated(Exception):
+    """Fila do pool cheia: a tarefa não foi aceita"""
+
+
+class TaskTimeout(Exception):
+    """A tarefa não terminou dentro do prazo (continua até o fim no worker; o resultado é descartado)"""
+
+
+def preload_worker():
+    """Inicializador dos workers: compila as regras e carrega o classificador uma vez por worker"""
+    from .simple_context_classification import get_pattern_engine
+    from .keyword_automaton import get_keyword_automaton
+    from .linear_classifier import LINEAR_CLASSIFIER_MODE, get_linear_classifier
+    get_pattern_engine()
+    get_keyword_automaton()
+    if LINEAR_CLASSIFIER_MODE != 'off':
+        get_linear_classifier()
+    _classifier()
+
+
+@lru_cache(maxsize=1)
+def _classifier():
+    from .free_ai_service import FreeAIService
+    return FreeAIService()
+
+
+# Tarefas executadas nos workers (funções de módulo para poderem ir a outro processo)
+def classify_task(email_content: str) -> Dict[str, Any]:
+    return _classifier().classify_email_huggingface(email_content)
+
+
+def analyze_task(email_content: str) -> EmailAnalysis:
+    return _classifier().analyze_email(email_content)
+
+
+def analyze_batch_task(email_contents: List[str]) -> List[EmailAnalysis]:
+    return _classifier().analyze_batch(email_contents)
+
+
+def extract_text_task(file_content: bytes, filename: str) -> Optional[str]:
+    from .file_service import FileService
+    return FileService().extract_text_from_file(file_content, filename)
+
+
+def _timed(fn: Callable, submitted_at: float, *args) -> tuple:
+    """Executa a tarefa no worker e devolve (resultado, espera na fila, duração)"""
+    started = time.time()
+    result = fn(*args)
+    return result, started - submitted_at, time.time() - started
+
+
+class CPUExecutor:
+    """
+    Pool de tarefas de CPU do processo.
+
+    `run` bloqueia a thread chamadora até o resultado (para código síncrono fora do event loop);
+    `arun` é a variante para rotas async. Ambos respeitam o limite da fila e o prazo da tarefa.
+    """
+
+    def __init__(self, kind: str = CPU_EXECUTOR, workers: int = CPU_EXECUTOR_WORKERS,
+                 queue_size: int = CPU_EXECUTOR_QUEUE_SIZE, timeout: float = CPU_TASK_TIMEOUT):
+        self.kind = kind
+        self.workers = max(1, workers)
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.workers + queue_size)
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            'submitted': 0, 'completed': 0, 'failed': 0, 'rejected': 0, 'timeouts': 0,
+            'in_flight': 0, 'max_queue_depth': 0,
+            'wait_total': 0.0, 'wait_max': 0.0, 'run_total': 0.0, 'run_max': 0.0
+        }
+
+    def _get_pool(self):
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    if self.kind == "process":
+                        self._pool = ProcessPoolExecutor(
+                            max_workers=self.workers,
+                            mp_context=multiprocessing.get_context(CPU_EXECUTOR_START_METHOD),
+                            initializer=preload_worker
+                        )
+                    else:
+                        self._pool = ThreadPoolExecutor(
+                            max_workers=self.workers,
+                            thread_name_prefix="cpu-task",
+                            initializer=preload_worker
+                        )
+        return self._pool
+
+    def start(self):
+        """Cria o pool e pré-carrega as regras (chamado na inicialização da API)"""
+        if self.kind == "inline":
+            preload_worker()
+            return
+        # Um worker por tarefa: força a inicialização de todos antes da primeira requisição
+        pool = self._get_pool()
+        for future in [pool.submit(time.sleep, 0.05) for _ in range(self.workers)]:
+            future.result()
+
+    def shutdown(self):
+        """Encerra os workers (chamado no encerramento da API); tarefas ainda na fila são canceladas"""
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _queue_depth(self) -> int:
+        """Tarefas aceitas aguardando um worker livre"""
+        return max(0, self.stats['in_flight'] - self.workers)
+
+    def _count(self, **amounts):
+        with self._stats_lock:
+            for key, amount in amounts.items():
+                self.stats[key] += amount
+            self.stats['max_queue_depth'] = max(self.stats['max_queue_depth'], self._queue_depth())
+
+    def _submit(self, fn: Callable, *args) -> Future:
+        if not self._slots.acquire(blocking=False):
+            self._count(rejected=1)
+            raise ExecutorSaturated(f"Fila de processamento cheia ({self.workers + self.queue_size} tarefas)")
+        self._count(submitted=1, in_flight=1)
+        try:
+            future = self._get_pool().submit(_timed, fn, time.time(), *args)
+        except Exception:
+            self._slots.release()
+            self._count(in_flight=-1)
+            raise
+        future.add_done_callback(self._finished)
+        return future
+
+    def _finished(self, future: Future):
+        """Libera a vaga e registra as métricas (também para tarefas cujo chamador desistiu)"""
+        self._slots.release()
+        if future.cancelled():
+            self._count(in_flight=-1)
+            return
+        error = future.exception()
+        if error is not None:
+            self._count(in_flight=-1, failed=1)
+            return
+        _, waited, duration = future.result()
+        with self._stats_lock:
+            self.stats['in_flight'] -= 1
+            self.stats['completed'] += 1
+            self.stats['wait_total'] += waited
+            self.stats['wait_max'] = max(self.stats['wait_max'], waited)
+            self.stats['run_total'] += duration
+            self.stats['run_max'] = max(self.stats['run_max'], duration)
+
+    def run(self, fn: Callable, *args, timeout: float = None) -> Any:
+        """Executa no pool e espera o resultado (não chamar a partir do event loop)"""
+        if self.kind == "inline":
+            return fn(*args)
+        future = self._submit(fn, *args)
+        try:
+            return future.result(timeout=timeout or self.timeout)[0]
+        except TimeoutError:
+            future.cancel()
+            self._count(timeouts=1)
+            raise TaskTimeout(f"Tarefa excedeu {timeout or self.timeout:g}s")
+
+    async def arun(self, fn: Callable, *args, timeout: float = None) -> Any:
+        """Executa no pool sem bloquear o event loop"""
+        if self.kind == "inline":
+            return fn(*args)
+        future = self._submit(fn, *args)
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(future), timeout or self.timeout)
+            return result[0]
+        except asyncio.TimeoutError:
+            self._count(timeouts=1)
+            raise TaskTimeout(f"Tarefa excedeu {timeout or self.timeout:g}s")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self.stats, queue_depth=self._queue_depth())
+        finished = stats['completed'] or 1
+        stats.update(
+            kind=self.kind,
+            workers=self.workers,
+            queue_size=self.queue_size,
+            timeout=self.timeout,
+            wait_avg=stats['wait_total'] / finished,
+            run_avg=stats['run_total'] / finished
+        )
+        return stats
+
+
+@lru_cache(maxsize=1)
+def get_cpu_executor() -> CPUExecutor:
+    return CPUExecutor()
@@ -0,0 +1,74 @@
+"""
+Análise única de email compartilhada entre classificação e geração de resposta
+"""
+
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional, Tuple
+from .keyword_automaton import KeywordHits
+from .pattern_engine import PatternScan
+
+
+def resolve_subcategory(result: Dict[str, Any]) -> Optional[str]:
+    """Determina a subcategoria a partir do resultado do classificador"""
+    # Novo sistema: subcategory vem diretamente do resultado
+    if result.get('subcategory'):
+        return result['subcategory']
+    # Fallback para sistema antigo (compatibilidade)
+    if result['category'] == 'Produtivo' and result.get('primary_topic'):
+        return result['primary_topic']
+    if result['category'] == 'Improdutivo' and result.get('primary_unproductive_category'):
+        return result['primary_unproductive_category']
+    return None
+
+
+@dataclass(frozen=True)
+class EmailAnalysis:
+    """
+    Registro imutável com tudo o que é extraído de um email em uma única análise.
+
+    Construído uma vez por email (`FreeAIService.analyze_email`) e repassado para a geração
+    de resposta, que reutiliza a subcategoria escolhida pelo classificador.
+    """
+    content: str
+    normalized_text: str
+    tokens: Tuple[str, ...]
+    features: Mapping[str, Any]
+    keyword_hits: KeywordHits
+    pattern_scan: PatternScan
+    classification: Mapping[str, Any]
+    subcategory: Optional[str]
+
+    @classmethod
+    def build(cls, content: str, normalized_text: str, tokens, features: Dict[str, Any],
+              keyword_hits: KeywordHits, pattern_scan: PatternScan,
+              classification: Dict[str, Any]) -> 'EmailAnalysis':
+        return cls(
+            content=content,
+            normalized_text=normalized_text,
+            tokens=tuple(tokens),
+            features=MappingProxyType(dict(features)),
+            keyword_hits=keyword_hits,
+            pattern_scan=pattern_scan,
+            classification=MappingProxyType(dict(classification)),
+            subcategory=resolve_subcategory(classification)
+        )
+
+    def __reduce__(self):
+        # MappingProxyType não é serializável: a análise volta do pool de processos como dicionários
+        return EmailAnalysis.build, (
+            self.content, self.normalized_text, self.tokens, dict(self.features),
+            self.keyword_hits, self.pattern_scan, dict(self.classification)
+        )
+
+    @property
+    def category(self) -> str:
+        return self.classification['category']
+
+    @property
+    def confidence(self) -> float:
+        return self.classification['confidence']
+
+    def to_result(self) -> Dict[str, Any]:
+        """Resultado da classificação no formato de dicionário usado pela API"""
+        return dict(self.classification)
@@ -0,0 +1,251 @@
+"""
+Pipeline de processamento de emails: cache exato > quase-duplicata > análise completa
+Compartilhado pelo upload individual e pela classificação em lote
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from models.email import Email
+from models.classification import Classification
+from models.historico import Historico, ActionType
+from models.email_fingerprint import EmailFingerprint
+from schemas.email import EmailCreate
+from .ai_service import AIService
+from .classification_service import ClassificationService
+from .historico_service import HistoricoService
+from .historico_writer import HISTORICO_WRITE_BEHIND
+from .record_count_service import HISTORICO_COUNTS, increment_counts
+from .near_duplicate_service import NearDuplicateService, NEAR_DUPLICATE_ENABLED, _to_signed
+from .classification_cache import get_classification_cache
+from .hybrid_prompt_service import get_prompt_version
+from .email_analysis import EmailAnalysis, resolve_subcategory
+from .generation_client import Deadline
+
+
+@dataclass
+class ProcessingResult:
+    """Resultado da classificação (e resposta sugerida) de um email, antes da persistência"""
+    category: str
+    confidence: float
+    subcategory: Optional[str]
+    suggested_response: Optional[str]
+    processing_time: float
+    classification: Dict[str, any]
+    fingerprint: Optional[int] = None
+    derived_from_email_id: Optional[int] = None
+    similarity: Optional[float] = None
+    source: str = "analysis"  # analysis | cache | near_duplicate
+    # Preenchidos quando a geração da resposta foi adiada para a fila assíncrona
+    generation_deferred: bool = False
+    analysis: Optional[EmailAnalysis] = None
+    cache_key: Optional[str] = None
+
+
+class EmailProcessingService:
+    def __init__(self, db: Session):
+        self.db = db
+        self.ai_service = AIService(db)  # Passar sessão do banco para usar prompts híbridos
+        self.classification_service = ClassificationService(db)
+        self.near_duplicate_service = NearDuplicateService(db)
+        self.cache = get_classification_cache()
+        self.timings: Dict[str, float] = {}
+
+    def _reuse(self, content: str, generate_response: bool,
+               start_time: float) -> Tuple[str, Optional[ProcessingResult], Optional[int]]:
+        """Tenta reaproveitar um resultado anterior; retorna (chave do cache, resultado, fingerprint)"""
+        # Reaproveitar resultado de um email com o mesmo conteúdo (mesmas regras e prompts)
+        cache_key = self.cache.make_key(content, get_prompt_version())
+        cached = self.cache.get(cache_key)
+        if cached:
+            return cache_key, ProcessingResult(
+                category=cached['classification']['category'],
+                confidence=cached['classification']['confidence'],
+                subcategory=cached['subcategory'],
+                suggested_response=cached['suggested_response'],
+                processing_time=time.time() - start_time,
+                classification=cached['classification'],
+                source="cache"
+            ), None
+
+        # Envios em massa quase idênticos (nome, links, datas) reaproveitam a classificação anterior
+        fingerprint = self.near_duplicate_service.fingerprint(content) if NEAR_DUPLICATE_ENABLED else None
+        duplicate = self.near_duplicate_service.find_duplicate(fingerprint)
+        if duplicate:
+            source = self.classification_service.get_classification(duplicate[1])
+            # Classificações gravadas sem resposta sugerida não servem quando a resposta é pedida
+            if source and (source.suggested_response or not generate_response):
+                derived_from_email_id, _, similarity = duplicate
+                return cache_key, ProcessingResult(
+                    category=source.category,
+                    confidence=source.confidence_score,
+                    subcategory=source.subcategory,
+                    suggested_response=source.suggested_response,
+                    processing_time=time.time() - start_time,
+                    classification={'category': source.category, 'confidence': source.confidence_score},
+                    fingerprint=fingerprint,
+                    derived_from_email_id=derived_from_email_id,
+                    similarity=similarity,
+                    source="near_duplicate"
+                ), fingerprint
+
+        return cache_key, None, fingerprint
+
+    def _from_analysis(self, content: str, cache_key: str, analysis: EmailAnalysis, fingerprint: Optional[int],
+                       generate_response: bool, start_time: float, defer_generation: bool = False,
+                       deadline: Deadline = None) -> ProcessingResult:
+        ai_result = analysis.to_result()
+        suggested_response = None
+        if generate_response and not defer_generation:
+            # Gerar resposta sugerida reutilizando a subcategoria da classificação
+            suggested_response = self.ai_service.generate_response(content, ai_result['category'], analysis, deadline)
+            self.cache.set(cache_key, {
+                'classification': ai_result,
+                'subcategory': analysis.subcategory,
+                'suggested_response': suggested_response
+            })
+        return ProcessingResult(
+            category=ai_result['category'],
+            confidence=ai_result['confidence'],
+            subcategory=analysis.subcategory,
+            suggested_response=suggested_response,
+            processing_time=time.time() - start_time,
+            classification=ai_result,
+            fingerprint=fingerprint,
+            generation_deferred=generate_response and defer_generation,
+            analysis=analysis,
+            cache_key=cache_key
+        )
+
+    def classify(self, content: str, generate_response: bool = False,
+                 deadline: Deadline = None) -> Tuple[str, Dict[str, any], bool]:
+        """
+        Classificação sem persistência (dry-run); retorna (chave do cache, resultado, veio do cache).
+
+        Sem resposta, o resultado depende apenas do conteúdo e das regras, então a chave não
+        inclui a versão dos prompts e o mesmo email é classificado uma única vez.
+        """
+        start_time = time.time()
+        cache_key = self.cache.make_key(content, get_prompt_version() if generate_response else 'classify')
+        cached = self.cache.get(cache_key)
+        if cached:
+            return cache_key, dict(cached, processing_time=time.time() - start_time), True
+
+        if generate_response:
+            analysis = self.ai_service.analyze_email(content)
+            result = self._from_analysis(content, cache_key, analysis, None, True, start_time, deadline=deadline)
+            value = {
+                'classification': result.classification,
+                'subcategory': result.subcategory,
+                'suggested_response': result.suggested_response
+            }
+        else:
+            classification = self.ai_service.classify_email(content)
+            value = {
+                'classification': classification,
+                'subcategory': resolve_subcategory(classification),
+                'suggested_response': None
+            }
+            self.cache.set(cache_key, value)
+        return cache_key, dict(value, processing_time=time.time() - start_time), False
+
+    def process(self, content: str, generate_response: bool = True, defer_generation: bool = False,
+                deadline: Deadline = None) -> ProcessingResult:
+        """Classificar um email (e gerar resposta), reaproveitando resultados sempre que possível"""
+        return self.process_batch([content], generate_response, defer_generation, deadline)[0]
+
+    def process_batch(self, contents: List[str], generate_response: bool = True,
+                      defer_generation: bool = False, deadline: Deadline = None) -> List[ProcessingResult]:
+        """
+        Classificar vários emails: buscas em cache por item, análise em lote dos restantes
+        (conteúdos repetidos dentro do lote são analisados uma única vez).
+
+        Com defer_generation, a resposta não é gerada aqui: os resultados ficam marcados com
+        generation_deferred para que a geração seja enfileirada após a gravação.
+        """
+        start_time = time.time()
+        results: List[Optional[ProcessingResult]] = [None] * len(contents)
+        pending: Dict[str, List[int]] = {}
+        fingerprints: Dict[str, Optional[int]] = {}
+
+        for position, content in enumerate(contents):
+            cache_key, reused, fingerprint = self._reuse(content, generate_response, time.time())
+            if reused:
+                results[position] = reused
+            else:
+                pending.setdefault(cache_key, []).append(position)
+                fingerprints.setdefault(cache_key, fingerprint)
+        lookup_done = time.time()
+
+        keys = list(pending)
+        analyses = self.ai_service.analyze_batch([contents[pending[key][0]] for key in keys])
+        analysis_done = time.time()
+
+        # Busca e classificação do lote rateadas entre os itens analisados; a geração conta por item
+        shared_time = (analysis_done - start_time) / max(1, len(keys))
+        for key, analysis in zip(keys, analyses):
+            first = pending[key][0]
+            result = self._from_analysis(contents[first], key, analysis, fingerprints[key], generate_response,
+                                         time.time() - shared_time, defer_generation, deadline)
+            for position in pending[key]:
+                results[position] = result
+        generation_done = time.time()
+
+        self.timings = {
+            'lookup': lookup_done - start_time,
+            'classification': analysis_done - lookup_done,
+            'generation': generation_done - analysis_done
+        }
+        return results
+
+    def persist_batch(self, emails_data: List[EmailCreate], results: List[ProcessingResult]) -> List[Tuple[Email, Classification]]:
+        """Grava emails, classificações, histórico e fingerprints com inserções em lote e um único commit"""
+        emails = [Email(**email_data.model_dump()) for email_data in emails_data]
+        self.db.add_all(emails)
+        self.db.flush()  # Obter IDs dos emails
+
+        classifications = [
+            Classification(
+                email_id=email.id,
+                category=result.category,
+                subcategory=result.subcategory,
+                confidence_score=result.confidence,
+                suggested_response=result.suggested_response,
+                processing_time=result.processing_time
+            )
+            for email, result in zip(emails, results)
+        ]
+        self.db.add_all(classifications)
+        self.db.flush()  # Obter IDs das classificações
+
+        historico_service = HistoricoService(self.db, autocommit=False)
+        if HISTORICO_WRITE_BEHIND:
+            for email, classification in zip(emails, classifications):
+                historico_service.log_email_created(email_id=email.id, classification_id=classification.id)
+        else:
+            self.db.add_all([
+                Historico(email_id=email.id, classification_id=classification.id, action_type=ActionType.CREATED)
+                for email, classification in zip(emails, classifications)
+            ])
+            increment_counts(self.db, HISTORICO_COUNTS, {ActionType.CREATED: len(emails)})
+        self.db.add_all([
+            EmailFingerprint(
+                email_id=email.id,
+                classification_id=classification.id,
+                simhash=_to_signed(result.fingerprint),
+                derived_from_email_id=result.derived_from_email_id,
+                similarity=result.similarity
+            )
+            for email, classification, result in zip(emails, classifications, results)
+            if result.fingerprint is not None
+        ])
+        self.db.commit()
+        historico_service.enqueue_pending()
+
+        # Apenas emails classificados do zero entram no índice de quase-duplicatas
+        for email, classification, result in zip(emails, classifications, results):
+            if result.fingerprint is not None and result.derived_from_email_id is None:
+                self.near_duplicate_service.index.add(email.id, classification.id, result.fingerprint)
+
+        return list(zip(emails, classifications))
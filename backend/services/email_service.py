@@ -1,17 +1,13 @@
-from sqlalchemy.orm import Session
 from models.email import Email
 from schemas.email import EmailCreate
+from .keyset_pagination import paginate
+from .session_service import SessionService
 from typing import List, Optional
 
-class EmailService:
-    def __init__(self, db: Session):
-        self.db = db
-
+class EmailService(SessionService):
     def create_email(self, email_data: EmailCreate) -> Email:
         db_email = Email(**email_data.model_dump())
-        self.db.add(db_email)
-        self.db.commit()
-        self.db.refresh(db_email)
+        self._save(db_email)
         return db_email
 
     def get_email(self, email_id: int) -> Optional[Email]:
@@ -20,10 +16,9 @@ class EmailService:
             Email.is_deleted == False
         ).first()
 
-    def get_emails(self, skip: int = 0, limit: int = 100) -> List[Email]:
-        return self.db.query(Email).filter(
-            Email.is_deleted == False
-        ).offset(skip).limit(limit).all()
+    def get_emails(self, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> List[Email]:
+        query = self.db.query(Email).filter(Email.is_deleted == False)
+        return paginate(query, Email.created_at, Email.id, cursor=cursor, skip=skip, limit=limit).all()
 
     def delete_email(self, email_id: int) -> bool:
         db_email = self.get_email(email_id)
@@ -2,6 +2,7 @@ import PyPDF2
 from typing import Optional
 import os
 import tempfile
+from .cpu_executor import CPU_PDF_TIMEOUT, extract_text_task, get_cpu_executor
 
 class FileService:
     def __init__(self):
@@ -26,6 +27,10 @@ class FileService:
             print(f"Erro ao extrair texto do arquivo: {e}")
             return None
 
+    async def aextract_text_from_file(self, file_content: bytes, filename: str) -> Optional[str]:
+        """Extrair texto no pool de CPU (PDFs grandes não travam o event loop)"""
+        return await get_cpu_executor().arun(extract_text_task, file_content, filename, timeout=CPU_PDF_TIMEOUT)
+
     def _extract_from_pdf(self, file_content: bytes) -> str:
         """Extrair texto de PDF usando PyPDF2"""
         try:
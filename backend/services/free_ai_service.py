@@ -1,9 +1,11 @@
+import asyncio
 import json
 import os
 import random
-from typing import Dict, Optional
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 import time
-from data.keywords import BUSINESS_TOPICS, UNPRODUCTIVE_CATEGORIES
+from config.database import SessionLocal
+from data.keywords import PERSONAL_RESPONSE_CATEGORIES
 from data.prompts import PRODUCTIVE_PROMPTS, UNPRODUCTIVE_PROMPTS
 from data.templates import (
     PRODUCTIVE_TEMPLATES, GENERIC_PRODUCTIVE_TEMPLATES,
@@ -12,77 +14,141 @@ from data.templates import (
 from data.ai_models import HUGGINGFACE_GENERATION_MODELS
 from .simple_context_classification import SimpleContextClassification
 from .hybrid_prompt_service import HybridPromptService
+from .keyword_automaton import KeywordHits, get_keyword_automaton
+from .nlp_service import NLPService
+from .email_analysis import EmailAnalysis
+from .linear_classifier import LINEAR_CLASSIFIER_MODE, combine_with_rules, get_linear_classifier
+from .generation_client import Deadline, GenerationAborted, GenerationError, get_generation_client
+from .generation_scheduler import get_hedged_scheduler
+from .model_health import get_model_health_tracker
+from .rate_limiter import get_rate_limiter
+from .response_cache_service import RESPONSE_CACHE_ENABLED, ResponseCacheService
+from .prompt_budget import PROMPT_BUDGET_ENABLED, apply_budget
+from .request_coalescer import GENERATION_COALESCING, get_request_coalescer, prompt_key
+
+def save_cached_response(prompt_template: str, email_content: str, suggested_response: str):
+    """Gravar no cache persistente com sessão própria (a da requisição pode já ter sido fechada)"""
+    db = SessionLocal()
+    try:
+        ResponseCacheService(db).set(prompt_template, email_content, suggested_response)
+    finally:
+        db.close()
 
 class FreeAIService:
     def __init__(self, db_session=None):
         # Sistema com análise de contexto inteligente
         self.context_classifier = SimpleContextClassification()
+        self.keyword_automaton = get_keyword_automaton()
+        self.nlp_service = NLPService()
+        self.linear_classifier = get_linear_classifier() if LINEAR_CLASSIFIER_MODE != 'off' else None
         self.prompt_service = HybridPromptService(db_session) if db_session else None
-        pass
+        # Respostas já geradas para o mesmo prompt e email (persistidas no banco)
+        self.response_cache = ResponseCacheService(db_session) if db_session and RESPONSE_CACHE_ENABLED else None
+
+    def analyze_email(self, email_content: str) -> EmailAnalysis:
+        """Analisar o email uma única vez: normalização, tokens, varreduras e classificação"""
+        return self.analyze_batch([email_content])[0]
+
+    def analyze_batch(self, email_contents: List[str]) -> List[EmailAnalysis]:
+        """Analisar vários emails; o classificador linear pontua todos em uma única chamada vetorizada"""
+        prepared = []
+        for email_content in email_contents:
+            normalized_text = email_content.lower()
+            tokens = self.nlp_service.tokenize_and_clean(self.nlp_service.preprocess_text(email_content))
+            pattern_scan = self.context_classifier.scan(normalized_text)
+            keyword_hits = self.keyword_automaton.search(normalized_text)
+            
+            # Usar análise de contexto por padrões
+            classification = self.context_classifier.classify_with_context(email_content, pattern_scan)
+            if not classification or classification.get('method') == 'fallback_keyword_analysis':
+                # Reserva para classificação por palavras-chave tradicional
+                classification = self._keyword_classification(email_content, time.time(), keyword_hits)
+            prepared.append((email_content, normalized_text, tokens, pattern_scan, keyword_hits, classification))
+        
+        # Camada treinável (TF-IDF + regressão logística) como primeira passada ou desempate
+        if self.linear_classifier is not None and prepared:
+            linear_results = self.linear_classifier.predict_tokens([item[2] for item in prepared])
+        else:
+            linear_results = [None] * len(prepared)
+        
+        return [
+            EmailAnalysis.build(
+                content=email_content,
+                normalized_text=normalized_text,
+                tokens=tokens,
+                features=self.nlp_service.features_from_tokens(tokens),
+                keyword_hits=keyword_hits,
+                pattern_scan=pattern_scan,
+                classification=combine_with_rules(classification, linear_result)
+            )
+            for (email_content, normalized_text, tokens, pattern_scan, keyword_hits, classification), linear_result
+            in zip(prepared, linear_results)
+        ]
 
     def classify_email_huggingface(self, email_content: str) -> Dict[str, any]:
         """Classificar email usando análise de contexto com fallback para palavras-chave"""
-        # Usar análise de contexto por padrões
-        context_result = self.context_classifier.classify_with_context(email_content)
-        if context_result and context_result.get('method') != 'fallback_keyword_analysis':
-            return context_result
+        return self.classify_only(email_content)
+
+    def classify_only(self, email_content: str) -> Dict[str, any]:
+        """
+        Caminho mínimo de classificação (sem análise completa para geração): a varredura de
+        palavras-chave só roda no fallback e a tokenização só quando o classificador linear está ativo.
+        """
+        pattern_scan = self.context_classifier.scan(email_content.lower())
+        classification = self.context_classifier.classify_with_context(email_content, pattern_scan)
+        if not classification or classification.get('method') == 'fallback_keyword_analysis':
+            classification = self._keyword_classification(email_content, time.time())
         
-        # Reserva para classificação por palavras-chave tradicional
-        return self._keyword_classification(email_content, time.time())
+        if self.linear_classifier is not None:
+            tokens = self.nlp_service.tokenize_and_clean(self.nlp_service.preprocess_text(email_content))
+            classification = combine_with_rules(classification, self.linear_classifier.predict_tokens([tokens])[0])
+        return classification
 
-    def _keyword_classification(self, email_content: str, start_time: float) -> Dict[str, any]:
+    def _keyword_classification(self, email_content: str, start_time: float, keyword_hits: KeywordHits = None) -> Dict[str, any]:
         """Classificação aprimorada baseada em palavras-chave"""
         content_lower = email_content.lower()
         
-        # Lista unificada para classificação geral
-        productive_keywords = []
-        for topic_keywords in BUSINESS_TOPICS.values():
-            productive_keywords.extend(topic_keywords)
-        
-        # Lista unificada para classificação geral
-        unproductive_keywords = []
-        for category_keywords in UNPRODUCTIVE_CATEGORIES.values():
-            unproductive_keywords.extend(category_keywords)
+        # Uma única passada do autômato encontra todas as palavras-chave
+        if keyword_hits is None:
+            keyword_hits = self.keyword_automaton.search(content_lower)
         
         # Detectar tópicos específicos (produtivos)
-        detected_topics = []
-        for topic, keywords in BUSINESS_TOPICS.items():
-            topic_matches = sum(1 for keyword in keywords if keyword in content_lower)
-            if topic_matches > 0:
-                detected_topics.append({
-                    'topic': topic,
-                    'matches': topic_matches,
-                    'keywords_found': [kw for kw in keywords if kw in content_lower]
-                })
+        detected_topics = [
+            {
+                'topic': topic,
+                'matches': topic_matches,
+                'keywords_found': keyword_hits.keywords_found('productive', topic)
+            }
+            for topic, topic_matches in keyword_hits.group_counts('productive').items()
+        ]
         
         # Detectar categorias improdutivas
-        detected_unproductive_categories = []
-        for category, keywords in UNPRODUCTIVE_CATEGORIES.items():
-            category_matches = sum(1 for keyword in keywords if keyword in content_lower)
-            if category_matches > 0:
-                detected_unproductive_categories.append({
-                    'category': category,
-                    'matches': category_matches,
-                    'keywords_found': [kw for kw in keywords if kw in content_lower]
-                })
+        detected_unproductive_categories = [
+            {
+                'category': category,
+                'matches': category_matches,
+                'keywords_found': keyword_hits.keywords_found('unproductive', category)
+            }
+            for category, category_matches in keyword_hits.group_counts('unproductive').items()
+        ]
         
         # Contar correspondências de palavras-chave
-        productive_count = sum(1 for keyword in productive_keywords if keyword in content_lower)
-        unproductive_count = sum(1 for keyword in unproductive_keywords if keyword in content_lower)
+        productive_count = sum(topic['matches'] for topic in detected_topics)
+        unproductive_count = sum(category['matches'] for category in detected_unproductive_categories)
         
         # Análise adicional de contexto para determinar importância empresarial
-        has_business_context = any(word in content_lower for word in ['@', 'empresa', 'company', 'business', 'corp', 'ltd'])
-        has_urgent_indicators = any(word in content_lower for word in ['urgente', 'urgent', 'asap', 'imediato', 'immediate', 'prioridade', 'priority'])
-        has_professional_tone = any(word in content_lower for word in ['prezado', 'dear', 'sr', 'sra', 'senhor', 'senhora', 'att', 'atenciosamente'])
-        has_meeting_indicators = any(word in content_lower for word in ['reunião', 'meeting', 'agenda', 'schedule', 'horário', 'time'])
-        has_project_indicators = any(word in content_lower for word in ['projeto', 'project', 'tarefa', 'task', 'deadline', 'prazo'])
+        has_business_context = keyword_hits.any_in('indicators', 'business_context')
+        has_urgent_indicators = keyword_hits.any_in('indicators', 'urgent')
+        has_professional_tone = keyword_hits.any_in('indicators', 'professional_tone')
+        has_meeting_indicators = keyword_hits.any_in('indicators', 'meeting')
+        has_project_indicators = keyword_hits.any_in('indicators', 'project')
         
         # Indicadores de spam/promoção
         has_exclamation = content_lower.count('!') > 3
         has_caps = sum(1 for c in email_content if c.isupper()) > len(email_content) * 0.3
-        has_links = 'http' in content_lower or 'www.' in content_lower
+        has_links = keyword_hits.any_in('indicators', 'links')
         is_short = len(email_content.split()) < 10
-        has_spam_indicators = any(word in content_lower for word in ['clique aqui', 'click here', 'não perca', 'última chance'])
+        has_spam_indicators = keyword_hits.any_in('indicators', 'spam')
         
         # Calcular pontuação baseada na importância empresarial
         business_importance_score = productive_count + (2 if has_business_context else 0) + (2 if has_urgent_indicators else 0) + (1 if has_professional_tone else 0) + (2 if has_meeting_indicators else 0) + (2 if has_project_indicators else 0)
@@ -121,50 +187,132 @@ class FreeAIService:
             'primary_unproductive_category': detected_unproductive_categories[0]['category'] if detected_unproductive_categories else None
         }
 
-    def generate_response(self, email_content: str, category: str) -> str:
+    def generate_response(self, email_content: str, category: str, analysis: EmailAnalysis = None,
+                          deadline: Deadline = None) -> str:
         """Gerar resposta usando abordagem baseada em modelos"""
+        if analysis is not None:
+            # Reutilizar a subcategoria já escolhida pelo classificador
+            return self._generate_for_subcategory(email_content, category, analysis.subcategory, deadline)
+        
+        keyword_hits = self.keyword_automaton.search(email_content.lower())
         if category == "Produtivo":
-            return self._generate_productive_response(email_content)
+            return self._generate_productive_response(email_content, keyword_hits, deadline)
         else:
-            return self._generate_unproductive_response(email_content)
+            return self._generate_unproductive_response(email_content, keyword_hits, deadline)
 
-    def _generate_productive_response(self, email_content: str) -> str:
-        """Gerar resposta profissional para emails produtivos baseada em tópicos detectados"""
+    def _generate_for_subcategory(self, email_content: str, category: str, subcategory: str,
+                                  deadline: Deadline = None) -> str:
+        """Gerar resposta a partir da subcategoria definida na classificação"""
+        prompt_template, fallback_templates = self._generation_plan(category, subcategory)
+        if prompt_template is None:
+            return random.choice(fallback_templates)
         
-        # Detectar tópicos para resposta específica
-        content_lower = email_content.lower()
+        # Tentar usar IA primeiro (se disponível)
+        ai_response = self._generate_with_ai(prompt_template, email_content, deadline)
+        if ai_response:
+            return ai_response
+        return random.choice(fallback_templates)
+
+    def _generation_plan(self, category: str, subcategory: str) -> Tuple[Optional[str], List[str]]:
+        """Prompt de geração da subcategoria (None se não houver) e modelos de reserva"""
+        if category == "Produtivo":
+            prompts, templates, generic_templates = PRODUCTIVE_PROMPTS, PRODUCTIVE_TEMPLATES, GENERIC_PRODUCTIVE_TEMPLATES
+        else:
+            prompts, templates, generic_templates = UNPRODUCTIVE_PROMPTS, UNPRODUCTIVE_TEMPLATES, GENERIC_UNPRODUCTIVE_TEMPLATES
+            # Categorias pessoais são direcionadas para o prompt de spam
+            if subcategory in PERSONAL_RESPONSE_CATEGORIES:
+                subcategory = 'spam_promotions'
         
-        # Detectar tópico principal e gerar resposta
-        for topic, keywords in BUSINESS_TOPICS.items():
-            if any(keyword in content_lower for keyword in keywords):
-                # Usar serviço híbrido para buscar prompt (banco > arquivos > genérico)
-                if self.prompt_service:
-                    prompt_template = self.prompt_service.get_prompt(topic, "generation")
-                else:
-                    # Reserva para arquivos locais se não houver serviço híbrido
-                    prompt_template = PRODUCTIVE_PROMPTS.get(topic, "")
-                
-                # Tentar usar IA primeiro (se disponível)
-                ai_response = self._generate_with_ai(prompt_template, email_content)
-                if ai_response:
-                    return ai_response
-                
-                # Reserva para modelos
-                if topic in PRODUCTIVE_TEMPLATES:
-                    responses = PRODUCTIVE_TEMPLATES[topic]
-                    return random.choice(responses)
+        if subcategory not in prompts and subcategory not in templates:
+            return None, generic_templates
+        
+        # Usar serviço híbrido para buscar prompt (banco > arquivos > genérico)
+        if self.prompt_service:
+            prompt_template = self.prompt_service.get_prompt(subcategory, "generation")
+        else:
+            prompt_template = prompts.get(subcategory, "")
+        return prompt_template, templates.get(subcategory, generic_templates)
+
+    def astream_response(self, email_content: str, category: str, subcategory: str,
+                         deadline: Deadline = None, use_cache: bool = True) -> AsyncIterator[str]:
+        """
+        Gerar resposta em streaming (trechos de texto à medida que chegam do modelo).
+
+        O prompt e o cache persistente são consultados na chamada, enquanto a sessão do banco
+        ainda está aberta; sem IA disponível, o modelo de reserva é emitido de uma vez.
+        """
+        prompt_template, fallback_templates = self._generation_plan(category, subcategory)
+        cached = None
+        if prompt_template is not None and use_cache and self.response_cache:
+            cached = self.response_cache.get(prompt_template, email_content)
+
+        async def chunks():
+            if cached:
+                yield cached
+                return
+            parts = []
+            outcome = {'complete': False}
+            if prompt_template is not None:
+                try:
+                    formatted_prompt = self._format_prompt(prompt_template, email_content)
+                except Exception as e:
+                    print(f"Erro na geração de IA gratuita: {e}")
+                    formatted_prompt = None
+                if formatted_prompt:
+                    async for chunk in self._astream_huggingface_generation(formatted_prompt, deadline, outcome):
+                        parts.append(chunk)
+                        yield chunk
+            if not parts:
+                yield random.choice(fallback_templates)
+            elif self.response_cache and outcome['complete']:
+                # Texto parcial (falha ou prazo no meio do streaming) não entra no cache
+                await asyncio.to_thread(
+                    save_cached_response, prompt_template, email_content, "".join(parts).strip()
+                )
+
+        return chunks()
+
+    def _generate_productive_response(self, email_content: str, keyword_hits: KeywordHits, deadline: Deadline = None) -> str:
+        """Gerar resposta profissional para emails produtivos baseada em tópicos detectados"""
+        
+        # Detectar tópico principal e gerar resposta (tópicos já vêm na ordem de BUSINESS_TOPICS)
+        for topic in keyword_hits.group_counts('productive'):
+            # Usar serviço híbrido para buscar prompt (banco > arquivos > genérico)
+            if self.prompt_service:
+                prompt_template = self.prompt_service.get_prompt(topic, "generation")
+            else:
+                # Reserva para arquivos locais se não houver serviço híbrido
+                prompt_template = PRODUCTIVE_PROMPTS.get(topic, "")
+            
+            # Tentar usar IA primeiro (se disponível)
+            ai_response = self._generate_with_ai(prompt_template, email_content, deadline)
+            if ai_response:
+                return ai_response
+            
+            # Reserva para modelos
+            if topic in PRODUCTIVE_TEMPLATES:
+                responses = PRODUCTIVE_TEMPLATES[topic]
+                return random.choice(responses)
         
         # Modelos corporativos genéricos
         return random.choice(GENERIC_PRODUCTIVE_TEMPLATES)
 
-    def _generate_with_ai(self, prompt_template: str, email_content: str) -> str:
+    def _generate_with_ai(self, prompt_template: str, email_content: str, deadline: Deadline = None) -> str:
         """Gerar resposta usando serviços de IA gratuitos (Hugging Face)"""
         try:
             # Formatar prompt com o conteúdo do email
-            formatted_prompt = prompt_template.format(email_content=email_content)
+            formatted_prompt = self._format_prompt(prompt_template, email_content)
             
-            # Tentar Hugging Face primeiro (gratuito)
-            hf_response = self._try_huggingface_generation(formatted_prompt)
+            # Tentar Hugging Face primeiro (gratuito); chamadas concorrentes com o mesmo prompt
+            # (emails idênticos de uma campanha) compartilham uma única chamada ao modelo
+            if GENERATION_COALESCING:
+                hf_response = get_request_coalescer().run(
+                    prompt_key(formatted_prompt),
+                    lambda: self._generate_cached(prompt_template, email_content, formatted_prompt, deadline),
+                    deadline
+                )
+            else:
+                hf_response = self._generate_cached(prompt_template, email_content, formatted_prompt, deadline)
             if hf_response:
                 return hf_response
                  
@@ -174,123 +322,179 @@ class FreeAIService:
         except Exception as e:
             print(f"Erro na geração de IA gratuita: {e}")
             return None
- 
-    def _try_huggingface_generation(self, prompt: str) -> str:
+
+    def _format_prompt(self, prompt_template: str, email_content: str) -> str:
+        """Formatar o prompt com o email reduzido ao orçamento de entrada (sem histórico citado e assinatura)"""
+        if PROMPT_BUDGET_ENABLED:
+            email_content = apply_budget(email_content).content
+        return prompt_template.format(email_content=email_content)
+
+    def _generate_cached(self, prompt_template: str, email_content: str, formatted_prompt: str,
+                         deadline: Deadline = None) -> Optional[str]:
+        """Resposta do cache persistente ou gerada agora (apenas respostas da IA são gravadas)"""
+        if self.response_cache:
+            cached = self.response_cache.get(prompt_template, email_content)
+            if cached:
+                return cached
+        
+        hf_response = self._try_huggingface_generation(formatted_prompt, deadline)
+        if hf_response and self.response_cache:
+            self.response_cache.set(prompt_template, email_content, hf_response)
+        return hf_response
+
+    def _try_huggingface_generation(self, prompt: str, deadline: Deadline = None) -> str:
         """Tentar gerar resposta usando modelos gratuitos do Hugging Face"""
+        # Cliente compartilhado pelo processo (None sem HF_TOKEN)
+        client = get_generation_client()
+        if client is None:
+            return None
+        
+        # Modelos com circuito aberto são pulados; degradados vão para o fim da fila
+        models = get_model_health_tracker().order(HUGGINGFACE_GENERATION_MODELS)
+        if not models:
+            print(" Todos os modelos de geração estão com o circuito aberto")
+            return None
+        
+        # Modelos em ordem de preferência, com hedge para os seguintes quando o atual demora
         try:
-            # Verificar se temos token
-            hf_token = os.getenv("HF_TOKEN")
-            if not hf_token:
-                return None
-            
-            # Importação dinâmica para evitar erros de linter
-            try:
-                from openai import OpenAI  # type: ignore
-            except ImportError:
-                print(" Biblioteca 'openai' não instalada")
-                return None
-                
-            client = OpenAI(
-                base_url="https://router.huggingface.co/v1",
-                api_key=hf_token
+            result = get_hedged_scheduler().run(
+                models,
+                lambda model: self._call_model(client, model, prompt, deadline),
+                deadline
             )
-            
-            # Tentar diferentes modelos até encontrar um que funcione
-            for model in HUGGINGFACE_GENERATION_MODELS:
-                try:
-                    response = client.chat.completions.create(
-                        model=model,
-                        messages=[{"role": "user", "content": prompt}],
-                        max_tokens=500,  # Balanceado para evitar limites de taxa
-                        temperature=0.7
-                    )
-                    
-                    result = response.choices[0].message.content.strip()
-                    # print(f"Resposta gerada com sucesso usando modelo: {model}")  # Log reduzido
-                    return result
-                    
-                except Exception as e:
-                    error_msg = str(e).lower()
-                    if "rate limit" in error_msg or "429" in error_msg:
-                        # print(f"Limite de taxa atingido para {model}. Tentando com menos tokens...")  # Log reduzido
-                        # Tentar com menos tokens em caso de limite de taxa
-                        try:
-                            response = client.chat.completions.create(
-                                model=model,
-                                messages=[{"role": "user", "content": prompt}],
-                                max_tokens=200,  # Reserva para menos tokens
-                                temperature=0.7
-                            )
-                            result = response.choices[0].message.content.strip()
-                            # print(f"Resposta gerada com sucesso (reserva) usando modelo: {model}")  # Log reduzido
-                            return result
-                        except Exception as fallback_error:
-                            print(f" Reserva também falhou para {model}: {fallback_error}")
-                    else:
-                        print(f" Modelo {model} falhou: {e}")
-                    continue
-            
+        except GenerationAborted as e:
+            # Prazo esgotado ou geração descartada pelo limitador de taxa: usar template
+            print(f" Geração interrompida: {e}")
+            return None
+        
+        if not result:
             # Se nenhum modelo funcionar
             print(" Todos os modelos de geração do Hugging Face falharam")
-            return None
-            
-        except Exception as e:
-            print(f"Geração do Hugging Face falhou: {e}")
-            return None
-
+        return result
 
-    def _generate_unproductive_response(self, email_content: str) -> str:
-        """Gerar resposta corporativa educada mas firme para emails improdutivos baseada em categorias detectadas"""
+    def _call_model(self, client, model: str, prompt: str, deadline: Deadline = None) -> str:
+        """Uma tentativa em um modelo, dentro do limite de taxa do provedor"""
+        health = get_model_health_tracker()
+        if not health.acquire(model):
+            raise GenerationError("Circuito aberto", model)
         
-        # Detectar categoria improdutiva específica
-        content_lower = email_content.lower()
+        rate_limiter = get_rate_limiter()
+        start_time = time.time()
+        try:
+            # Espera na fila (ou descarte) e max_tokens conforme a folga do limite de taxa
+            config = rate_limiter.generation_config(rate_limiter.acquire(deadline))
+            start_time = time.time()
+            result = client.complete(
+                model, prompt, max_tokens=config['max_tokens'], temperature=config['temperature'], deadline=deadline
+            )
+        except GenerationAborted:
+            health.release(model)
+            raise
+        except GenerationError as e:
+            if e.rate_limited:
+                # Aprender o limite do provedor em vez de repetir a chamada
+                rate_limiter.on_rate_limited(e.retry_after)
+            health.record_failure(model, time.time() - start_time, str(e), e.rate_limited, e.retry_after)
+            raise
+        except Exception:
+            # Erro inesperado: não deixar a sondagem do circuito presa como "em andamento"
+            health.release(model)
+            raise
+        rate_limiter.on_success()
+        health.record_success(model, time.time() - start_time)
+        return result
+
+    async def _astream_huggingface_generation(self, prompt: str, deadline: Deadline = None,
+                                              outcome: Dict[str, bool] = None) -> AsyncIterator[str]:
+        """
+        Streaming nos modelos de geração, um por vez e sem hedge: o primeiro trecho já foi
+        entregue ao cliente, então só há troca de modelo enquanto nada foi emitido.
+        `outcome['complete']` fica True só quando um modelo terminou a resposta normalmente.
+        """
+        client = get_generation_client()
+        if client is None:
+            return
         
-        # Primeiro, verificar se é uma das categorias pessoais
-        personal_categories = {
-            'personal_associations': ['bombeiros', 'associação', 'clube', 'igreja', 'paróquia', 'ong', 'fundação'],
-            'personal_services': ['seguro de carro', 'seguro de casa', 'consórcio', 'financiamento pessoal'],
-            'local_services': ['prefeitura', 'câmara municipal', 'secretaria municipal'],
-            'personal_payments': ['pagamento de multa', 'pagamento de ipva', 'pagamento de iptu', 'condomínio']
-        }
+        health = get_model_health_tracker()
+        rate_limiter = get_rate_limiter()
+        for model in health.order(HUGGINGFACE_GENERATION_MODELS):
+            if not health.acquire(model):
+                continue
+            emitted = False
+            start_time = time.time()
+            try:
+                config = rate_limiter.generation_config(await rate_limiter.aacquire(deadline))
+                start_time = time.time()
+                async for chunk in client.astream(
+                    model, prompt, max_tokens=config['max_tokens'], temperature=config['temperature'], deadline=deadline
+                ):
+                    emitted = True
+                    yield chunk
+            except (GenerationAborted, asyncio.CancelledError, GeneratorExit) as e:
+                # Prazo esgotado, descarte pelo limitador ou cliente desconectado
+                health.release(model)
+                if not isinstance(e, GenerationAborted):
+                    raise
+                print(f" Geração interrompida: {e}")
+                return
+            except GenerationError as e:
+                if e.rate_limited:
+                    rate_limiter.on_rate_limited(e.retry_after)
+                health.record_failure(model, time.time() - start_time, str(e), e.rate_limited, e.retry_after)
+                print(f" Modelo {model} falhou: {e}")
+                if emitted:
+                    # Trechos já entregues não podem ser desfeitos: o texto parcial é mantido
+                    return
+                continue
+            except Exception:
+                health.release(model)
+                raise
+            rate_limiter.on_success()
+            health.record_success(model, time.time() - start_time)
+            if outcome is not None:
+                outcome['complete'] = True
+            return
+        print(" Todos os modelos de geração do Hugging Face falharam")
+
+    def _generate_unproductive_response(self, email_content: str, keyword_hits: KeywordHits, deadline: Deadline = None) -> str:
+        """Gerar resposta corporativa educada mas firme para emails improdutivos baseada em categorias detectadas"""
         
-        # Verificar categorias pessoais primeiro
-        for category, keywords in personal_categories.items():
-            if any(keyword in content_lower for keyword in keywords):
-                # Direcionar para prompt de spam para categorias pessoais
-                if self.prompt_service:
-                    prompt_template = self.prompt_service.get_prompt('spam_promotions', "generation")
-                else:
-                    prompt_template = UNPRODUCTIVE_PROMPTS.get('spam_promotions', "")
-                
-                # Tentar usar IA primeiro (se disponível)
-                ai_response = self._generate_with_ai(prompt_template, email_content)
-                if ai_response:
-                    return ai_response
-                
-                # Reserva para modelos de spam
-                if 'spam_promotions' in UNPRODUCTIVE_TEMPLATES:
-                    templates = UNPRODUCTIVE_TEMPLATES['spam_promotions']
-                    return random.choice(templates)
+        # Primeiro, verificar se é uma das categorias pessoais (PERSONAL_RESPONSE_CATEGORIES)
+        for category in keyword_hits.group_counts('personal'):
+            # Direcionar para prompt de spam para categorias pessoais
+            if self.prompt_service:
+                prompt_template = self.prompt_service.get_prompt('spam_promotions', "generation")
+            else:
+                prompt_template = UNPRODUCTIVE_PROMPTS.get('spam_promotions', "")
+            
+            # Tentar usar IA primeiro (se disponível)
+            ai_response = self._generate_with_ai(prompt_template, email_content, deadline)
+            if ai_response:
+                return ai_response
+            
+            # Reserva para modelos de spam
+            if 'spam_promotions' in UNPRODUCTIVE_TEMPLATES:
+                templates = UNPRODUCTIVE_TEMPLATES['spam_promotions']
+                return random.choice(templates)
         
         # Depois, verificar categorias improdutivas tradicionais
-        for category, keywords in UNPRODUCTIVE_CATEGORIES.items():
-            if any(keyword in content_lower for keyword in keywords):
-                # Usar serviço híbrido para buscar prompt (banco > arquivos > genérico)
-                if self.prompt_service:
-                    prompt_template = self.prompt_service.get_prompt(category, "generation")
-                else:
-                    # Reserva para arquivos locais se não houver serviço híbrido
-                    prompt_template = UNPRODUCTIVE_PROMPTS.get(category, "")
-                
-                # Tentar usar IA primeiro (se disponível)
-                ai_response = self._generate_with_ai(prompt_template, email_content)
-                if ai_response:
-                    return ai_response
-                
-                # Reserva para modelos específicos
-                if category in UNPRODUCTIVE_TEMPLATES:
-                    templates = UNPRODUCTIVE_TEMPLATES[category]
-                    return random.choice(templates)
+        for category in keyword_hits.group_counts('unproductive'):
+            # Usar serviço híbrido para buscar prompt (banco > arquivos > genérico)
+            if self.prompt_service:
+                prompt_template = self.prompt_service.get_prompt(category, "generation")
+            else:
+                # Reserva para arquivos locais se não houver serviço híbrido
+                prompt_template = UNPRODUCTIVE_PROMPTS.get(category, "")
+            
+            # Tentar usar IA primeiro (se disponível)
+            ai_response = self._generate_with_ai(prompt_template, email_content, deadline)
+            if ai_response:
+                return ai_response
+            
+            # Reserva para modelos específicos
+            if category in UNPRODUCTIVE_TEMPLATES:
+                templates = UNPRODUCTIVE_TEMPLATES[category]
+                return random.choice(templates)
         
         # Modelos genéricos para emails improdutivos não categorizados
         return random.choice(GENERIC_UNPRODUCTIVE_TEMPLATES)
@@ -0,0 +1,199 @@
+"""
+Cliente de geração compartilhado pelo processo (API compatível com OpenAI, Hugging Face Router)
+Conexões HTTP reaproveitadas (keep-alive), timeouts de conexão/leitura e prazo total por requisição
+"""
+
+import asyncio
+import os
+import time
+from functools import lru_cache
+from typing import AsyncIterator, Optional
+from data.ai_models.huggingface_models import HUGGINGFACE_DEFAULT_CONFIG
+
+try:
+    import httpx  # type: ignore
+    from openai import OpenAI, AsyncOpenAI, APIStatusError, APITimeoutError, APIConnectionError  # type: ignore
+except ImportError:
+    httpx = None
+    OpenAI = AsyncOpenAI = None
+
+# Permite apontar para um servidor local compatível (ex.: stub_llm_server.py)
+HF_BASE_URL = os.getenv("HF_BASE_URL", HUGGINGFACE_DEFAULT_CONFIG["base_url"])
+GENERATION_CONNECT_TIMEOUT = float(os.getenv("GENERATION_CONNECT_TIMEOUT", 3))
+GENERATION_READ_TIMEOUT = float(os.getenv("GENERATION_READ_TIMEOUT", 20))
+GENERATION_POOL_SIZE = int(os.getenv("GENERATION_POOL_SIZE", 20))
+GENERATION_KEEPALIVE_EXPIRY = float(os.getenv("GENERATION_KEEPALIVE_EXPIRY", 30))
+# Prazo total padrão da geração dentro de uma requisição (todas as tentativas somadas)
+GENERATION_DEADLINE = float(os.getenv("GENERATION_DEADLINE", 30))
+
+
+class Deadline:
+    """Prazo absoluto (relógio monotônico) repassado da requisição até a chamada HTTP"""
+
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+
+    @classmethod
+    def after(cls, seconds: Optional[float] = None) -> 'Deadline':
+        return cls(GENERATION_DEADLINE if seconds is None else seconds)
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+class GenerationError(Exception):
+    """Falha de uma chamada de geração; status_code/retry_after vêm da resposta HTTP quando existem"""
+
+    def __init__(self, message: str, model: str = None, status_code: int = None, retry_after: float = None):
+        super().__init__(message)
+        self.model = model
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def rate_limited(self) -> bool:
+        return self.status_code == 429
+
+
+class GenerationAborted(GenerationError):
+    """Interrompe todas as tentativas da geração (não é falha do modelo)"""
+
+
+class DeadlineExceeded(GenerationAborted):
+    pass
+
+
+def _retry_after(headers) -> Optional[float]:
+    value = headers.get("retry-after") if headers is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class GenerationClient:
+    """
+    Clientes síncrono e assíncrono sobre pools httpx persistentes.
+
+    Os clientes OpenAI são criados uma vez por processo com `max_retries=0`: tentativas
+    e troca de modelo ficam a cargo do FreeAIService.
+    """
+
+    def __init__(self, api_key: str, base_url: str = HF_BASE_URL,
+                 connect_timeout: float = GENERATION_CONNECT_TIMEOUT,
+                 read_timeout: float = GENERATION_READ_TIMEOUT,
+                 pool_size: int = GENERATION_POOL_SIZE,
+                 keepalive_expiry: float = GENERATION_KEEPALIVE_EXPIRY):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.limits = httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.client = OpenAI(
+            base_url=base_url,
+            api_key=api_key,
+            max_retries=0,
+            timeout=self._timeout(),
+            http_client=httpx.Client(limits=self.limits, timeout=self._timeout())
+        )
+        self._async_client = None
+        self._async_loop = None
+
+    @property
+    def async_client(self):
+        """Cliente assíncrono criado sob demanda; o pool httpx pertence ao event loop atual"""
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            self._async_loop = loop
+            self._async_client = AsyncOpenAI(
+                base_url=self.base_url,
+                api_key=self.api_key,
+                max_retries=0,
+                timeout=self._timeout(),
+                http_client=httpx.AsyncClient(limits=self.limits, timeout=self._timeout())
+            )
+        return self._async_client
+
+    def _timeout(self, deadline: Deadline = None):
+        """Timeouts da chamada limitados pelo tempo que resta no prazo da requisição"""
+        if deadline is None:
+            return httpx.Timeout(self.read_timeout, connect=self.connect_timeout)
+        remaining = deadline.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded("Prazo da requisição esgotado antes da chamada")
+        return httpx.Timeout(min(self.read_timeout, remaining), connect=min(self.connect_timeout, remaining))
+
+    @staticmethod
+    def _request(model: str, prompt: str, max_tokens: int, temperature: float):
+        return {
+            'model': model,
+            'messages': [{"role": "user", "content": prompt}],
+            'max_tokens': max_tokens,
+            'temperature': temperature
+        }
+
+    @staticmethod
+    def _error(e: Exception, model: str) -> GenerationError:
+        if isinstance(e, APIStatusError):
+            return GenerationError(str(e), model, e.status_code, _retry_after(e.response.headers))
+        if isinstance(e, APITimeoutError):
+            return GenerationError(f"Timeout: {e}", model)
+        if isinstance(e, APIConnectionError):
+            return GenerationError(f"Falha de conexão: {e}", model)
+        return GenerationError(str(e), model)
+
+    def complete(self, model: str, prompt: str, max_tokens: int = HUGGINGFACE_DEFAULT_CONFIG["max_tokens"],
+                 temperature: float = HUGGINGFACE_DEFAULT_CONFIG["temperature"], deadline: Deadline = None) -> str:
+        try:
+            response = self.client.chat.completions.create(
+                **self._request(model, prompt, max_tokens, temperature),
+                timeout=self._timeout(deadline)
+            )
+        except GenerationError:
+            raise
+        except Exception as e:
+            raise self._error(e, model) from e
+        return response.choices[0].message.content.strip()
+
+    async def astream(self, model: str, prompt: str, max_tokens: int = HUGGINGFACE_DEFAULT_CONFIG["max_tokens"],
+                      temperature: float = HUGGINGFACE_DEFAULT_CONFIG["temperature"],
+                      deadline: Deadline = None) -> AsyncIterator[str]:
+        """Geração em streaming: produz os trechos de texto à medida que o modelo os envia"""
+        timeout = self._timeout(deadline)
+        try:
+            stream = await self.async_client.chat.completions.create(
+                **self._request(model, prompt, max_tokens, temperature),
+                stream=True,
+                timeout=timeout
+            )
+            async with stream:
+                async for chunk in stream:
+                    # O timeout httpx vale por leitura; o prazo total é conferido a cada trecho
+                    if deadline is not None and deadline.expired:
+                        raise DeadlineExceeded("Prazo da requisição esgotado", model)
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+        except GenerationError:
+            raise
+        except Exception as e:
+            raise self._error(e, model) from e
+
+
+@lru_cache(maxsize=1)
+def get_generation_client() -> Optional[GenerationClient]:
+    """Cliente do processo (None sem HF_TOKEN ou sem a biblioteca 'openai')"""
+    hf_token = os.getenv("HF_TOKEN")
+    if not hf_token:
+        return None
+    if OpenAI is None:
+        print(" Biblioteca 'openai' não instalada")
+        return None
+    return GenerationClient(api_key=hf_token)
@@ -0,0 +1,172 @@
+"""
+Geração assíncrona de respostas sugeridas
+A classificação é devolvida imediatamente; um pool de workers gera a resposta, grava em
+Classification.suggested_response e publica o estado do job (consulta por polling ou SSE)
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+from config.database import SessionLocal
+from .ai_service import AIService
+from .classification_service import ClassificationService
+from .classification_cache import get_classification_cache
+from .email_analysis import EmailAnalysis
+from .generation_client import Deadline
+from .redis_client import InMemoryRedis, get_redis_client
+
+ASYNC_GENERATION = os.getenv("ASYNC_GENERATION", "False").lower() == "true"
+GENERATION_WORKERS = int(os.getenv("GENERATION_WORKERS", 4))
+GENERATION_JOB_TTL = int(os.getenv("GENERATION_JOB_TTL", 3600))  # 1 hora
+
+# Estados do job
+PENDING = "pending"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+FINISHED_STATES = (COMPLETED, FAILED)
+
+
+class GenerationJobService:
+    """
+    Fila de geração de respostas.
+
+    O estado dos jobs fica no Redis quando REDIS_URL está configurado (visível para todos os
+    workers da API) e em memória caso contrário.
+    """
+
+    KEY_PREFIX = "autou:generation_job:"
+
+    def __init__(self, workers: int = GENERATION_WORKERS, store=None):
+        self.store = store or InMemoryRedis()
+        self.workers = workers
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        # Encerramento em andamento: jobs ainda na fila não começam e são marcados como falhos
+        self._closing = threading.Event()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self._stats_lock = threading.Lock()
+
+    def _count(self, counter: str):
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="generation")
+            return self._executor
+
+    def _fail(self, job: Dict[str, Any], error: str):
+        job.update(status=FAILED, error=error, finished_at=time.time())
+        self._count('failed')
+        self._save(job)
+
+    def _save(self, job: Dict[str, Any]):
+        try:
+            self.store.set(self.KEY_PREFIX + job['id'], json.dumps(job, ensure_ascii=False), ex=GENERATION_JOB_TTL)
+        except Exception as e:
+            print(f"Erro ao gravar estado do job de geração: {e}")
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            raw = self.store.get(self.KEY_PREFIX + job_id)
+        except Exception as e:
+            print(f"Erro ao ler estado do job de geração: {e}")
+            return None
+        return json.loads(raw) if raw is not None else None
+
+    def submit(self, classification_ids: List[int], email_content: str, category: str,
+               analysis: EmailAnalysis = None, cache_key: str = None) -> str:
+        """
+        Enfileira a geração da resposta de classificações já gravadas (emails de mesmo conteúdo
+        compartilham um único job); retorna o id do job
+        """
+        job = {
+            'id': uuid.uuid4().hex,
+            'classification_ids': list(classification_ids),
+            'status': PENDING,
+            'suggested_response': None,
+            'error': None,
+            'created_at': time.time(),
+            'finished_at': None
+        }
+        self._save(job)
+        self._count('submitted')
+        try:
+            self._get_executor().submit(self._run, job, email_content, category, analysis, cache_key)
+        except RuntimeError as e:
+            # Pool já encerrado (API em encerramento)
+            self._fail(job, f"Geração não enfileirada: {e}")
+        return job['id']
+
+    def _run(self, job: Dict[str, Any], email_content: str, category: str,
+             analysis: Optional[EmailAnalysis], cache_key: Optional[str]):
+        if self._closing.is_set():
+            self._fail(job, "API encerrada antes do início da geração")
+            return
+        job['status'] = RUNNING
+        self._save(job)
+
+        # Sessão própria: a sessão da requisição já foi fechada
+        db = SessionLocal()
+        try:
+            suggested_response = AIService(db).generate_response(email_content, category, analysis, Deadline.after())
+            classification_service = ClassificationService(db)
+            for classification_id in job['classification_ids']:
+                classification_service.update_suggested_response(classification_id, suggested_response)
+
+            if cache_key and analysis is not None:
+                get_classification_cache().set(cache_key, {
+                    'classification': analysis.to_result(),
+                    'subcategory': analysis.subcategory,
+                    'suggested_response': suggested_response
+                })
+
+            job.update(status=COMPLETED, suggested_response=suggested_response)
+            self._count('completed')
+        except Exception as e:
+            print(f"Erro na geração assíncrona (classificações {job['classification_ids']}): {e}")
+            db.rollback()
+            job.update(status=FAILED, error=str(e))
+            self._count('failed')
+        finally:
+            db.close()
+            job['finished_at'] = time.time()
+            self._save(job)
+
+    def shutdown(self):
+        """
+        Encerra o pool (chamado no encerramento da API): gerações em andamento terminam e são
+        gravadas; jobs ainda na fila são marcados como falhos em vez de ficarem pendentes
+        """
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+            self._closing.set()
+        try:
+            if executor is not None:
+                executor.shutdown(wait=True)
+        finally:
+            self._closing.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'failed': self.failed,
+            'in_flight': self.submitted - self.completed - self.failed,
+            'shared_store': not isinstance(self.store, InMemoryRedis)
+        }
+
+
+@lru_cache(maxsize=1)
+def get_generation_job_service() -> GenerationJobService:
+    """Fila de geração do processo (estado compartilhado via Redis quando disponível)"""
+    return GenerationJobService(store=get_redis_client())
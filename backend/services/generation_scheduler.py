@@ -0,0 +1,154 @@
+"""
+Requisições com hedge entre os modelos de geração
+Começa pelo modelo preferido; se não houver resposta dentro do atraso de hedge, dispara o
+próximo da lista em paralelo. A primeira resposta válida vence e as demais são canceladas.
+"""
+
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from data.ai_models import HUGGINGFACE_GENERATION_MODELS
+from .generation_client import Deadline, DeadlineExceeded, GenerationAborted, GenerationError
+
+# Espera (s) pela resposta do modelo atual antes de disparar o próximo em paralelo
+GENERATION_HEDGE_DELAY = float(os.getenv("GENERATION_HEDGE_DELAY", 2.0))
+# Máximo de chamadas simultâneas para uma mesma geração
+GENERATION_MAX_PARALLEL = int(os.getenv("GENERATION_MAX_PARALLEL", 3))
+# Máximo de chamadas em andamento por modelo no processo (evita provocar mais 429)
+GENERATION_MODEL_CONCURRENCY = int(os.getenv("GENERATION_MODEL_CONCURRENCY", 4))
+
+
+class HedgedScheduler:
+    """
+    Escalonador de tentativas entre modelos.
+
+    Falhas disparam o próximo modelo imediatamente (como o laço sequencial anterior); lentidão
+    dispara após `hedge_delay`. Modelos sem vaga no limite de concorrência são pulados.
+    """
+
+    def __init__(self, hedge_delay: float = GENERATION_HEDGE_DELAY, max_parallel: int = GENERATION_MAX_PARALLEL,
+                 model_concurrency: int = GENERATION_MODEL_CONCURRENCY):
+        self.hedge_delay = hedge_delay
+        self.max_parallel = max(1, max_parallel)
+        self.model_concurrency = model_concurrency
+        self._slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._slots_lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(
+            max_workers=max(4, model_concurrency * len(HUGGINGFACE_GENERATION_MODELS)),
+            thread_name_prefix="generation-hedge"
+        )
+        self.stats = {'requests': 0, 'hedges': 0, 'cancelled': 0, 'saturated_skips': 0, 'failures': 0, 'wins': {}}
+        self._in_flight: Dict[str, int] = {}
+        self._stats_lock = threading.Lock()
+
+    def _slot(self, model: str) -> threading.BoundedSemaphore:
+        with self._slots_lock:
+            if model not in self._slots:
+                self._slots[model] = threading.BoundedSemaphore(self.model_concurrency)
+            return self._slots[model]
+
+    def _track(self, model: str, amount: int):
+        with self._stats_lock:
+            self._in_flight[model] = self._in_flight.get(model, 0) + amount
+
+    def _count(self, key: str, amount: int = 1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def _win(self, model: str):
+        with self._stats_lock:
+            self.stats['wins'][model] = self.stats['wins'].get(model, 0) + 1
+
+    def _next_model(self, remaining: List[str]) -> Optional[str]:
+        """Retira da fila o próximo modelo com vaga livre (reserva a vaga)"""
+        while remaining:
+            model = remaining.pop(0)
+            if self._slot(model).acquire(blocking=False):
+                self._track(model, 1)
+                return model
+            self._count('saturated_skips')
+        return None
+
+    def _release(self, model: str):
+        self._track(model, -1)
+        self._slot(model).release()
+
+    def _guarded(self, call: Callable[[str], str], model: str) -> str:
+        try:
+            return call(model)
+        finally:
+            self._release(model)
+
+    def run(self, models: Sequence[str], call: Callable[[str], str], deadline: Deadline = None) -> Optional[str]:
+        """Executa `call(model)` com hedge; retorna o primeiro texto não vazio ou None"""
+        self._count('requests')
+        remaining = list(models)
+        pending = {}
+
+        def launch() -> bool:
+            model = self._next_model(remaining)
+            if model is None:
+                return False
+            pending[self.executor.submit(self._guarded, call, model)] = model
+            return True
+
+        try:
+            if not launch():
+                print(" Todos os modelos de geração estão no limite de concorrência")
+            while pending:
+                timeout = self.hedge_delay if len(pending) < self.max_parallel and remaining else None
+                if deadline is not None:
+                    timeout = deadline.remaining() if timeout is None else min(timeout, deadline.remaining())
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+                if not done:
+                    if deadline is not None and deadline.expired:
+                        raise DeadlineExceeded("Prazo da requisição esgotado")
+                    # Sem resposta dentro do atraso: disparar o próximo modelo em paralelo
+                    if launch():
+                        self._count('hedges')
+                    continue
+
+                for future in done:
+                    model = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except GenerationAborted:
+                        raise
+                    except GenerationError as e:
+                        print(f" Modelo {model} falhou: {e}")
+                        self._count('failures')
+                        continue
+                    if result:
+                        self._win(model)
+                        return result
+
+                # Falha: substituir imediatamente pelo próximo modelo
+                if len(pending) < self.max_parallel:
+                    launch()
+            return None
+        finally:
+            # Chamadas perdedoras: canceladas se ainda não começaram; as em andamento terminam
+            # sozinhas (resultado descartado) e liberam a vaga do modelo ao final
+            for future in pending:
+                if future.cancel():
+                    self._release(pending[future])
+                self._count('cancelled')
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self.stats, wins=dict(self.stats['wins']))
+        stats.update(
+            hedge_delay=self.hedge_delay,
+            max_parallel=self.max_parallel,
+            model_concurrency=self.model_concurrency,
+            in_flight=dict(self._in_flight)
+        )
+        return stats
+
+
+@lru_cache(maxsize=1)
+def get_hedged_scheduler() -> HedgedScheduler:
+    return HedgedScheduler()
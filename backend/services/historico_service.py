@@ -3,17 +3,22 @@ from sqlalchemy import desc
 from models.historico import Historico, ActionType
 from schemas.historico import HistoricoCreate, HistoricoWithDetails
 from typing import List, Optional
+from .historico_writer import HISTORICO_WRITE_BEHIND, get_historico_writer
+from .keyset_pagination import paginate
+from .record_count_service import HISTORICO_COUNTS, increment_counts
+from .session_service import SessionService
 
-class HistoricoService:
-    def __init__(self, db: Session):
-        self.db = db
+class HistoricoService(SessionService):
+    def __init__(self, db: Session, autocommit: bool = True):
+        super().__init__(db, autocommit)
+        # Eventos aguardando o commit de quem chamou para entrar na fila de gravação
+        self.pending: List[dict] = []
 
     def create_historico(self, historico_data: HistoricoCreate) -> Historico:
         """Cria um novo registro no histórico"""
         db_historico = Historico(**historico_data.model_dump())
-        self.db.add(db_historico)
-        self.db.commit()
-        self.db.refresh(db_historico)
+        increment_counts(self.db, HISTORICO_COUNTS, {historico_data.action_type: 1})
+        self._save(db_historico)
         return db_historico
 
     def get_historico_by_email(self, email_id: int) -> List[Historico]:
@@ -22,8 +27,9 @@ class HistoricoService:
             Historico.email_id == email_id
         ).order_by(desc(Historico.created_at)).all()
 
-    def get_historico_with_details(self, limit: int = 100, skip: int = 0) -> List[HistoricoWithDetails]:
-        """Busca histórico com detalhes do email e classificação para o frontend"""
+    def get_historico_with_details(self, limit: int = 100, skip: int = 0,
+                                   cursor: Optional[str] = None) -> List[HistoricoWithDetails]:
+        """Busca histórico com detalhes do email e classificação para o frontend (offset ou cursor)"""
         from models.email import Email
         from models.classification import Classification
         
@@ -49,7 +55,8 @@ class HistoricoService:
             Classification, Historico.classification_id == Classification.id
         ).filter(
             Historico.action_type == ActionType.CREATED
-        ).order_by(desc(Historico.created_at)).offset(skip).limit(limit)
+        )
+        query = paginate(query, Historico.created_at, Historico.id, cursor=cursor, skip=skip, limit=limit)
 
         results = []
         for row in query.all():
@@ -73,31 +80,42 @@ class HistoricoService:
         return results
 
     def get_historico_count(self) -> int:
-        """Conta total de registros no histórico"""
+        """Conta total de registros no histórico (COUNT exato; a rota usa RecordCountService)"""
         return self.db.query(Historico).filter(
             Historico.action_type == ActionType.CREATED
         ).count()
 
-    def log_email_created(self, email_id: int, classification_id: int, 
-                         user_agent: str = None, ip_address: str = None) -> Historico:
-        """Log quando um email é criado/classificado"""
+    def _log(self, email_id: int, classification_id: int, action_type: ActionType,
+             user_agent: str = None, ip_address: str = None) -> Optional[Historico]:
+        """Com write-behind, apenas enfileira o evento (retorna None); senão grava na hora"""
         historico_data = HistoricoCreate(
             email_id=email_id,
             classification_id=classification_id,
-            action_type=ActionType.CREATED,
+            action_type=action_type,
             user_agent=user_agent,
             ip_address=ip_address
         )
-        return self.create_historico(historico_data)
+        if not HISTORICO_WRITE_BEHIND:
+            return self.create_historico(historico_data)
+        
+        self.pending.append(historico_data.model_dump())
+        if self.autocommit:
+            self.enqueue_pending()
+        return None
+
+    def enqueue_pending(self):
+        """Envia os eventos à fila de gravação (chamado após o commit dos registros referenciados)"""
+        writer = get_historico_writer()
+        for event in self.pending:
+            writer.append(**event)
+        self.pending.clear()
+
+    def log_email_created(self, email_id: int, classification_id: int, 
+                         user_agent: str = None, ip_address: str = None) -> Optional[Historico]:
+        """Log quando um email é criado/classificado"""
+        return self._log(email_id, classification_id, ActionType.CREATED, user_agent, ip_address)
 
     def log_email_viewed(self, email_id: int, classification_id: int,
-                        user_agent: str = None, ip_address: str = None) -> Historico:
+                        user_agent: str = None, ip_address: str = None) -> Optional[Historico]:
         """Log quando um email é visualizado no histórico"""
-        historico_data = HistoricoCreate(
-            email_id=email_id,
-            classification_id=classification_id,
-            action_type=ActionType.VIEWED,
-            user_agent=user_agent,
-            ip_address=ip_address
-        )
-        return self.create_historico(historico_data)
+        return self._log(email_id, classification_id, ActionType.VIEWED, user_agent, ip_address)
@@ -0,0 +1,164 @@
+"""
+Gravação em segundo plano (write-behind) do histórico
+As requisições só enfileiram o evento; uma thread grava os eventos em lote (uma inserção
+em massa e um commit) quando a fila atinge HISTORICO_BATCH_SIZE ou a cada
+HISTORICO_FLUSH_INTERVAL segundos, e a fila é esvaziada no encerramento da API.
+"""
+
+import atexit
+import os
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from functools import lru_cache
+from collections import Counter
+from typing import Any, Dict, List
+from sqlalchemy import insert
+from sqlalchemy.exc import DataError, IntegrityError
+from config.database import SessionLocal
+from models.historico import Historico, ActionType
+from .record_count_service import HISTORICO_COUNTS, increment_counts
+
+HISTORICO_WRITE_BEHIND = os.getenv("HISTORICO_WRITE_BEHIND", "True").lower() == "true"
+HISTORICO_BATCH_SIZE = int(os.getenv("HISTORICO_BATCH_SIZE", 200))
+HISTORICO_FLUSH_INTERVAL = float(os.getenv("HISTORICO_FLUSH_INTERVAL", 1.0))
+# Limite da fila em memória (banco indisponível): acima dele os eventos mais antigos são descartados
+HISTORICO_MAX_PENDING = int(os.getenv("HISTORICO_MAX_PENDING", 50000))
+# Registrar visualizações (só é viável com write-behind: nenhuma gravação na requisição)
+HISTORICO_LOG_VIEWS = os.getenv("HISTORICO_LOG_VIEWS", "True").lower() == "true" and HISTORICO_WRITE_BEHIND
+
+
+class HistoricoWriter:
+    """Fila de eventos do histórico do processo, gravada em lote por uma thread própria"""
+
+    def __init__(self, batch_size: int = HISTORICO_BATCH_SIZE, flush_interval: float = HISTORICO_FLUSH_INTERVAL,
+                 max_pending: int = HISTORICO_MAX_PENDING):
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self._queue: deque = deque(maxlen=max_pending)
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.stats = {'enqueued': 0, 'written': 0, 'flushes': 0, 'errors': 0, 'dropped': 0, 'rejected': 0, 'last_batch': 0}
+
+    def append(self, email_id: int, classification_id: int, action_type: ActionType,
+               user_agent: str = None, ip_address: str = None):
+        """Enfileira o evento (horário registrado agora, não na gravação)"""
+        self._ensure_started()
+        if len(self._queue) == self._queue.maxlen:
+            self.stats['dropped'] += 1
+        self._queue.append({
+            'email_id': email_id,
+            'classification_id': classification_id,
+            'action_type': action_type,
+            'user_agent': user_agent,
+            'ip_address': ip_address,
+            'created_at': datetime.now(timezone.utc)
+        })
+        self.stats['enqueued'] += 1
+        if len(self._queue) >= self.batch_size:
+            self._wakeup.set()
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="historico-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.stop)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def _take(self) -> List[Dict[str, Any]]:
+        rows = []
+        while self._queue and len(rows) < self.batch_size:
+            rows.append(self._queue.popleft())
+        return rows
+
+    def _insert(self, rows: List[Dict[str, Any]]):
+        db = SessionLocal()
+        try:
+            db.execute(insert(Historico), rows)
+            increment_counts(db, HISTORICO_COUNTS, Counter(row['action_type'] for row in rows))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _insert_individually(self, rows: List[Dict[str, Any]]) -> int:
+        """Lote recusado pelo banco: grava um a um e descarta só os eventos inválidos"""
+        written = 0
+        for row in rows:
+            try:
+                self._insert([row])
+                written += 1
+            except (IntegrityError, DataError) as e:
+                print(f"Evento de histórico descartado (email {row['email_id']}): {e}")
+                self.stats['rejected'] += 1
+        return written
+
+    def _requeue(self, rows: List[Dict[str, Any]]):
+        """
+        Devolve o lote ao início da fila sem desalojar eventos enfileirados durante a tentativa;
+        sem espaço para todos, os mais antigos do lote são descartados (contados em 'dropped')
+        """
+        for position, row in enumerate(reversed(rows)):
+            if len(self._queue) >= self._queue.maxlen:
+                self.stats['dropped'] += len(rows) - position
+                print(f"Fila do histórico cheia: {len(rows) - position} eventos descartados")
+                return
+            self._queue.appendleft(row)
+
+    def flush(self) -> int:
+        """Grava todos os eventos pendentes em lotes; com o banco indisponível, devolve o lote à fila"""
+        written = 0
+        with self._flush_lock:
+            while self._queue:
+                rows = self._take()
+                try:
+                    self._insert(rows)
+                    batch_written = len(rows)
+                except (IntegrityError, DataError):
+                    batch_written = self._insert_individually(rows)
+                except Exception as e:
+                    print(f"Erro ao gravar histórico em lote ({len(rows)} eventos): {e}")
+                    self.stats['errors'] += 1
+                    self._requeue(rows)
+                    break
+                written += batch_written
+                self.stats['written'] += batch_written
+                self.stats['flushes'] += 1
+                self.stats['last_batch'] = batch_written
+        return written
+
+    def stop(self):
+        """Encerra a thread e grava o que restou na fila (chamado no encerramento da API)"""
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(
+            self.stats,
+            pending=len(self._queue),
+            batch_size=self.batch_size,
+            flush_interval=self.flush_interval,
+            enabled=HISTORICO_WRITE_BEHIND,
+            log_views=HISTORICO_LOG_VIEWS
+        )
+
+
+@lru_cache(maxsize=1)
+def get_historico_writer() -> HistoricoWriter:
+    return HistoricoWriter()
@@ -1,59 +1,214 @@
 """
 Serviço híbrido de prompts: banco de dados + arquivos locais
 Prioridade: Banco > Arquivos Locais > Genérico
+
+Os prompts resolvidos ficam em um cache único do processo, carregado com uma só consulta
+(todos os prompts ativos). Cada alteração registra uma geração (tabela prompt_generations);
+os workers aplicam as gerações novas recarregando apenas os prompts alterados
+(ver prompt_change_service) e a última geração aplicada é a versão dos prompts.
 """
 
+import os
+import threading
+from functools import lru_cache
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from typing import Dict, Optional, List
+from typing import Any, Dict, Iterable, Optional, List, Tuple
+from config.database import SessionLocal
 from models.prompt import Prompt, PromptType, PromptCategory
+from models.prompt_generation import PromptGeneration
 from data.prompts import PRODUCTIVE_PROMPTS, UNPRODUCTIVE_PROMPTS
 import time
 
+# Recarga periódica de segurança quando não há canal de alterações (PROMPT_CHANGE_CHANNEL=off)
+PROMPT_CACHE_TTL = int(os.getenv("PROMPT_CACHE_TTL", 300))  # 5 minutos
+# Com o canal ativo, recarga completa bem mais espaçada: cobre gravações que não registraram geração
+PROMPT_CACHE_LISTENING_TTL = int(os.getenv("PROMPT_CACHE_LISTENING_TTL", 3600))  # 1 hora
+
+
+class PromptCache:
+    """
+    Prompts do processo: conteúdo ativo do banco por (tipo, categoria) e prompts já resolvidos.
+
+    Valores resolvidos (e prompts carregados) só são gravados se nem a versão nem a época
+    mudaram durante a resolução: a época avança a cada descarte do cache (invalidate, TTL),
+    que não altera a versão, pois ela é a última geração de alterações aplicada.
+    """
+
+    def __init__(self, ttl: int = PROMPT_CACHE_TTL, listening_ttl: int = PROMPT_CACHE_LISTENING_TTL):
+        self.ttl = ttl
+        self.listening_ttl = listening_ttl
+        self.version = 0
+        self._epoch = 0
+        # Com o canal de alterações ativo, a recarga periódica completa usa listening_ttl
+        self.listening = False
+        self._db_prompts: Optional[Dict[Tuple[PromptType, PromptCategory], str]] = None
+        self._resolved: Dict[str, str] = {}
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'loads': 0, 'changes_applied': 0, 'invalidations': 0}
+
+    def _clear(self):
+        self._db_prompts = None
+        self._resolved.clear()
+        self._epoch += 1
+
+    def token(self) -> Tuple[int, int]:
+        """Versão e época atuais, conferidas por set() e load() antes de gravar"""
+        version = self.check_version()
+        with self._lock:
+            return version, self._epoch
+
+    def check_version(self) -> int:
+        """Retorna a versão atual; expira o cache após o TTL (mais longo com o canal de alterações)"""
+        ttl = self.listening_ttl if self.listening else self.ttl
+        if self._loaded_at and time.monotonic() - self._loaded_at > ttl:
+            with self._lock:
+                self._clear()
+                self._loaded_at = 0.0
+        return self.version
+
+    def load(self, db: Session) -> Dict[Tuple[PromptType, PromptCategory], str]:
+        """Carrega todos os prompts ativos em uma consulta (o mais recente de cada tipo/categoria vence)"""
+        token = self.token()
+        generation = db.query(func.max(PromptGeneration.id)).scalar() or 0
+        prompts = db.query(Prompt.type, Prompt.category, Prompt.content).filter(
+            Prompt.is_active == True
+        ).order_by(Prompt.created_at.asc()).all()
+        db_prompts = {(prompt_type, category): content for prompt_type, category, content in prompts}
+        with self._lock:
+            if token == (self.version, self._epoch):
+                self._db_prompts = db_prompts
+                self._loaded_at = time.monotonic()
+                self.version = max(self.version, generation)
+            self.stats['loads'] += 1
+        return db_prompts
+
+    def db_prompts(self, db: Session) -> Dict[Tuple[PromptType, PromptCategory], str]:
+        db_prompts = self._db_prompts
+        return db_prompts if db_prompts is not None else self.load(db)
+
+    def apply_changes(self, db: Session, changes: Iterable[Tuple[int, PromptType, PromptCategory]]) -> int:
+        """Recarrega apenas os prompts ativos dos pares alterados e avança a versão até a geração"""
+        changes = list(changes)
+        if not changes:
+            return self.version
+        pairs = {(prompt_type, category) for _, prompt_type, category in changes}
+        contents = {}
+        for prompt_type, category in pairs:
+            prompt = db.query(Prompt.content).filter(
+                Prompt.type == prompt_type,
+                Prompt.category == category,
+                Prompt.is_active == True
+            ).order_by(Prompt.created_at.desc()).first()
+            contents[(prompt_type, category)] = prompt.content if prompt else None
+
+        with self._lock:
+            if self._db_prompts is not None:
+                for pair, content in contents.items():
+                    if content is None:
+                        self._db_prompts.pop(pair, None)
+                    else:
+                        self._db_prompts[pair] = content
+            # Resolver de novo a partir do dicionário atualizado é barato (sem consultas)
+            self._resolved.clear()
+            self._epoch += 1
+            self.version = max(self.version, max(generation for generation, _, _ in changes))
+            self.stats['changes_applied'] += len(changes)
+            return self.version
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._resolved.get(key)
+            self.stats['hits' if value is not None else 'misses'] += 1
+            return value
+
+    def set(self, key: str, value: str, token: Tuple[int, int]):
+        with self._lock:
+            if token == (self.version, self._epoch):
+                self._resolved[key] = value
+
+    def invalidate(self):
+        """Descarta o cache do processo; a próxima busca recarrega os prompts ativos"""
+        with self._lock:
+            self._clear()
+            self.stats['invalidations'] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(
+                self.stats,
+                version=self.version,
+                epoch=self._epoch,
+                resolved=len(self._resolved),
+                db_prompts=len(self._db_prompts) if self._db_prompts is not None else None,
+                listening=self.listening
+            )
+
+
+@lru_cache(maxsize=1)
+def get_prompt_cache() -> PromptCache:
+    return PromptCache()
+
+
+def get_prompt_version() -> int:
+    """Retorna a versão atual dos prompts (última geração de alterações aplicada no processo)"""
+    return get_prompt_cache().check_version()
+
+
+def warm_prompt_cache():
+    """Carrega os prompts ativos na inicialização (uma consulta)"""
+    db = SessionLocal()
+    try:
+        get_prompt_cache().load(db)
+    except Exception as e:
+        print(f"Erro ao pré-carregar prompts: {e}")
+    finally:
+        db.close()
+
+
 class HybridPromptService:
     def __init__(self, db: Session):
         self.db = db
-        self._cache = {}
-        self._cache_timeout = 300  # 5 minutos
-        self._last_cache_update = 0
+        self._cache = get_prompt_cache()
 
     def get_prompt(self, category: str, prompt_type: str = "generation") -> str:
         """
-        Busca prompt com prioridade: banco > cache > arquivos locais > genérico
+        Busca prompt com prioridade: cache > banco > arquivos locais > genérico
         
         Args:
             category: Categoria do prompt (ex: 'meetings', 'spam_promotions')
             prompt_type: Tipo do prompt (ex: 'generation', 'classification')
         """
-        # Limpar cache se expirou
-        if time.time() - self._last_cache_update > self._cache_timeout:
-            self._clear_cache()
+        token = self._cache.token()
         
         # Chave do cache
         cache_key = f"{category}_{prompt_type}"
         
         # 1. Tentar cache primeiro
-        if cache_key in self._cache:
-            return self._cache[cache_key]
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            return cached
         
         # 2. Tentar banco de dados (PRIORIDADE)
         db_prompt = self._get_prompt_from_db(category, prompt_type)
         if db_prompt:
-            self._cache[cache_key] = db_prompt
+            self._cache.set(cache_key, db_prompt, token)
             return db_prompt
         
         # 3. Fallback para arquivos locais
         local_prompt = self._get_prompt_from_files(category, prompt_type)
         if local_prompt:
-            self._cache[cache_key] = local_prompt
+            self._cache.set(cache_key, local_prompt, token)
             return local_prompt
         
         # 4. Prompt genérico como último recurso
         generic_prompt = self._get_generic_prompt(prompt_type)
-        self._cache[cache_key] = generic_prompt
+        self._cache.set(cache_key, generic_prompt, token)
         return generic_prompt
 
     def _get_prompt_from_db(self, category: str, prompt_type: str) -> Optional[str]:
-        """Busca prompt no banco de dados"""
+        """Busca prompt no banco de dados (prompts ativos carregados de uma vez no cache do processo)"""
         try:
             # Mapear string para enum
             category_enum = self._map_category_to_enum(category)
@@ -62,13 +217,7 @@ class HybridPromptService:
             if not category_enum or not type_enum:
                 return None
             
-            prompt = self.db.query(Prompt).filter(
-                Prompt.category == category_enum,
-                Prompt.type == type_enum,
-                Prompt.is_active == True
-            ).order_by(Prompt.created_at.desc()).first()
-            
-            return prompt.content if prompt else None
+            return self._cache.db_prompts(self.db).get((type_enum, category_enum))
             
         except Exception as e:
             print(f"Erro ao buscar prompt no banco: {e}")
@@ -135,14 +284,9 @@ class HybridPromptService:
         }
         return mapping.get(prompt_type)
 
-    def _clear_cache(self):
-        """Limpa o cache"""
-        self._cache.clear()
-        self._last_cache_update = time.time()
-
     def invalidate_cache(self):
         """Invalida o cache (chamado quando prompts são atualizados)"""
-        self._clear_cache()
+        self._cache.invalidate()
 
     def get_prompt_source(self, category: str, prompt_type: str = "generation") -> str:
         """
@@ -0,0 +1,93 @@
+"""
+Paginação por cursor (keyset) em (created_at, id), do mais recente para o mais antigo
+A página seguinte filtra (created_at, id) < (último created_at, último id) e usa o índice
+composto, sem ler e descartar as linhas anteriores como offset faz nas páginas profundas.
+O cursor é opaco para o cliente (base64 da posição do último item da página).
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+from sqlalchemy import Index, desc, literal, tuple_
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Query
+
+# Cabeçalho com o cursor da próxima página (o corpo das listas não muda)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class InvalidCursor(ValueError):
+    """Cursor malformado ou de outra versão"""
+
+
+def encode_cursor(created_at: datetime, item_id: int) -> str:
+    raw = json.dumps({"t": created_at.isoformat() if created_at else None, "i": item_id})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        position = json.loads(raw)
+        created_at = datetime.fromisoformat(position["t"]) if position["t"] else None
+        return created_at, int(position["i"])
+    except (ValueError, TypeError, KeyError) as e:
+        raise InvalidCursor(f"Cursor inválido: {cursor}") from e
+
+
+def _bind_created_at(query: Query, created_at: datetime):
+    """
+    No SQLite as datas são texto: o default do banco grava 'AAAA-MM-DD HH:MM:SS' e um datetime
+    do Python sem fração iria como '...SS.000000', que nunca empata com ele
+    """
+    bind = query.session.get_bind()
+    if bind.dialect.name == "sqlite" and created_at.microsecond == 0:
+        return literal(created_at.strftime("%Y-%m-%d %H:%M:%S"))
+    return created_at
+
+
+def paginate(query: Query, created_at_column, id_column, cursor: Optional[str] = None,
+             skip: int = 0, limit: int = 100) -> Query:
+    """Ordena por (created_at, id) desc; com cursor usa keyset, sem cursor mantém o offset"""
+    query = query.order_by(desc(created_at_column), desc(id_column))
+    if cursor:
+        created_at, item_id = decode_cursor(cursor)
+        if created_at is None:
+            query = query.filter(created_at_column.is_(None), id_column < item_id)
+        else:
+            query = query.filter(
+                tuple_(created_at_column, id_column) < tuple_(_bind_created_at(query, created_at), item_id)
+            )
+    elif skip:
+        query = query.offset(skip)
+    return query.limit(limit)
+
+
+def next_cursor(items: Sequence[Any], limit: int) -> Optional[str]:
+    """Cursor após o último item; None quando a página veio incompleta (não há mais itens)"""
+    if not items or len(items) < limit:
+        return None
+    last = items[-1]
+    return encode_cursor(last.created_at, last.id)
+
+
+def create_keyset_indexes(engine: Engine) -> List[str]:
+    """Índices compostos (filtro, created_at, id) das listas paginadas, criados se não existirem"""
+    from models.historico import Historico
+    from models.email import Email
+    from models.prompt import Prompt
+
+    indexes = [
+        Index("ix_historico_action_created_id", Historico.action_type, Historico.created_at, Historico.id),
+        Index("ix_emails_deleted_created_id", Email.is_deleted, Email.created_at, Email.id),
+        Index("ix_prompts_active_created_id", Prompt.is_active, Prompt.created_at, Prompt.id),
+    ]
+    created = []
+    for index in indexes:
+        try:
+            index.create(bind=engine, checkfirst=True)
+            created.append(index.name)
+        except Exception as e:
+            print(f"Erro ao criar índice {index.name}: {e}")
+    return created
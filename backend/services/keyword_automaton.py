@@ -0,0 +1,194 @@
+"""
+Autômato Aho-Corasick para busca de todas as palavras-chave em uma única passada
+"""
+
+from collections import deque
+from functools import lru_cache
+from typing import Dict, List, Tuple
+from data.keywords import (
+    BUSINESS_TOPICS, UNPRODUCTIVE_CATEGORIES,
+    CONTEXT_INDICATORS, PERSONAL_RESPONSE_CATEGORIES
+)
+
+# Implementação em C opcional; sem ela usamos o autômato em Python puro
+try:
+    import ahocorasick  # type: ignore
+except ImportError:
+    ahocorasick = None
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == '_'
+
+
+class KeywordHits:
+    """Ocorrências de palavras-chave de uma varredura, agrupadas por namespace e grupo"""
+
+    def __init__(self, automaton: 'KeywordAutomaton', occurrences: Dict[str, int], whole_word_occurrences: Dict[str, int]):
+        self.automaton = automaton
+        self.occurrences = occurrences
+        self.whole_word_occurrences = whole_word_occurrences
+
+    def __reduce__(self):
+        # Entre processos (pool de CPU) o autômato não é copiado: cada processo tem o seu
+        return _keyword_hits, (self.occurrences, self.whole_word_occurrences)
+
+    def _found(self, whole_words: bool) -> Dict[str, int]:
+        return self.whole_word_occurrences if whole_words else self.occurrences
+
+    def contains(self, keyword: str, whole_words: bool = False) -> bool:
+        return keyword in self._found(whole_words)
+
+    def keywords_found(self, namespace: str, group: str, whole_words: bool = False) -> List[str]:
+        """Palavras-chave do grupo encontradas no texto, na ordem da lista original"""
+        found = []
+        for keyword in self._found(whole_words):
+            for index in self.automaton.positions(keyword, namespace, group):
+                found.append((index, keyword))
+        return [keyword for _, keyword in sorted(found)]
+
+    def group_count(self, namespace: str, group: str, whole_words: bool = False) -> int:
+        """Quantidade de entradas da lista do grupo presentes no texto"""
+        return sum(
+            len(self.automaton.positions(keyword, namespace, group))
+            for keyword in self._found(whole_words)
+        )
+
+    def group_counts(self, namespace: str, whole_words: bool = False) -> Dict[str, int]:
+        """Contagem por grupo (apenas grupos com ocorrência), na ordem original dos grupos"""
+        counts = {}
+        for keyword in self._found(whole_words):
+            for (ns, group), indexes in self.automaton.memberships(keyword).items():
+                if ns == namespace:
+                    counts[group] = counts.get(group, 0) + len(indexes)
+        order = self.automaton.group_order(namespace)
+        return {group: counts[group] for group in order if group in counts}
+
+    def namespace_count(self, namespace: str, whole_words: bool = False) -> int:
+        return sum(self.group_counts(namespace, whole_words).values())
+
+    def any_in(self, namespace: str, group: str, whole_words: bool = False) -> bool:
+        return any(
+            self.automaton.positions(keyword, namespace, group)
+            for keyword in self._found(whole_words)
+        )
+
+
+class KeywordAutomaton:
+    """
+    Autômato multi-padrão construído uma vez a partir dos dicionários de palavras-chave.
+
+    A busca percorre o texto uma única vez, independentemente do tamanho do vocabulário, e
+    registra cada ocorrência (inclusive sobrepostas) como substring e como palavra inteira.
+    """
+
+    def __init__(self, keyword_sets: Dict[str, Dict[str, List[str]]]):
+        self.keyword_sets = keyword_sets
+        # palavra-chave -> {(namespace, grupo): [posições na lista do grupo]}
+        self._memberships: Dict[str, Dict[Tuple[str, str], List[int]]] = {}
+        self._group_order = {namespace: list(groups) for namespace, groups in keyword_sets.items()}
+
+        for namespace, groups in keyword_sets.items():
+            for group, keywords in groups.items():
+                for index, keyword in enumerate(keywords):
+                    keyword = keyword.lower()
+                    if keyword:
+                        groups_of_keyword = self._memberships.setdefault(keyword, {})
+                        groups_of_keyword.setdefault((namespace, group), []).append(index)
+
+        if ahocorasick is not None:
+            self._native = ahocorasick.Automaton()
+            for keyword in self._memberships:
+                self._native.add_word(keyword, keyword)
+            self._native.make_automaton()
+        else:
+            self._native = None
+            self._build_python_automaton()
+
+    def _build_python_automaton(self):
+        """Constrói transições, links de falha e saídas do autômato em Python puro"""
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[str]] = [[]]
+
+        for keyword in self._memberships:
+            state = 0
+            for char in keyword:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                state = next_state
+            self._output[state].append(keyword)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def _iter_matches(self, text: str):
+        """Gera (índice final, palavra-chave) para cada ocorrência no texto"""
+        if self._native is not None:
+            yield from self._native.iter(text)
+            return
+
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for end, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for keyword in output[state]:
+                yield end, keyword
+
+    def search(self, text: str) -> KeywordHits:
+        """Varre o texto (já em minúsculas) uma única vez"""
+        occurrences: Dict[str, int] = {}
+        whole_word_occurrences: Dict[str, int] = {}
+        length = len(text)
+
+        for end, keyword in self._iter_matches(text):
+            occurrences[keyword] = occurrences.get(keyword, 0) + 1
+            start = end - len(keyword) + 1
+            if (start == 0 or not _is_word_char(text[start - 1])) and \
+               (end + 1 == length or not _is_word_char(text[end + 1])):
+                whole_word_occurrences[keyword] = whole_word_occurrences.get(keyword, 0) + 1
+
+        return KeywordHits(self, occurrences, whole_word_occurrences)
+
+    def match_positions(self, text: str) -> List[int]:
+        """Índices finais de todas as ocorrências no texto (já em minúsculas)"""
+        return [end for end, _ in self._iter_matches(text)]
+
+    def memberships(self, keyword: str) -> Dict[Tuple[str, str], List[int]]:
+        return self._memberships.get(keyword, {})
+
+    def positions(self, keyword: str, namespace: str, group: str) -> List[int]:
+        return self._memberships.get(keyword, {}).get((namespace, group), [])
+
+    def group_order(self, namespace: str) -> List[str]:
+        return self._group_order.get(namespace, [])
+
+
+def _keyword_hits(occurrences: Dict[str, int], whole_word_occurrences: Dict[str, int]) -> KeywordHits:
+    return KeywordHits(get_keyword_automaton(), occurrences, whole_word_occurrences)
+
+
+@lru_cache(maxsize=1)
+def get_keyword_automaton() -> KeywordAutomaton:
+    """Autômato com todas as palavras-chave de `data.keywords`, construído uma vez por processo"""
+    return KeywordAutomaton({
+        'productive': BUSINESS_TOPICS,
+        'unproductive': UNPRODUCTIVE_CATEGORIES,
+        'indicators': CONTEXT_INDICATORS,
+        'personal': PERSONAL_RESPONSE_CATEGORIES
+    })
@@ -0,0 +1,286 @@
+"""
+Classificador linear local: TF-IDF com hashing trick + regressão logística (NumPy puro)
+Pesos ficam em arquivos .npy abertos com memmap, compartilhando páginas entre workers
+"""
+
+import hashlib
+import json
+import math
+import os
+import time
+import zlib
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence
+from .nlp_service import NLPService
+
+try:
+    import numpy as np  # type: ignore
+except ImportError:
+    np = None
+
+LINEAR_MODEL_PATH = os.getenv(
+    "LINEAR_MODEL_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "ai_models", "linear_classifier")
+)
+DEFAULT_N_FEATURES = 2 ** 18
+
+# Modo de uso em AIService.classify_email: off | first_pass | tie_breaker
+LINEAR_CLASSIFIER_MODE = os.getenv("LINEAR_CLASSIFIER_MODE", "off").lower()
+# first_pass: o modelo decide quando sua confiança atinge este valor
+LINEAR_CLASSIFIER_MIN_CONFIDENCE = float(os.getenv("LINEAR_CLASSIFIER_MIN_CONFIDENCE", 0.8))
+# tie_breaker: o modelo é consultado quando a confiança das regras fica abaixo deste valor
+LINEAR_CLASSIFIER_TIE_THRESHOLD = float(os.getenv("LINEAR_CLASSIFIER_TIE_THRESHOLD", 0.7))
+
+
+class HashingTfidfVectorizer:
+    """
+    Vetorizador TF-IDF sem vocabulário: unigramas e bigramas de `NLPService.tokenize_and_clean`
+    são mapeados por crc32 para `n_features` colunas. A matriz é devolvida em formato CSR
+    (indptr, indices, data) para pontuação vetorizada sem scipy.
+    """
+
+    def __init__(self, n_features: int = DEFAULT_N_FEATURES, idf=None):
+        self.n_features = n_features
+        self.idf = idf
+        self.nlp_service = NLPService()
+
+    def tokenize(self, text: str) -> List[str]:
+        return self.nlp_service.tokenize_and_clean(self.nlp_service.preprocess_text(text))
+
+    def _hashed_counts(self, tokens: Sequence[str]) -> Counter:
+        terms = list(tokens) + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        return Counter(zlib.crc32(term.encode('utf-8')) % self.n_features for term in terms)
+
+    def transform_tokens(self, token_lists: Sequence[Sequence[str]], use_idf: bool = True):
+        """Converte listas de tokens em (indptr, indices, data) com TF sublinear, IDF e norma L2"""
+        indptr = [0]
+        indices: List[int] = []
+        data: List[float] = []
+        for tokens in token_lists:
+            counts = self._hashed_counts(tokens)
+            indices.extend(counts.keys())
+            data.extend(1.0 + math.log(count) for count in counts.values())
+            indptr.append(len(indices))
+
+        indptr = np.asarray(indptr, dtype=np.int64)
+        indices = np.asarray(indices, dtype=np.int64)
+        data = np.asarray(data, dtype=np.float32)
+        if use_idf and self.idf is not None and len(indices):
+            data *= self.idf[indices]
+
+        # Normalização L2 por documento
+        if len(indices):
+            row_ids = _row_ids(indptr)
+            norms = np.sqrt(np.bincount(row_ids, weights=data * data, minlength=len(indptr) - 1))
+            norms[norms == 0] = 1.0
+            data = (data / norms[row_ids]).astype(np.float32)
+        return indptr, indices, data
+
+    def transform(self, texts: Sequence[str]):
+        return self.transform_tokens([self.tokenize(text) for text in texts])
+
+
+def _row_ids(indptr):
+    return np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+
+
+def _softmax(scores):
+    scores = scores - scores.max(axis=1, keepdims=True)
+    exp = np.exp(scores)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+class LinearClassifier:
+    """
+    Regressão logística multinomial com duas cabeças (categoria e subcategoria) sobre o mesmo
+    vetor TF-IDF. `weights` tem formato (n_features, n_categorias + n_subcategorias).
+    """
+
+    WEIGHTS_FILE = "weights.npy"
+    BIAS_FILE = "bias.npy"
+    IDF_FILE = "idf.npy"
+    META_FILE = "meta.json"
+
+    def __init__(self, weights, bias, idf, categories: List[str], subcategories: List[str],
+                 n_features: int, version: str = None):
+        self.weights = weights
+        self.bias = bias
+        self.categories = categories
+        self.subcategories = subcategories
+        self.version = version
+        self.vectorizer = HashingTfidfVectorizer(n_features, idf)
+
+    @classmethod
+    def load(cls, path: str = LINEAR_MODEL_PATH) -> 'LinearClassifier':
+        """Carrega o artefato com memmap (somente leitura)"""
+        with open(os.path.join(path, cls.META_FILE), encoding='utf-8') as f:
+            meta = json.load(f)
+        return cls(
+            weights=np.load(os.path.join(path, cls.WEIGHTS_FILE), mmap_mode='r'),
+            bias=np.load(os.path.join(path, cls.BIAS_FILE)),
+            idf=np.load(os.path.join(path, cls.IDF_FILE), mmap_mode='r'),
+            categories=meta['categories'],
+            subcategories=meta['subcategories'],
+            n_features=meta['n_features'],
+            version=meta.get('version')
+        )
+
+    def fingerprint(self) -> str:
+        """Identifica os pesos carregados (versão do treino; hash dos pesos se o artefato não tiver versão)"""
+        if self.version:
+            return str(self.version)
+        digest = hashlib.sha256()
+        for array in (self.weights, self.bias, self.vectorizer.idf):
+            if array is not None:
+                digest.update(np.ascontiguousarray(array).tobytes())
+        return digest.hexdigest()[:12]
+
+    def save(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, self.WEIGHTS_FILE), np.ascontiguousarray(self.weights, dtype=np.float32))
+        np.save(os.path.join(path, self.BIAS_FILE), np.asarray(self.bias, dtype=np.float32))
+        np.save(os.path.join(path, self.IDF_FILE), np.asarray(self.vectorizer.idf, dtype=np.float32))
+        with open(os.path.join(path, self.META_FILE), 'w', encoding='utf-8') as f:
+            json.dump({
+                'categories': self.categories,
+                'subcategories': self.subcategories,
+                'n_features': self.vectorizer.n_features,
+                'version': self.version
+            }, f, ensure_ascii=False, indent=2)
+
+    def _scores(self, indptr, indices, data):
+        """Produto esparso X @ W em NumPy puro"""
+        n_docs = len(indptr) - 1
+        scores = np.zeros((n_docs, self.weights.shape[1]), dtype=np.float32)
+        if len(indices):
+            np.add.at(scores, _row_ids(indptr), self.weights[indices] * data[:, None])
+        return scores + self.bias
+
+    def predict_tokens(self, token_lists: Sequence[Sequence[str]]) -> List[Dict[str, any]]:
+        """Classifica vários emails (já tokenizados) em uma única chamada vetorizada"""
+        start_time = time.time()
+        scores = self._scores(*self.vectorizer.transform_tokens(token_lists))
+        n_categories = len(self.categories)
+        category_probs = _softmax(scores[:, :n_categories])
+        subcategory_probs = _softmax(scores[:, n_categories:]) if self.subcategories else None
+        elapsed = (time.time() - start_time) / max(len(token_lists), 1)
+
+        results = []
+        for row in range(len(token_lists)):
+            category_index = int(category_probs[row].argmax())
+            result = {
+                'category': self.categories[category_index],
+                'confidence': float(category_probs[row, category_index]),
+                'processing_time': elapsed,
+                'method': 'linear_tfidf_classification',
+                'model_version': self.version,
+                'subcategory': None
+            }
+            if subcategory_probs is not None:
+                subcategory_index = int(subcategory_probs[row].argmax())
+                result['subcategory'] = self.subcategories[subcategory_index]
+                result['subcategory_confidence'] = float(subcategory_probs[row, subcategory_index])
+            results.append(result)
+        return results
+
+    def predict_batch(self, texts: Sequence[str]) -> List[Dict[str, any]]:
+        return self.predict_tokens([self.vectorizer.tokenize(text) for text in texts])
+
+    def predict(self, text: str) -> Dict[str, any]:
+        return self.predict_batch([text])[0]
+
+
+def train_linear_classifier(texts: Sequence[str], categories: Sequence[str], subcategories: Sequence[Optional[str]],
+                            n_features: int = DEFAULT_N_FEATURES, epochs: int = 10, learning_rate: float = 0.5,
+                            l2: float = 1e-5, batch_size: int = 64, seed: int = 42) -> LinearClassifier:
+    """Treina as duas cabeças com SGD em mini-lotes (gradiente esparso, só linhas tocadas)"""
+    vectorizer = HashingTfidfVectorizer(n_features)
+    token_lists = [vectorizer.tokenize(text) for text in texts]
+
+    # IDF suavizado a partir da frequência de documentos
+    document_frequency = np.zeros(n_features, dtype=np.float64)
+    for tokens in token_lists:
+        document_frequency[list(vectorizer._hashed_counts(tokens).keys())] += 1
+    vectorizer.idf = (np.log((1 + len(token_lists)) / (1 + document_frequency)) + 1).astype(np.float32)
+
+    category_labels = sorted(set(categories))
+    subcategory_labels = sorted({s for s in subcategories if s})
+    n_categories = len(category_labels)
+    n_outputs = n_categories + len(subcategory_labels)
+
+    category_index = {label: i for i, label in enumerate(category_labels)}
+    subcategory_index = {label: i for i, label in enumerate(subcategory_labels)}
+    y_category = np.array([category_index[c] for c in categories])
+    y_subcategory = np.array([subcategory_index.get(s, -1) if s else -1 for s in subcategories])
+
+    model = LinearClassifier(
+        weights=np.zeros((n_features, n_outputs), dtype=np.float32),
+        bias=np.zeros(n_outputs, dtype=np.float32),
+        idf=vectorizer.idf,
+        categories=category_labels,
+        subcategories=subcategory_labels,
+        n_features=n_features,
+        version=time.strftime('%Y%m%d%H%M%S')
+    )
+
+    rng = np.random.default_rng(seed)
+    for epoch in range(epochs):
+        order = rng.permutation(len(token_lists))
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            indptr, indices, data = model.vectorizer.transform_tokens([token_lists[i] for i in batch])
+            scores = model._scores(indptr, indices, data)
+
+            # Erro (P - Y) por cabeça; exemplos sem subcategoria não contribuem para a segunda
+            delta = np.zeros_like(scores)
+            category_probs = _softmax(scores[:, :n_categories])
+            category_probs[np.arange(len(batch)), y_category[batch]] -= 1.0
+            delta[:, :n_categories] = category_probs
+            if subcategory_labels:
+                labelled = y_subcategory[batch] >= 0
+                subcategory_probs = _softmax(scores[:, n_categories:])
+                subcategory_probs[np.arange(len(batch)), np.maximum(y_subcategory[batch], 0)] -= 1.0
+                delta[:, n_categories:] = subcategory_probs * labelled[:, None]
+            delta /= len(batch)
+
+            if len(indices):
+                touched, inverse = np.unique(indices, return_inverse=True)
+                gradient = np.zeros((len(touched), n_outputs), dtype=np.float32)
+                np.add.at(gradient, inverse, data[:, None] * delta[_row_ids(indptr)])
+                model.weights[touched] -= learning_rate * (gradient + l2 * model.weights[touched])
+            model.bias -= learning_rate * delta.sum(axis=0)
+    return model
+
+
+def combine_with_rules(rules_result: Dict[str, any], linear_result: Optional[Dict[str, any]],
+                       mode: str = LINEAR_CLASSIFIER_MODE) -> Dict[str, any]:
+    """Escolhe entre o resultado das regras e o do classificador linear conforme o modo"""
+    if linear_result is None or mode not in ('first_pass', 'tie_breaker'):
+        return rules_result
+
+    if mode == 'first_pass':
+        use_linear = linear_result['confidence'] >= LINEAR_CLASSIFIER_MIN_CONFIDENCE
+    else:
+        use_linear = (
+            rules_result['confidence'] < LINEAR_CLASSIFIER_TIE_THRESHOLD
+            and linear_result['confidence'] > rules_result['confidence']
+        )
+
+    if not use_linear:
+        return rules_result
+    return dict(linear_result, rules_method=rules_result.get('method'))
+
+
+@lru_cache(maxsize=1)
+def get_linear_classifier() -> Optional[LinearClassifier]:
+    """Classificador linear do processo (None se NumPy ou o artefato treinado não estiverem disponíveis)"""
+    if np is None:
+        return None
+    if not os.path.exists(os.path.join(LINEAR_MODEL_PATH, LinearClassifier.META_FILE)):
+        return None
+    try:
+        return LinearClassifier.load(LINEAR_MODEL_PATH)
+    except Exception as e:
+        print(f"Erro ao carregar classificador linear: {e}")
+        return None
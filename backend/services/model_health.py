@@ -0,0 +1,235 @@
+"""
+Saúde dos modelos de geração: placar (taxa de sucesso, EWMA de latência, 429 recentes)
+e circuit breaker por modelo (closed > open > half_open > closed)
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence
+from .redis_client import get_redis_client
+
+# Falhas consecutivas que abrem o circuito
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", 3))
+# Taxa de sucesso mínima na janela (com pelo menos CIRCUIT_MIN_SAMPLES resultados)
+CIRCUIT_MIN_SUCCESS_RATE = float(os.getenv("CIRCUIT_MIN_SUCCESS_RATE", 0.5))
+CIRCUIT_MIN_SAMPLES = int(os.getenv("CIRCUIT_MIN_SAMPLES", 10))
+# Tempo aberto antes da sondagem; dobra a cada sondagem que falha, até o máximo
+CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", 30))
+CIRCUIT_MAX_OPEN_SECONDS = float(os.getenv("CIRCUIT_MAX_OPEN_SECONDS", 600))
+HEALTH_WINDOW_SIZE = int(os.getenv("HEALTH_WINDOW_SIZE", 50))
+HEALTH_LATENCY_ALPHA = float(os.getenv("HEALTH_LATENCY_ALPHA", 0.2))
+HEALTH_RATE_LIMIT_WINDOW = float(os.getenv("HEALTH_RATE_LIMIT_WINDOW", 300))  # 5 minutos
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class ModelHealth:
+    """Estado de um modelo; acessado sempre sob o lock do ModelHealthTracker"""
+
+    def __init__(self, model: str):
+        self.model = model
+        self.state = CLOSED
+        self.outcomes = deque(maxlen=HEALTH_WINDOW_SIZE)
+        self.latency_ewma: Optional[float] = None
+        self.rate_limits = deque()
+        self.consecutive_failures = 0
+        self.total_successes = 0
+        self.total_failures = 0
+        self.open_until = 0.0
+        self.open_seconds = CIRCUIT_OPEN_SECONDS
+        self.probe_in_flight = False
+        self.last_error: Optional[str] = None
+        self.last_state_change = time.time()
+        self.reason: Optional[str] = None
+
+    def success_rate(self) -> Optional[float]:
+        return sum(self.outcomes) / len(self.outcomes) if self.outcomes else None
+
+    def recent_rate_limits(self, now: float) -> int:
+        while self.rate_limits and self.rate_limits[0] < now - HEALTH_RATE_LIMIT_WINDOW:
+            self.rate_limits.popleft()
+        return len(self.rate_limits)
+
+    def observe_latency(self, latency: float):
+        if self.latency_ewma is None:
+            self.latency_ewma = latency
+        else:
+            self.latency_ewma += HEALTH_LATENCY_ALPHA * (latency - self.latency_ewma)
+
+    def set_state(self, state: str, reason: str = None):
+        self.state = state
+        self.reason = reason
+        self.last_state_change = time.time()
+
+    def snapshot(self, now: float) -> Dict[str, Any]:
+        return {
+            'model': self.model,
+            'state': self.state,
+            'reason': self.reason,
+            'success_rate': self.success_rate(),
+            'samples': len(self.outcomes),
+            'latency_ewma': self.latency_ewma,
+            'recent_429': self.recent_rate_limits(now),
+            'consecutive_failures': self.consecutive_failures,
+            'total_successes': self.total_successes,
+            'total_failures': self.total_failures,
+            'open_for_seconds': max(0.0, self.open_until - now) if self.state == OPEN else 0.0,
+            'last_error': self.last_error,
+            'last_state_change': self.last_state_change
+        }
+
+
+class ModelHealthTracker:
+    """
+    Placar de saúde compartilhado pelo processo.
+
+    Com Redis (REDIS_URL), a abertura de um circuito é publicada com TTL para que os outros
+    workers também deixem de chamar o modelo até a próxima sondagem.
+    """
+
+    KEY_PREFIX = "autou:circuit:"
+
+    def __init__(self, redis_client=None):
+        self.redis = redis_client
+        self._models: Dict[str, ModelHealth] = {}
+        self._lock = threading.Lock()
+
+    def _health(self, model: str) -> ModelHealth:
+        if model not in self._models:
+            self._models[model] = ModelHealth(model)
+        return self._models[model]
+
+    def _shared_open_until(self, model: str) -> float:
+        if self.redis is None:
+            return 0.0
+        try:
+            value = self.redis.get(self.KEY_PREFIX + model)
+            return float(value) if value is not None else 0.0
+        except Exception as e:
+            print(f"Erro ao ler circuito compartilhado de {model}: {e}")
+            return 0.0
+
+    def _publish_open(self, health: ModelHealth):
+        if self.redis is None:
+            return
+        try:
+            ttl = max(1, int(health.open_until - time.time()) + 1)
+            self.redis.set(self.KEY_PREFIX + health.model, str(health.open_until), ex=ttl)
+        except Exception as e:
+            print(f"Erro ao publicar circuito de {health.model}: {e}")
+
+    def _open(self, health: ModelHealth, seconds: float, reason: str):
+        health.open_until = time.time() + seconds
+        health.probe_in_flight = False
+        health.set_state(OPEN, reason)
+        self._publish_open(health)
+
+    def order(self, models: Sequence[str]) -> List[str]:
+        """
+        Modelos candidatos: circuitos abertos são pulados; modelos degradados (taxa de sucesso
+        abaixo do mínimo ou com 429 recentes) vão para o fim, mantendo a ordem de preferência.
+        """
+        now = time.time()
+        shared = {model: self._shared_open_until(model) for model in models}
+        healthy, degraded = [], []
+        with self._lock:
+            for model in models:
+                health = self._health(model)
+                if shared[model] > now and health.state == CLOSED:
+                    health.open_until = shared[model]
+                    health.set_state(OPEN, "aberto por outro worker")
+                if health.state == OPEN and now >= health.open_until:
+                    health.set_state(HALF_OPEN, "aguardando sondagem")
+                if health.state == OPEN or (health.state == HALF_OPEN and health.probe_in_flight):
+                    continue
+                rate = health.success_rate()
+                if health.state == HALF_OPEN or health.recent_rate_limits(now) or \
+                        (rate is not None and rate < CIRCUIT_MIN_SUCCESS_RATE):
+                    degraded.append(model)
+                else:
+                    healthy.append(model)
+        return healthy + degraded
+
+    def acquire(self, model: str) -> bool:
+        """Confirma a chamada; em half_open apenas uma sondagem passa por vez"""
+        now = time.time()
+        with self._lock:
+            health = self._health(model)
+            if health.state == OPEN:
+                if now < health.open_until:
+                    return False
+                health.set_state(HALF_OPEN, "aguardando sondagem")
+            if health.state == HALF_OPEN:
+                if health.probe_in_flight:
+                    return False
+                health.probe_in_flight = True
+            return True
+
+    def record_success(self, model: str, latency: float):
+        with self._lock:
+            health = self._health(model)
+            health.outcomes.append(True)
+            health.observe_latency(latency)
+            health.total_successes += 1
+            health.consecutive_failures = 0
+            if health.state != CLOSED:
+                health.probe_in_flight = False
+                health.open_seconds = CIRCUIT_OPEN_SECONDS
+                health.set_state(CLOSED, "sondagem bem-sucedida")
+
+    def record_failure(self, model: str, latency: float, error: str, rate_limited: bool = False,
+                       retry_after: float = None):
+        now = time.time()
+        with self._lock:
+            health = self._health(model)
+            health.outcomes.append(False)
+            health.observe_latency(latency)
+            health.total_failures += 1
+            health.consecutive_failures += 1
+            health.last_error = error[:300]
+            if rate_limited:
+                health.rate_limits.append(now)
+
+            if health.state == HALF_OPEN:
+                # Sondagem falhou: reabrir com tempo dobrado
+                health.open_seconds = min(health.open_seconds * 2, CIRCUIT_MAX_OPEN_SECONDS)
+                self._open(health, health.open_seconds, "sondagem falhou")
+            elif rate_limited and retry_after:
+                self._open(health, retry_after, f"429 com retry-after de {retry_after:g}s")
+            elif health.consecutive_failures >= CIRCUIT_FAILURE_THRESHOLD:
+                self._open(health, health.open_seconds, f"{health.consecutive_failures} falhas consecutivas")
+            elif len(health.outcomes) >= CIRCUIT_MIN_SAMPLES and health.success_rate() < CIRCUIT_MIN_SUCCESS_RATE:
+                self._open(health, health.open_seconds, f"taxa de sucesso {health.success_rate():.0%}")
+
+    def release(self, model: str):
+        """Libera a sondagem sem registrar resultado (ex.: prazo da requisição esgotado)"""
+        with self._lock:
+            self._health(model).probe_in_flight = False
+
+    def reset(self, model: str = None):
+        with self._lock:
+            models = [model] if model else list(self._models)
+            for name in models:
+                self._models[name] = ModelHealth(name)
+                if self.redis is not None:
+                    try:
+                        self.redis.delete(self.KEY_PREFIX + name)
+                    except Exception as e:
+                        print(f"Erro ao limpar circuito compartilhado de {name}: {e}")
+
+    def scoreboard(self, models: Sequence[str] = ()) -> List[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            for model in models:
+                self._health(model)
+            return [health.snapshot(now) for health in self._models.values()]
+
+
+@lru_cache(maxsize=1)
+def get_model_health_tracker() -> ModelHealthTracker:
+    return ModelHealthTracker(redis_client=get_redis_client())
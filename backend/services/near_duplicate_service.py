@@ -0,0 +1,214 @@
+"""
+Detecção de emails quase duplicados (SimHash sobre shingles de palavras)
+Reaproveita a classificação de um email anterior quando a similaridade passa do limite
+"""
+
+import hashlib
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+from sqlalchemy.orm import Session
+from models.email_fingerprint import EmailFingerprint
+
+NEAR_DUPLICATE_ENABLED = os.getenv("NEAR_DUPLICATE_ENABLED", "True").lower() == "true"
+NEAR_DUPLICATE_SIMILARITY = float(os.getenv("NEAR_DUPLICATE_SIMILARITY", 0.9))
+NEAR_DUPLICATE_INDEX_SIZE = int(os.getenv("NEAR_DUPLICATE_INDEX_SIZE", 50000))
+NEAR_DUPLICATE_MIN_SHINGLES = int(os.getenv("NEAR_DUPLICATE_MIN_SHINGLES", 8))
+
+SIMHASH_BITS = 64
+SHINGLE_SIZE = 2
+
+# Partes variáveis de envios em massa que não devem diferenciar emails
+_URL_RE = re.compile(r'(https?://|www\.)\S+')
+_EMAIL_RE = re.compile(r'\S+@\S+')
+_DIGITS_RE = re.compile(r'\d+')
+_WORD_RE = re.compile(r'\w+')
+
+
+def _shingles(content: str) -> Counter:
+    """Normaliza o texto e gera shingles de palavras com suas frequências"""
+    text = content.lower()
+    text = _URL_RE.sub(' url ', text)
+    text = _EMAIL_RE.sub(' email ', text)
+    text = _DIGITS_RE.sub('0', text)
+    words = _WORD_RE.findall(text)
+    if len(words) < SHINGLE_SIZE:
+        return Counter([' '.join(words)]) if words else Counter()
+    return Counter(' '.join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1))
+
+
+def _feature_hash(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def compute_simhash(content: str) -> Tuple[Optional[int], int]:
+    """Retorna (simhash de 64 bits, quantidade de shingles); simhash é None para textos vazios"""
+    shingles = _shingles(content)
+    if not shingles:
+        return None, 0
+
+    weighted = [(_feature_hash(feature), weight) for feature, weight in shingles.items()]
+    total = sum(weight for _, weight in weighted)
+    fingerprint = 0
+    for bit in range(SIMHASH_BITS):
+        ones = sum(weight for hashed, weight in weighted if (hashed >> bit) & 1)
+        if ones * 2 > total:
+            fingerprint |= 1 << bit
+    return fingerprint, len(shingles)
+
+
+def similarity(a: int, b: int) -> float:
+    return 1.0 - bin(a ^ b).count('1') / SIMHASH_BITS
+
+
+def _to_signed(value: int) -> int:
+    """Converte para inteiro com sinal (coluna BIGINT)"""
+    return value - (1 << SIMHASH_BITS) if value >= 1 << (SIMHASH_BITS - 1) else value
+
+
+def _to_unsigned(value: int) -> int:
+    return value + (1 << SIMHASH_BITS) if value < 0 else value
+
+
+class SimHashIndex:
+    """
+    Índice em memória de SimHashes recentes.
+
+    Pelo princípio da casa dos pombos, dois hashes com distância de Hamming <= k coincidem
+    em pelo menos uma de k + 1 faixas de bits; cada faixa é um dicionário, então a busca só
+    compara candidatos que compartilham alguma faixa.
+    """
+
+    def __init__(self, min_similarity: float = NEAR_DUPLICATE_SIMILARITY, max_size: int = NEAR_DUPLICATE_INDEX_SIZE):
+        self.min_similarity = min_similarity
+        self.max_size = max_size
+        self.max_distance = int((1.0 - min_similarity) * SIMHASH_BITS)
+        band_count = self.max_distance + 1
+        band_width = SIMHASH_BITS // band_count
+        self._bands = [
+            (i * band_width, SIMHASH_BITS if i == band_count - 1 else (i + 1) * band_width)
+            for i in range(band_count)
+        ]
+        # email_id -> (simhash, classification_id)
+        self._entries: "OrderedDict[int, Tuple[int, int]]" = OrderedDict()
+        self._buckets: List[Dict[int, Set[int]]] = [{} for _ in self._bands]
+        self._lock = threading.Lock()
+        self.loaded = False
+
+    def _band_values(self, fingerprint: int):
+        for index, (start, end) in enumerate(self._bands):
+            yield index, (fingerprint >> start) & ((1 << (end - start)) - 1)
+
+    def add(self, email_id: int, classification_id: int, fingerprint: int):
+        with self._lock:
+            if email_id in self._entries:
+                return
+            self._entries[email_id] = (fingerprint, classification_id)
+            for index, value in self._band_values(fingerprint):
+                self._buckets[index].setdefault(value, set()).add(email_id)
+            while len(self._entries) > self.max_size:
+                self._remove_oldest()
+
+    def _remove_oldest(self):
+        email_id, (fingerprint, _) = self._entries.popitem(last=False)
+        for index, value in self._band_values(fingerprint):
+            bucket = self._buckets[index].get(value)
+            if bucket is not None:
+                bucket.discard(email_id)
+                if not bucket:
+                    del self._buckets[index][value]
+
+    def find(self, fingerprint: int) -> Optional[Tuple[int, int, float]]:
+        """Retorna (email_id, classification_id, similaridade) do vizinho mais próximo acima do limite"""
+        best = None
+        with self._lock:
+            candidates = set()
+            for index, value in self._band_values(fingerprint):
+                candidates.update(self._buckets[index].get(value, ()))
+            for email_id in candidates:
+                stored, classification_id = self._entries[email_id]
+                score = similarity(fingerprint, stored)
+                if score >= self.min_similarity and (best is None or score > best[2]):
+                    best = (email_id, classification_id, score)
+        return best
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_index = SimHashIndex()
+_load_lock = threading.Lock()
+
+
+class NearDuplicateService:
+    def __init__(self, db: Session, index: SimHashIndex = None, autocommit: bool = True):
+        self.db = db
+        self.index = index or _index
+        self.autocommit = autocommit
+        # Fingerprints aguardando o commit de quem chamou para entrar no índice em memória
+        self.pending: List[Tuple[int, int, int]] = []
+
+    def _ensure_loaded(self):
+        """Carrega do banco os fingerprints mais recentes na primeira utilização do processo"""
+        if self.index.loaded:
+            return
+        with _load_lock:
+            if self.index.loaded:
+                return
+            try:
+                rows = self.db.query(
+                    EmailFingerprint.email_id,
+                    EmailFingerprint.classification_id,
+                    EmailFingerprint.simhash
+                ).filter(
+                    EmailFingerprint.derived_from_email_id.is_(None)
+                ).order_by(EmailFingerprint.id.desc()).limit(self.index.max_size).all()
+                for email_id, classification_id, fingerprint in reversed(rows):
+                    self.index.add(email_id, classification_id, _to_unsigned(fingerprint))
+            except Exception as e:
+                print(f"Erro ao carregar índice de quase-duplicatas: {e}")
+            self.index.loaded = True
+
+    def fingerprint(self, content: str) -> Optional[int]:
+        """SimHash do conteúdo, ou None quando o texto é curto demais para comparação confiável"""
+        fingerprint, shingle_count = compute_simhash(content)
+        if fingerprint is None or shingle_count < NEAR_DUPLICATE_MIN_SHINGLES:
+            return None
+        return fingerprint
+
+    def find_duplicate(self, fingerprint: Optional[int]) -> Optional[Tuple[int, int, float]]:
+        if not NEAR_DUPLICATE_ENABLED or fingerprint is None:
+            return None
+        self._ensure_loaded()
+        return self.index.find(fingerprint)
+
+    def record(self, email_id: int, classification_id: int, fingerprint: Optional[int],
+               derived_from_email_id: int = None, score: float = None) -> Optional[EmailFingerprint]:
+        """Persiste o fingerprint; apenas emails classificados do zero entram no índice em memória"""
+        if not NEAR_DUPLICATE_ENABLED or fingerprint is None:
+            return None
+        db_fingerprint = EmailFingerprint(
+            email_id=email_id,
+            classification_id=classification_id,
+            simhash=_to_signed(fingerprint),
+            derived_from_email_id=derived_from_email_id,
+            similarity=score
+        )
+        self.db.add(db_fingerprint)
+        if derived_from_email_id is None:
+            self.pending.append((email_id, classification_id, fingerprint))
+        if self.autocommit:
+            self.db.commit()
+            self.index_pending()
+        return db_fingerprint
+
+    def index_pending(self):
+        """Adiciona ao índice os fingerprints já gravados (chamado após o commit)"""
+        if not self.pending:
+            return
+        self._ensure_loaded()
+        for email_id, classification_id, fingerprint in self.pending:
+            self.index.add(email_id, classification_id, fingerprint)
+        self.pending.clear()
@@ -45,7 +45,10 @@ class NLPService:
         """Extrair características do texto para classificação"""
         processed_text = self.preprocess_text(text)
         tokens = self.tokenize_and_clean(processed_text)
-        
+        return self.features_from_tokens(tokens)
+
+    def features_from_tokens(self, tokens: List[str]) -> Dict[str, any]:
+        """Calcular características a partir de tokens já limpos"""
         features = {
             'word_count': len(tokens),
             'unique_words': len(set(tokens)),
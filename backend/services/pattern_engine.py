@@ -0,0 +1,162 @@
+"""
+Motor de padrões compilados: varre o texto uma única vez para todos os grupos de regex
+"""
+
+import re
+from typing import Dict, FrozenSet, List, Tuple
+
+# Caracteres que encerram o prefixo literal de um padrão
+_REGEX_METACHARS = set('\\.^$*+?{}[]|()')
+
+
+# Quantificadores que podem zerar o caractere anterior ('colou?r' também casa "color")
+_OPTIONAL_QUANTIFIERS = set('?*{')
+
+
+def _has_top_level_alternation(pattern: str) -> bool:
+    depth = 0
+    escaped = in_class = False
+    for char in pattern:
+        if escaped:
+            escaped = False
+        elif char == '\\':
+            escaped = True
+        elif in_class:
+            in_class = char != ']'
+        elif char == '[':
+            in_class = True
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == '|' and depth == 0:
+            return True
+    return False
+
+
+def _literal_prefix(pattern: str) -> str:
+    """
+    Extrai o prefixo literal de um padrão (texto antes do primeiro metacaractere).
+    Se o metacaractere for um quantificador opcional, o último caractere não faz parte do prefixo;
+    com alternância no nível externo ('abc|xyz') não há prefixo comum.
+    """
+    if _has_top_level_alternation(pattern):
+        return ''
+    prefix = []
+    for char in pattern:
+        if char in _REGEX_METACHARS:
+            if char in _OPTIONAL_QUANTIFIERS and prefix:
+                prefix.pop()
+            break
+        prefix.append(char)
+    return ''.join(prefix)
+
+
+def _trie_regex(words: List[str]) -> str:
+    """Monta uma alternância fatorada em trie (prefixos comuns compartilhados)"""
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        branches = []
+        single_chars = []
+        for char in sorted(key for key in node if key):
+            child = node[char]
+            if list(child) == ['']:
+                single_chars.append(re.escape(char))
+            else:
+                branches.append(re.escape(char) + build(child))
+        if single_chars:
+            branches.append(single_chars[0] if len(single_chars) == 1 else f"[{''.join(single_chars)}]")
+        regex = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        return f"(?:{regex})?" if '' in node else regex
+
+    return build(trie)
+
+
+class PatternScan:
+    """Resultado de uma varredura: quais padrões de cada grupo foram encontrados"""
+
+    def __init__(self, matched: FrozenSet[Tuple[str, str, int]]):
+        self.matched = matched
+
+    def has(self, namespace: str, group: str, index: int) -> bool:
+        return (namespace, group, index) in self.matched
+
+    def group_hit(self, namespace: str, group: str) -> bool:
+        """Indica se algum padrão do grupo foi encontrado"""
+        return any(ns == namespace and g == group for ns, g, _ in self.matched)
+
+    def count(self, namespace: str, group: str = None) -> int:
+        """Conta padrões distintos encontrados no namespace (ou em um grupo específico)"""
+        return sum(
+            1 for ns, g, _ in self.matched
+            if ns == namespace and (group is None or g == group)
+        )
+
+
+class CompiledPatternEngine:
+    """
+    Reúne todos os padrões em uma única alternância pré-compilada.
+
+    Cada padrão é indexado pelo seu prefixo literal; a varredura procura todos os prefixos
+    de uma vez (alternância em trie dentro de um lookahead de largura zero, então ocorrências
+    sobrepostas não se perdem) e só confirma com o padrão completo nas posições candidatas.
+    O resultado é o mesmo de executar `re.search` para cada padrão, com uma única passada
+    sobre o texto.
+    """
+
+    def __init__(self, rule_sets: Dict[str, Dict[str, List[str]]], flags: int = re.IGNORECASE):
+        self.rule_sets = rule_sets
+        self.flags = flags
+        # Padrões sem prefixo literal precisam de busca completa
+        self._unprefixed: List[Tuple[Tuple[str, str, int], re.Pattern]] = []
+        prefixed = []
+
+        for namespace, groups in rule_sets.items():
+            for group, patterns in groups.items():
+                for index, pattern in enumerate(patterns):
+                    key = (namespace, group, index)
+                    compiled = re.compile(pattern, flags)
+                    prefix = _literal_prefix(pattern).lower()
+                    if prefix:
+                        prefixed.append((prefix, key, compiled))
+                    else:
+                        self._unprefixed.append((key, compiled))
+
+        # Basta o menor prefixo: se "pagamento" inicia na posição, "pagamento de" é confirmado depois.
+        # Nenhum prefixo mínimo é prefixo de outro, então cada posição casa com no máximo um deles.
+        prefixes = {prefix for prefix, _, _ in prefixed}
+        minimal = sorted(p for p in prefixes if not any(q != p and p.startswith(q) for q in prefixes))
+
+        # prefixo mínimo -> [(prefixo completo, chave, regex compilada)]
+        self._buckets: Dict[str, List[Tuple[str, Tuple[str, str, int], re.Pattern]]] = {}
+        for prefix, key, compiled in prefixed:
+            root = next(q for q in minimal if prefix.startswith(q))
+            self._buckets.setdefault(root, []).append((prefix, key, compiled))
+
+        # O texto chega em minúsculas, então a varredura dispensa IGNORECASE (bem mais rápida)
+        self._scanner = re.compile(f'(?=({_trie_regex(minimal)}))') if minimal else None
+
+    def scan(self, text: str) -> PatternScan:
+        """Varre o texto (já em minúsculas) uma única vez e retorna os padrões encontrados"""
+        matched = set()
+
+        if self._scanner is not None:
+            for candidate in self._scanner.finditer(text):
+                position = candidate.start()
+                for prefix, key, compiled in self._buckets[candidate.group(1)]:
+                    if key in matched or not text.startswith(prefix, position):
+                        continue
+                    if compiled.match(text, position):
+                        matched.add(key)
+
+        for key, compiled in self._unprefixed:
+            if compiled.search(text):
+                matched.add(key)
+
+        return PatternScan(frozenset(matched))
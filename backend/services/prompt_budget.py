@@ -0,0 +1,230 @@
+"""
+Orçamento de entrada do prompt de geração
+Remove respostas citadas e assinaturas e, se o email ainda exceder o orçamento do perfil
+(HUGGINGFACE_CONFIGS[perfil]['max_input_tokens']), mantém as frases mais relevantes
+segundo as palavras-chave encontradas
+"""
+
+import bisect
+import os
+import re
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Tuple
+from data.ai_models.huggingface_models import HUGGINGFACE_CONFIGS
+from .keyword_automaton import get_keyword_automaton
+from .rate_limiter import GENERATION_RESPONSE_PROFILE
+
+PROMPT_BUDGET_ENABLED = os.getenv("PROMPT_BUDGET_ENABLED", "True").lower() == "true"
+# Perfil cujo max_input_tokens limita o email no prompt
+PROMPT_BUDGET_PROFILE = os.getenv("PROMPT_BUDGET_PROFILE", GENERATION_RESPONSE_PROFILE)
+# Estimativa de caracteres por token (texto em português, tokenizadores BPE)
+PROMPT_CHARS_PER_TOKEN = float(os.getenv("PROMPT_CHARS_PER_TOKEN", 4))
+# Textos enormes (PDFs extraídos) só têm o início analisado na seleção de frases
+PROMPT_BUDGET_MAX_SCAN_CHARS = int(os.getenv("PROMPT_BUDGET_MAX_SCAN_CHARS", 200000))
+
+OMISSION_MARKER = " (...) "
+
+# Início de uma resposta citada: o restante do texto é o histórico da conversa
+_REPLY_HEADER_RE = re.compile(
+    r'^\s*(?:(?:em|on)\s.{0,200}(?:escreveu|wrote)\s*:'
+    r'|-{2,}\s*(?:mensagem original|original message|mensagem encaminhada|forwarded message)'
+    r'|_{5,})',
+    re.IGNORECASE
+)
+_HEADER_FROM_RE = re.compile(r'^\s*(?:de|from)\s*:\s*\S', re.IGNORECASE)
+_HEADER_SENT_RE = re.compile(r'^\s*(?:enviad[oa]|sent|data|date)\s*:', re.IGNORECASE)
+_QUOTED_LINE_RE = re.compile(r'^\s*>')
+# Assinaturas: delimitador padrão, rodapés de celular e fechamentos
+_SIGNATURE_DELIMITER_RE = re.compile(r'^\s*(?:--|__)\s*$|^\s*(?:enviado do meu|sent from my)\b', re.IGNORECASE)
+_CLOSING_RE = re.compile(
+    r'^\s*(?:atenciosamente|att\.?|abraços?|cordialmente|saudações|grato|grata|obrigad[oa]'
+    r'|best regards|kind regards|regards|best|thanks|sincerely)\s*[,!.]?\s*$',
+    re.IGNORECASE
+)
+# Linhas finais em que um fechamento é considerado início da assinatura
+_SIGNATURE_WINDOW = 12
+# Depois do início da assinatura só pode haver linhas curtas (nome, cargo, empresa, telefone)
+_SIGNATURE_MAX_LINES = 6
+_SIGNATURE_LINE_MAX_WORDS = 6
+_SIGNATURE_LINE_MAX_CHARS = 60
+_SENTENCE_RE = re.compile(r'[^.!?\n]+(?:[.!?]+|\n+|$)')
+
+
+def estimate_tokens(text: str) -> int:
+    return int(len(text) / PROMPT_CHARS_PER_TOKEN + 0.5)
+
+
+def input_budget(profile: str = None) -> int:
+    """Orçamento (tokens) do email para o perfil; perfis desconhecidos usam o padrão"""
+    config = HUGGINGFACE_CONFIGS.get(profile or PROMPT_BUDGET_PROFILE) or HUGGINGFACE_CONFIGS['medium']
+    return config['max_input_tokens']
+
+
+@dataclass
+class BudgetedContent:
+    """Email preparado para o prompt e quanto do original ficou de fora"""
+    content: str
+    original_tokens: int
+    tokens: int
+    budget: int
+    quoted_removed: bool = False
+    signature_removed: bool = False
+    trimmed: bool = False
+    sentences_dropped: int = 0
+
+    @property
+    def dropped_tokens(self) -> int:
+        return self.original_tokens - self.tokens
+
+
+def strip_quoted_replies(text: str) -> str:
+    """Remove o histórico citado (cabeçalhos de resposta/encaminhamento e linhas com '>')"""
+    lines = text.splitlines()
+    kept = []
+    for index, line in enumerate(lines):
+        if kept and (_REPLY_HEADER_RE.match(line) or (
+                _HEADER_FROM_RE.match(line) and
+                any(_HEADER_SENT_RE.match(following) for following in lines[index + 1:index + 4]))):
+            break
+        if not _QUOTED_LINE_RE.match(line):
+            kept.append(line)
+    return "\n".join(kept).strip()
+
+
+def _is_signature_line(line: str) -> bool:
+    """Linha curta de nome/cargo/contato: sem pergunta e sem terminar como frase"""
+    line = line.strip()
+    return (len(line) <= _SIGNATURE_LINE_MAX_CHARS and len(line.split()) <= _SIGNATURE_LINE_MAX_WORDS
+            and '?' not in line and not line.endswith(('.', '!', '…')))
+
+
+def _is_signature_tail(lines) -> bool:
+    """Indica se as linhas após o início da assinatura são só a assinatura (e não o corpo do email)"""
+    lines = [line for line in lines if line.strip()]
+    return len(lines) <= _SIGNATURE_MAX_LINES and all(_is_signature_line(line) for line in lines)
+
+
+def strip_signature(text: str) -> str:
+    """
+    Remove a assinatura: tudo após '--' ou 'Enviado do meu...'; após um fechamento
+    ('Atenciosamente,') mantém apenas a linha seguinte (nome de quem escreveu).
+    Só vale quando o que vem depois são linhas curtas de assinatura: um 'Obrigado!' no meio
+    do email ou um '--' separando itens não cortam o restante do texto.
+    """
+    lines = text.splitlines()
+    window_start = max(0, len(lines) - _SIGNATURE_WINDOW)
+    for index in range(1, len(lines)):
+        if _SIGNATURE_DELIMITER_RE.match(lines[index]) and _is_signature_tail(lines[index + 1:]):
+            return "\n".join(lines[:index]).strip()
+    for index in range(max(1, window_start), len(lines)):
+        if _CLOSING_RE.match(lines[index]) and _is_signature_tail(lines[index + 1:]):
+            return "\n".join(lines[:index + 2]).strip()
+    return text
+
+
+def select_sentences(text: str, budget_tokens: int) -> Tuple[str, int]:
+    """
+    Mantém as frases com mais palavras-chave (a primeira frase sempre entra) até o orçamento,
+    na ordem original; retorna (texto, frases descartadas)
+    """
+    scanned = text[:PROMPT_BUDGET_MAX_SCAN_CHARS]
+    sentences = [(match.start(), match.group().strip()) for match in _SENTENCE_RE.finditer(scanned)]
+    sentences = [(start, sentence) for start, sentence in sentences if sentence]
+    if not sentences:
+        return text[:int(budget_tokens * PROMPT_CHARS_PER_TOKEN)], 0
+
+    # Uma única varredura do autômato; cada ocorrência conta para a frase que a contém
+    starts = [start for start, _ in sentences]
+    scores = [0] * len(sentences)
+    for end in get_keyword_automaton().match_positions(scanned.lower()):
+        scores[bisect.bisect_right(starts, end) - 1] += 1
+    for position, (_, sentence) in enumerate(sentences):
+        if sentence.endswith('?'):
+            scores[position] += 1  # Perguntas costumam ser o que precisa de resposta
+
+    ranked = sorted(range(1, len(sentences)), key=lambda position: (-scores[position], position))
+    chosen = [0]
+    used = estimate_tokens(sentences[0][1])
+    for position in ranked:
+        cost = estimate_tokens(sentences[position][1]) + 1
+        if used + cost <= budget_tokens:
+            chosen.append(position)
+            used += cost
+
+    chosen.sort()
+    parts = []
+    for previous, position in zip([-1] + chosen, chosen):
+        if position != previous + 1 and parts:
+            parts.append(OMISSION_MARKER.strip())
+        parts.append(sentences[position][1])
+    content = " ".join(parts)
+    if chosen[-1] != len(sentences) - 1 or len(scanned) < len(text):
+        content += OMISSION_MARKER.rstrip()
+    # A primeira frase sozinha pode exceder o orçamento
+    max_chars = int(budget_tokens * PROMPT_CHARS_PER_TOKEN)
+    if len(content) > max_chars:
+        content = content[:max_chars].rstrip() + OMISSION_MARKER.rstrip()
+    return content, len(sentences) - len(chosen)
+
+
+# Quanto texto foi descartado no processo (exposto no painel de administração)
+_stats = {'budgeted': 0, 'trimmed': 0, 'quoted_removed': 0, 'signatures_removed': 0,
+          'sentences_dropped': 0, 'original_tokens': 0, 'dropped_tokens': 0}
+_stats_lock = threading.Lock()
+
+
+def _record(result: BudgetedContent):
+    with _stats_lock:
+        _stats['budgeted'] += 1
+        _stats['trimmed'] += int(result.trimmed)
+        _stats['quoted_removed'] += int(result.quoted_removed)
+        _stats['signatures_removed'] += int(result.signature_removed)
+        _stats['sentences_dropped'] += result.sentences_dropped
+        _stats['original_tokens'] += result.original_tokens
+        _stats['dropped_tokens'] += result.dropped_tokens
+
+
+def apply_budget(email_content: str, profile: str = None) -> BudgetedContent:
+    """Prepara o email para o prompt dentro do orçamento do perfil"""
+    budget = input_budget(profile)
+    original_tokens = estimate_tokens(email_content)
+
+    content = strip_quoted_replies(email_content) or email_content
+    quoted_removed = len(content) < len(email_content.strip())
+    without_signature = strip_signature(content)
+    signature_removed = len(without_signature) < len(content)
+    content = without_signature or content
+
+    sentences_dropped = 0
+    trimmed = estimate_tokens(content) > budget
+    if trimmed:
+        content, sentences_dropped = select_sentences(content, budget)
+
+    result = BudgetedContent(
+        content=content,
+        original_tokens=original_tokens,
+        tokens=estimate_tokens(content),
+        budget=budget,
+        quoted_removed=quoted_removed,
+        signature_removed=signature_removed,
+        trimmed=trimmed,
+        sentences_dropped=sentences_dropped
+    )
+    _record(result)
+    if trimmed:
+        print(f" Orçamento do prompt: {result.original_tokens} > {result.tokens} tokens "
+              f"({sentences_dropped} frases descartadas)")
+    return result
+
+
+def get_budget_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        stats = dict(_stats)
+    stats.update(
+        enabled=PROMPT_BUDGET_ENABLED,
+        profile=PROMPT_BUDGET_PROFILE,
+        budget=input_budget(),
+        chars_per_token=PROMPT_CHARS_PER_TOKEN
+    )
+    return stats
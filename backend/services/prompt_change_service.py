@@ -0,0 +1,208 @@
+"""
+Propagação de alterações de prompts entre workers
+Cada alteração grava uma geração em prompt_generations; os workers buscam apenas as gerações
+novas e recarregam os prompts dos pares alterados. O canal (Redis pub/sub ou PostgreSQL
+LISTEN/NOTIFY) só acorda os workers; sem canal, a consulta periódica limita o atraso.
+"""
+
+import json
+import os
+import select
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Tuple
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from config.database import DATABASE_URL, SessionLocal, engine
+from models.prompt import PromptType, PromptCategory
+from models.prompt_generation import PromptGeneration
+from .hybrid_prompt_service import get_prompt_cache
+from .redis_client import get_redis_client
+
+# auto | redis | postgres | poll | off (auto: Redis > PostgreSQL > consulta periódica)
+PROMPT_CHANGE_CHANNEL = os.getenv("PROMPT_CHANGE_CHANNEL", "auto").lower()
+# Atraso máximo para aplicar alterações de outros workers (também cobre notificações perdidas)
+PROMPT_CHANGE_POLL_INTERVAL = float(os.getenv("PROMPT_CHANGE_POLL_INTERVAL", 2.0))
+# Gerações recentes conferidas de novo: transações concorrentes podem gravar ids fora de ordem
+PROMPT_CHANGE_LOOKBACK = int(os.getenv("PROMPT_CHANGE_LOOKBACK", 20))
+
+NOTIFY_CHANNEL = "prompt_changes"
+REDIS_CHANNEL = "autou:prompt_changes"
+
+
+def resolve_channel() -> str:
+    if PROMPT_CHANGE_CHANNEL != "auto":
+        return PROMPT_CHANGE_CHANNEL
+    if get_redis_client() is not None:
+        return "redis"
+    if "postgresql" in DATABASE_URL:
+        return "postgres"
+    return "poll"
+
+
+def record_prompt_changes(db: Session, pairs: Iterable[Tuple[PromptType, PromptCategory]]) -> int:
+    """
+    Registra a alteração dos pares tipo/categoria (uma geração por par), notifica os outros
+    workers e aplica no processo atual; retorna a nova versão dos prompts
+    """
+    pairs = list(pairs)
+    if not pairs:
+        return get_prompt_cache().version
+    channel = resolve_channel()
+    rows = [PromptGeneration(prompt_type=prompt_type.value, category=category.value) for prompt_type, category in pairs]
+    db.add_all(rows)
+    db.flush()
+    changes = [(row.id, PromptType(row.prompt_type), PromptCategory(row.category)) for row in rows]
+    payload = json.dumps({'generation': max(row.id for row in rows)})
+    if channel == "postgres":
+        # Entregue pelo PostgreSQL somente após o commit
+        db.execute(text("SELECT pg_notify(:channel, :payload)"), {'channel': NOTIFY_CHANNEL, 'payload': payload})
+    db.commit()
+
+    version = get_prompt_cache().apply_changes(db, changes)
+    get_prompt_change_listener().mark_seen(generation for generation, _, _ in changes)
+    if channel == "redis":
+        try:
+            get_redis_client().publish(REDIS_CHANNEL, payload)
+        except Exception as e:
+            print(f"Erro ao publicar alteração de prompts: {e}")
+    return version
+
+
+class PromptChangeListener:
+    """Thread do processo que aplica as gerações gravadas por outros workers"""
+
+    def __init__(self, channel: str = None, poll_interval: float = PROMPT_CHANGE_POLL_INTERVAL):
+        self.channel = channel or resolve_channel()
+        self.poll_interval = poll_interval
+        self.cursor = 0
+        self._seen = deque(maxlen=PROMPT_CHANGE_LOOKBACK * 10)
+        self._seen_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pubsub = None
+        self._pg_connection = None
+        self.stats = {'polls': 0, 'notifications': 0, 'applied': 0, 'errors': 0}
+
+    def mark_seen(self, generations: Iterable[int]):
+        with self._seen_lock:
+            self._seen.extend(generations)
+
+    def start(self):
+        if self.channel == "off" or self._thread is not None:
+            return
+        with SessionLocal() as db:
+            self.cursor = db.query(PromptGeneration.id).order_by(PromptGeneration.id.desc()).limit(1).scalar() or 0
+        get_prompt_cache().listening = True
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="prompt-changes", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Encerra a thread e fecha o canal (chamado no encerramento da API)"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval + 1)
+            self._thread = None
+        self._reset_channel()
+        get_prompt_cache().listening = False
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if self._wait():
+                    self.stats['notifications'] += 1
+                self.poll()
+            except Exception as e:
+                print(f"Erro ao acompanhar alterações de prompts ({self.channel}): {e}")
+                self.stats['errors'] += 1
+                self._reset_channel()
+                self._stop.wait(self.poll_interval)
+
+    def _wait(self) -> bool:
+        """Espera uma notificação por até poll_interval; retorna True se alguma chegou"""
+        if self.channel == "redis":
+            if self._pubsub is None:
+                self._pubsub = get_redis_client().pubsub(ignore_subscribe_messages=True)
+                self._pubsub.subscribe(REDIS_CHANNEL)
+            notified = False
+            deadline = time.monotonic() + self.poll_interval
+            while time.monotonic() < deadline:
+                message = self._pubsub.get_message(timeout=max(0.0, deadline - time.monotonic()))
+                if message is not None:
+                    notified = True
+                    break
+            return notified
+
+        if self.channel == "postgres":
+            if self._pg_connection is None:
+                connection = engine.raw_connection()
+                connection.driver_connection.autocommit = True
+                connection.driver_connection.cursor().execute(f"LISTEN {NOTIFY_CHANNEL}")
+                self._pg_connection = connection
+            listener = self._pg_connection.driver_connection
+            if select.select([listener], [], [], self.poll_interval) == ([], [], []):
+                return False
+            listener.poll()
+            notified = bool(listener.notifies)
+            listener.notifies.clear()
+            return notified
+
+        self._stop.wait(self.poll_interval)
+        return False
+
+    def _reset_channel(self):
+        for resource in (self._pubsub, self._pg_connection):
+            try:
+                if resource is not None:
+                    resource.close()
+            except Exception:
+                pass
+        self._pubsub = None
+        self._pg_connection = None
+
+    def poll(self) -> int:
+        """Aplica as gerações ainda não vistas (consulta só as linhas novas, nunca a tabela de prompts inteira)"""
+        self.stats['polls'] += 1
+        with SessionLocal() as db:
+            rows = db.query(PromptGeneration.id, PromptGeneration.prompt_type, PromptGeneration.category).filter(
+                PromptGeneration.id > self.cursor - PROMPT_CHANGE_LOOKBACK
+            ).order_by(PromptGeneration.id).all()
+            with self._seen_lock:
+                seen = set(self._seen)
+            changes = [
+                (generation, PromptType(prompt_type), PromptCategory(category))
+                for generation, prompt_type, category in rows if generation not in seen
+            ]
+            if not changes:
+                return 0
+            get_prompt_cache().apply_changes(db, changes)
+
+        self.mark_seen(generation for generation, _, _ in changes)
+        self.cursor = max(self.cursor, max(generation for generation, _, _ in changes))
+        self.stats['applied'] += len(changes)
+        return len(changes)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(
+            self.stats,
+            channel=self.channel,
+            poll_interval=self.poll_interval,
+            cursor=self.cursor,
+            running=self._thread is not None and self._thread.is_alive()
+        )
+
+
+@lru_cache(maxsize=1)
+def get_prompt_change_listener() -> PromptChangeListener:
+    return PromptChangeListener()
+
+
+def start_prompt_change_listener():
+    """Inicia o acompanhamento de alterações (chamado na inicialização da API)"""
+    try:
+        get_prompt_change_listener().start()
+    except Exception as e:
+        print(f"Erro ao iniciar acompanhamento de alterações de prompts: {e}")
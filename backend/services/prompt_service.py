@@ -2,6 +2,8 @@ from sqlalchemy.orm import Session
 from sqlalchemy import desc
 from models.prompt import Prompt, PromptType, PromptCategory
 from schemas.prompt import PromptCreate, PromptUpdate
+from .keyset_pagination import paginate
+from .record_count_service import PROMPT_COUNTS, increment_counts, prompt_count_deltas, prompt_state
 from typing import List, Optional
 
 class PromptService:
@@ -12,6 +14,8 @@ class PromptService:
         """Cria um novo prompt"""
         db_prompt = Prompt(**prompt_data.model_dump())
         self.db.add(db_prompt)
+        self.db.flush()
+        increment_counts(self.db, PROMPT_COUNTS, prompt_count_deltas(None, prompt_state(db_prompt)))
         self.db.commit()
         self.db.refresh(db_prompt)
         return db_prompt
@@ -23,11 +27,10 @@ class PromptService:
             Prompt.is_active == True
         ).first()
 
-    def get_prompts(self, skip: int = 0, limit: int = 100) -> List[Prompt]:
-        """Lista todos os prompts ativos"""
-        return self.db.query(Prompt).filter(
-            Prompt.is_active == True
-        ).order_by(desc(Prompt.created_at)).offset(skip).limit(limit).all()
+    def get_prompts(self, skip: int = 0, limit: int = 100, cursor: Optional[str] = None) -> List[Prompt]:
+        """Lista todos os prompts ativos (offset ou cursor)"""
+        query = self.db.query(Prompt).filter(Prompt.is_active == True)
+        return paginate(query, Prompt.created_at, Prompt.id, cursor=cursor, skip=skip, limit=limit).all()
 
     def get_prompts_by_type(self, prompt_type: PromptType) -> List[Prompt]:
         """Busca prompts por tipo"""
@@ -49,11 +52,13 @@ class PromptService:
         if not db_prompt:
             return None
         
+        before = prompt_state(db_prompt)
         # Atualiza apenas os campos fornecidos
         update_data = prompt_data.model_dump(exclude_unset=True)
         for field, value in update_data.items():
             setattr(db_prompt, field, value)
         
+        increment_counts(self.db, PROMPT_COUNTS, prompt_count_deltas(before, prompt_state(db_prompt)))
         self.db.commit()
         self.db.refresh(db_prompt)
         return db_prompt
@@ -64,12 +69,13 @@ class PromptService:
         if not db_prompt:
             return False
         
+        increment_counts(self.db, PROMPT_COUNTS, prompt_count_deltas(prompt_state(db_prompt), None))
         db_prompt.is_active = False
         self.db.commit()
         return True
 
     def get_prompt_count(self) -> int:
-        """Conta total de prompts ativos"""
+        """Conta total de prompts ativos (COUNT exato; a rota usa RecordCountService)"""
         return self.db.query(Prompt).filter(
             Prompt.is_active == True
         ).count()
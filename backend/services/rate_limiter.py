@@ -0,0 +1,220 @@
+"""
+Limitador de taxa adaptativo do provedor de geração (token bucket)
+A taxa é aprendida com os 429 (redução multiplicativa, pausa pelo retry-after) e recuperada
+aos poucos com sucessos; o estado é compartilhado entre workers via Redis (script Lua atômico)
+ou mantido em memória pelo substituto local.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+from data.ai_models.huggingface_models import HUGGINGFACE_CONFIGS
+from .generation_client import Deadline, GenerationAborted
+from .redis_client import get_redis_client
+
+# Taxa inicial (requisições/s) e limites do aprendizado
+GENERATION_RATE_LIMIT = float(os.getenv("GENERATION_RATE_LIMIT", 1.0))
+GENERATION_RATE_MIN = float(os.getenv("GENERATION_RATE_MIN", 0.05))
+GENERATION_RATE_MAX = float(os.getenv("GENERATION_RATE_MAX", 5.0))
+GENERATION_RATE_BURST = float(os.getenv("GENERATION_RATE_BURST", 5))
+# Aumento aditivo por sucesso e fator de redução por 429 (AIMD)
+GENERATION_RATE_INCREASE = float(os.getenv("GENERATION_RATE_INCREASE", 0.02))
+GENERATION_RATE_DECREASE = float(os.getenv("GENERATION_RATE_DECREASE", 0.5))
+# Pausa quando o 429 não traz retry-after
+GENERATION_RATE_DEFAULT_BACKOFF = float(os.getenv("GENERATION_RATE_DEFAULT_BACKOFF", 5))
+# Espera máxima na fila antes de descartar a geração (usa template)
+GENERATION_RATE_MAX_WAIT = float(os.getenv("GENERATION_RATE_MAX_WAIT", 2.0))
+# Perfil de HUGGINGFACE_CONFIGS usado com folga total; reduzido conforme a folga diminui
+GENERATION_RESPONSE_PROFILE = os.getenv("GENERATION_RESPONSE_PROFILE", "medium")
+PROFILE_ORDER = ["short", "medium", "long"]
+# Folga (fração do balde) abaixo da qual o perfil desce um nível / vai para "short"
+GENERATION_HEADROOM_STEP_DOWN = float(os.getenv("GENERATION_HEADROOM_STEP_DOWN", 0.5))
+GENERATION_HEADROOM_SHORT = float(os.getenv("GENERATION_HEADROOM_SHORT", 0.2))
+
+
+class RateLimitShed(GenerationAborted):
+    """Geração descartada localmente para não exceder o limite do provedor"""
+
+
+# Mesma lógica do script Lua abaixo, para o substituto em memória
+def _apply(state: Dict[str, float], mode: str, now: float, arg: float) -> Tuple[int, float, float, float]:
+    rate = state.get('rate', GENERATION_RATE_LIMIT)
+    tokens = state.get('tokens', GENERATION_RATE_BURST)
+    updated_at = state.get('ts', now)
+    blocked_until = state.get('blocked_until', 0.0)
+    tokens = min(GENERATION_RATE_BURST, tokens + max(0.0, now - updated_at) * rate)
+
+    allowed, wait = 0, 0.0
+    if mode == 'acquire':
+        if now < blocked_until:
+            wait = blocked_until - now
+        elif tokens >= 1:
+            tokens -= 1
+            allowed = 1
+        else:
+            wait = (1 - tokens) / rate
+    elif mode == 'success':
+        rate = min(GENERATION_RATE_MAX, rate + GENERATION_RATE_INCREASE)
+    elif mode == 'throttle':
+        rate = max(GENERATION_RATE_MIN, rate * GENERATION_RATE_DECREASE)
+        blocked_until = max(blocked_until, now + arg)
+        tokens = 0.0
+
+    state.update(rate=rate, tokens=tokens, ts=now, blocked_until=blocked_until)
+    return allowed, tokens, wait, rate
+
+
+_LUA_SCRIPT = """
+local state = redis.call('HMGET', KEYS[1], 'rate', 'tokens', 'ts', 'blocked_until')
+local mode, now, arg = ARGV[1], tonumber(ARGV[2]), tonumber(ARGV[3])
+local initial, min_rate, max_rate, burst = tonumber(ARGV[4]), tonumber(ARGV[5]), tonumber(ARGV[6]), tonumber(ARGV[7])
+local increase, decrease = tonumber(ARGV[8]), tonumber(ARGV[9])
+local rate = tonumber(state[1]) or initial
+local tokens = tonumber(state[2]) or burst
+local ts = tonumber(state[3]) or now
+local blocked_until = tonumber(state[4]) or 0
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local allowed, wait = 0, 0
+if mode == 'acquire' then
+  if now < blocked_until then
+    wait = blocked_until - now
+  elseif tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+  else
+    wait = (1 - tokens) / rate
+  end
+elseif mode == 'success' then
+  rate = math.min(max_rate, rate + increase)
+elseif mode == 'throttle' then
+  rate = math.max(min_rate, rate * decrease)
+  blocked_until = math.max(blocked_until, now + arg)
+  tokens = 0
+end
+redis.call('HSET', KEYS[1], 'rate', rate, 'tokens', tokens, 'ts', now, 'blocked_until', blocked_until)
+redis.call('EXPIRE', KEYS[1], 86400)
+return {allowed, tostring(tokens), tostring(wait), tostring(rate)}
+"""
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket do provedor de geração.
+
+    `acquire` espera na fila enquanto a espera couber em GENERATION_RATE_MAX_WAIT e no prazo
+    da requisição; caso contrário descarta a geração (RateLimitShed) e a resposta vem do template.
+    """
+
+    KEY = "autou:generation_rate"
+
+    def __init__(self, redis_client=None, max_wait: float = GENERATION_RATE_MAX_WAIT):
+        self.redis = redis_client
+        self.max_wait = max_wait
+        self._script = None
+        if redis_client is not None and hasattr(redis_client, 'register_script'):
+            self._script = redis_client.register_script(_LUA_SCRIPT)
+        self._state: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.stats = {'acquired': 0, 'queued': 0, 'shed': 0, 'throttled': 0, 'waited_seconds': 0.0}
+        self._stats_lock = threading.Lock()
+
+    def _run(self, mode: str, arg: float = 0.0) -> Tuple[int, float, float, float]:
+        now = time.time()
+        if self._script is not None:
+            try:
+                allowed, tokens, wait, rate = self._script(
+                    keys=[self.KEY],
+                    args=[mode, now, arg, GENERATION_RATE_LIMIT, GENERATION_RATE_MIN, GENERATION_RATE_MAX,
+                          GENERATION_RATE_BURST, GENERATION_RATE_INCREASE, GENERATION_RATE_DECREASE]
+                )
+                return int(allowed), float(tokens), float(wait), float(rate)
+            except Exception as e:
+                print(f"Erro no limitador de taxa compartilhado (usando estado local): {e}")
+        with self._lock:
+            return _apply(self._state, mode, now, arg)
+
+    def _count(self, key: str, amount: float = 1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def _attempt(self, waited: float, deadline: Optional[Deadline]) -> Tuple[Optional[float], float]:
+        """Uma tentativa de reserva: (folga, 0) se reservou, (None, espera) se deve aguardar"""
+        allowed, tokens, wait, _ = self._run('acquire')
+        if allowed:
+            self._count('acquired')
+            if waited:
+                self._count('queued')
+                self._count('waited_seconds', waited)
+            return tokens / GENERATION_RATE_BURST, 0.0
+
+        budget = self.max_wait - waited
+        if deadline is not None:
+            budget = min(budget, deadline.remaining())
+        if wait > budget:
+            self._count('shed')
+            raise RateLimitShed(f"Limite de taxa local: espera de {wait:.1f}s excede o orçamento")
+        return None, wait
+
+    def acquire(self, deadline: Deadline = None) -> float:
+        """Reserva uma chamada ao provedor; retorna a folga do balde (0 a 1) após a reserva"""
+        waited = 0.0
+        while True:
+            headroom, wait = self._attempt(waited, deadline)
+            if headroom is not None:
+                return headroom
+            time.sleep(wait)
+            waited += wait
+
+    async def aacquire(self, deadline: Deadline = None) -> float:
+        """Variante assíncrona de acquire (espera sem bloquear o event loop)"""
+        waited = 0.0
+        while True:
+            headroom, wait = self._attempt(waited, deadline)
+            if headroom is not None:
+                return headroom
+            await asyncio.sleep(wait)
+            waited += wait
+
+    def on_success(self):
+        self._run('success')
+
+    def on_rate_limited(self, retry_after: float = None):
+        """429 do provedor: reduz a taxa e pausa o balde pelo retry-after"""
+        self._count('throttled')
+        self._run('throttle', retry_after if retry_after else GENERATION_RATE_DEFAULT_BACKOFF)
+
+    def profile_for(self, headroom: float, preferred: str = GENERATION_RESPONSE_PROFILE) -> str:
+        """Perfil de HUGGINGFACE_CONFIGS conforme a folga: menos folga, respostas mais curtas"""
+        index = PROFILE_ORDER.index(preferred) if preferred in PROFILE_ORDER else 1
+        if headroom < GENERATION_HEADROOM_SHORT:
+            index = 0
+        elif headroom < GENERATION_HEADROOM_STEP_DOWN:
+            index = max(0, index - 1)
+        return PROFILE_ORDER[index]
+
+    def generation_config(self, headroom: float) -> Dict[str, Any]:
+        profile = self.profile_for(headroom)
+        return dict(HUGGINGFACE_CONFIGS[profile], profile=profile)
+
+    def get_stats(self) -> Dict[str, Any]:
+        _, tokens, _, rate = self._run('peek')
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats.update(
+            rate=rate,
+            tokens=tokens,
+            burst=GENERATION_RATE_BURST,
+            headroom=tokens / GENERATION_RATE_BURST,
+            profile=self.profile_for(tokens / GENERATION_RATE_BURST),
+            shared=self._script is not None
+        )
+        return stats
+
+
+@lru_cache(maxsize=1)
+def get_rate_limiter() -> AdaptiveRateLimiter:
+    """Limitador do processo (estado compartilhado via Redis quando disponível)"""
+    return AdaptiveRateLimiter(redis_client=get_redis_client())
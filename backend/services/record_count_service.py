@@ -0,0 +1,206 @@
+"""
+Contadores de registros: histórico por ActionType e prompts ativos por categoria
+As contagens ficam na tabela record_counts, atualizada na mesma transação que grava os
+registros (no histórico com write-behind, no commit de cada lote), e a leitura é uma
+consulta pela chave primária em vez de um COUNT(*) com filtro a cada chamada.
+
+Modos de leitura (COUNT_MODE ou parâmetro `mode` das rotas):
+  - summary: tabela de contadores (padrão)
+  - exact: COUNT(*) como antes
+  - approximate: estimativa do PostgreSQL (pg_class.reltuples e frequências de pg_stats),
+    usada só se as estatísticas tiverem no máximo COUNT_APPROX_MAX_AGE segundos; senão summary
+"""
+
+import enum
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional, Tuple
+from sqlalchemy import func, select, text, update
+from sqlalchemy.orm import Session
+from models.record_count import RecordCount
+from models.historico import Historico, ActionType
+from models.prompt import Prompt
+
+COUNT_MODE = os.getenv("COUNT_MODE", "summary").lower()
+# Idade máxima (s) das estatísticas do PostgreSQL aceitas no modo approximate
+COUNT_APPROX_MAX_AGE = float(os.getenv("COUNT_APPROX_MAX_AGE", 3600))
+
+COUNT_MODES = ("summary", "exact", "approximate")
+
+# Entidades da tabela record_counts
+HISTORICO_COUNTS = "historico"
+PROMPT_COUNTS = "prompts_active"
+
+
+def _key(value: Any) -> str:
+    return value.value if isinstance(value, enum.Enum) else str(value)
+
+
+def increment_counts(db: Session, entity: str, deltas: Dict[Any, int]):
+    """Soma os deltas aos contadores na transação corrente (o commit é de quem chamou)"""
+    rows = [{'entity': entity, 'key': _key(key), 'count': delta} for key, delta in deltas.items() if delta]
+    if not rows:
+        return
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        statement = insert(RecordCount).values(rows)
+        db.execute(statement.on_conflict_do_update(
+            index_elements=[RecordCount.entity, RecordCount.key],
+            set_={'count': RecordCount.count + statement.excluded['count'], 'updated_at': func.now()}
+        ))
+        return
+    for row in rows:
+        result = db.execute(
+            update(RecordCount)
+            .where(RecordCount.entity == row['entity'], RecordCount.key == row['key'])
+            .values(count=RecordCount.count + row['count'], updated_at=func.now())
+        )
+        if result.rowcount == 0:
+            db.add(RecordCount(**row))
+            db.flush()
+
+
+def prompt_state(prompt: Prompt) -> Tuple[bool, Any]:
+    return bool(prompt.is_active), prompt.category
+
+
+def prompt_count_deltas(before: Optional[Tuple[bool, Any]], after: Optional[Tuple[bool, Any]]) -> Dict[Any, int]:
+    """Deltas por categoria entre dois estados (is_active, category) de um prompt"""
+    deltas: Dict[Any, int] = {}
+    for state, sign in ((before, -1), (after, 1)):
+        if state is not None and state[0]:
+            key = _key(state[1])
+            deltas[key] = deltas.get(key, 0) + sign
+    return deltas
+
+
+class RecordCountService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_counts(self, entity: str) -> Dict[str, int]:
+        rows = self.db.execute(
+            select(RecordCount.key, RecordCount.count).where(RecordCount.entity == entity)
+        ).all()
+        return {key: count for key, count in rows}
+
+    def _updated_at(self, entity: str) -> Optional[datetime]:
+        return self.db.execute(
+            select(func.max(RecordCount.updated_at)).where(RecordCount.entity == entity)
+        ).scalar()
+
+    def _replace(self, entity: str, counts: Iterable):
+        self.db.query(RecordCount).filter(RecordCount.entity == entity).delete(synchronize_session=False)
+        self.db.add_all([RecordCount(entity=entity, key=_key(key), count=count) for key, count in counts])
+
+    def rebuild(self) -> Dict[str, Dict[str, int]]:
+        """
+        Recalcula os contadores com COUNT(*) (inicialização, scripts que gravam direto nas tabelas).
+        Gravações concorrentes durante o recálculo podem ficar de fora: rodar com pouca carga.
+        """
+        self._replace(HISTORICO_COUNTS, self.db.query(
+            Historico.action_type, func.count(Historico.id)
+        ).group_by(Historico.action_type).all())
+        self._replace(PROMPT_COUNTS, self.db.query(
+            Prompt.category, func.count(Prompt.id)
+        ).filter(Prompt.is_active == True).group_by(Prompt.category).all())
+        self.db.commit()
+        return {entity: self.get_counts(entity) for entity in (HISTORICO_COUNTS, PROMPT_COUNTS)}
+
+    def ensure(self) -> bool:
+        """Recalcula se a tabela de contadores ainda estiver vazia (primeira execução)"""
+        if self.db.query(RecordCount.key).first() is not None:
+            return False
+        self.rebuild()
+        return True
+
+    def _approximate(self, table: str, column: str, value: Any) -> Optional[Dict[str, Any]]:
+        """Estimativa do planejador do PostgreSQL para `column = value`; None se indisponível ou antiga"""
+        if self.db.get_bind().dialect.name != "postgresql":
+            return None
+        row = self.db.execute(text(
+            "SELECT c.reltuples, GREATEST(s.last_analyze, s.last_autoanalyze) "
+            "FROM pg_class c LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid "
+            "WHERE c.oid = to_regclass(:table)"
+        ), {'table': table}).first()
+        if row is None or row[0] is None or row[0] < 0 or row[1] is None:
+            return None
+        age = (datetime.now(timezone.utc) - row[1]).total_seconds()
+        if age > COUNT_APPROX_MAX_AGE:
+            return None
+
+        stats = self.db.execute(text(
+            "SELECT most_common_vals::text, most_common_freqs FROM pg_stats "
+            "WHERE tablename = :table AND attname = :column"
+        ), {'table': table, 'column': column}).first()
+        if stats is None or stats[0] is None:
+            return None
+        accepted = {str(value).lower()}
+        if isinstance(value, enum.Enum):
+            accepted |= {value.name.lower(), str(value.value).lower()}
+        elif isinstance(value, bool):
+            accepted = {'t', 'true'} if value else {'f', 'false'}
+        values = [item.strip('"').lower() for item in stats[0].strip('{}').split(',')]
+        for item, frequency in zip(values, stats[1]):
+            if item in accepted:
+                return {
+                    'count': int(round(row[0] * frequency)),
+                    'mode': 'approximate',
+                    'as_of': row[1],
+                    'age_seconds': round(age, 1),
+                    'max_age_seconds': COUNT_APPROX_MAX_AGE
+                }
+        return None
+
+    def _summary(self, entity: str, keys: Optional[Iterable[Any]] = None) -> Dict[str, Any]:
+        counts = self.get_counts(entity)
+        as_of = self._updated_at(entity)
+        total = sum(counts.values()) if keys is None else sum(counts.get(_key(key), 0) for key in keys)
+        return {
+            'count': total,
+            'mode': 'summary',
+            'as_of': as_of,
+            'by_key': counts
+        }
+
+    def historico_count(self, action_type: ActionType = ActionType.CREATED, mode: str = None) -> Dict[str, Any]:
+        """Total de eventos do histórico de um tipo (padrão: emails classificados)"""
+        mode = mode or COUNT_MODE
+        if mode == "exact":
+            count = self.db.query(Historico).filter(Historico.action_type == action_type).count()
+            return {'count': count, 'mode': 'exact', 'as_of': datetime.now(timezone.utc)}
+        if mode == "approximate":
+            estimate = self._approximate(Historico.__tablename__, Historico.action_type.key, action_type)
+            if estimate is not None:
+                return estimate
+        return self._summary(HISTORICO_COUNTS, [action_type])
+
+    def active_prompt_count(self, mode: str = None) -> Dict[str, Any]:
+        """Total de prompts ativos"""
+        mode = mode or COUNT_MODE
+        if mode == "exact":
+            count = self.db.query(Prompt).filter(Prompt.is_active == True).count()
+            return {'count': count, 'mode': 'exact', 'as_of': datetime.now(timezone.utc)}
+        if mode == "approximate":
+            estimate = self._approximate(Prompt.__tablename__, Prompt.is_active.key, True)
+            if estimate is not None:
+                return estimate
+        return self._summary(PROMPT_COUNTS)
+
+
+def ensure_record_counts():
+    """Preenche os contadores na primeira inicialização (chamado na inicialização da API)"""
+    from config.database import SessionLocal
+    db = SessionLocal()
+    try:
+        if RecordCountService(db).ensure():
+            print("Contadores de registros recalculados")
+    except Exception as e:
+        db.rollback()
+        print(f"Erro ao preparar contadores de registros: {e}")
+    finally:
+        db.close()
@@ -0,0 +1,109 @@
+"""
+Cliente Redis compartilhado (REDIS_URL) com substituto em memória para uso local
+"""
+
+import os
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+try:
+    import redis  # type: ignore
+except ImportError:
+    redis = None
+
+
+class InMemoryRedis:
+    """
+    Substituto em memória com o subconjunto de comandos Redis usado pelo backend.
+
+    Serve para desenvolvimento sem Redis e para testes; não é compartilhado entre processos.
+    """
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[bytes, Optional[float]]] = {}
+        self._lock = threading.Lock()
+
+    def _alive(self, key: str) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self._data[key]
+            return None
+        return value
+
+    @staticmethod
+    def _encode(value) -> bytes:
+        if isinstance(value, bytes):
+            return value
+        return str(value).encode('utf-8')
+
+    def ping(self) -> bool:
+        return True
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            return self._alive(key)
+
+    def set(self, key: str, value, ex: int = None, nx: bool = False) -> bool:
+        with self._lock:
+            if nx and self._alive(key) is not None:
+                return False
+            expires_at = time.time() + ex if ex else None
+            self._data[key] = (self._encode(value), expires_at)
+            return True
+
+    def delete(self, *keys: str) -> int:
+        with self._lock:
+            removed = 0
+            for key in keys:
+                if self._data.pop(key, None) is not None:
+                    removed += 1
+            return removed
+
+    def incr(self, key: str, amount: int = 1) -> int:
+        with self._lock:
+            current = self._alive(key)
+            expires_at = self._data[key][1] if current is not None else None
+            value = int(current or 0) + amount
+            self._data[key] = (self._encode(value), expires_at)
+            return value
+
+    def expire(self, key: str, seconds: int) -> bool:
+        with self._lock:
+            current = self._alive(key)
+            if current is None:
+                return False
+            self._data[key] = (current, time.time() + seconds)
+            return True
+
+    def flushdb(self):
+        with self._lock:
+            self._data.clear()
+
+
+@lru_cache(maxsize=1)
+def get_redis_client():
+    """
+    Retorna o cliente Redis configurado em REDIS_URL (ou None se indisponível).
+
+    A conexão é verificada uma vez por processo; falhas desativam a camada compartilhada
+    em vez de interromper as requisições.
+    """
+    redis_url = os.getenv("REDIS_URL")
+    if not redis_url:
+        return None
+    if redis is None:
+        print(" Biblioteca 'redis' não instalada; camada compartilhada desativada")
+        return None
+
+    try:
+        client = redis.Redis.from_url(redis_url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        client.ping()
+        return client
+    except Exception as e:
+        print(f"Redis indisponível em {redis_url}: {e}")
+        return None
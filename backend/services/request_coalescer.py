@@ -0,0 +1,172 @@
+"""
+Coalescência de chamadas de geração (singleflight) pela hash do prompt formatado
+Emails idênticos que chegam juntos (campanhas) esperam a mesma chamada ao modelo em vez de
+dispararem uma cada; com Redis, a espera vale também entre workers (lock com SET NX)
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional
+from .generation_client import Deadline
+from .redis_client import get_redis_client
+
+GENERATION_COALESCING = os.getenv("GENERATION_COALESCING", "True").lower() == "true"
+# Coalescência entre workers (exige REDIS_URL)
+GENERATION_COALESCING_SHARED = os.getenv("GENERATION_COALESCING_SHARED", "True").lower() == "true"
+# Validade do lock (s): se o worker líder cair, os demais voltam a chamar o modelo
+COALESCING_LOCK_TTL = int(os.getenv("COALESCING_LOCK_TTL", 30))
+# Tempo (s) que o resultado do líder fica disponível para os workers que aguardam
+COALESCING_RESULT_TTL = int(os.getenv("COALESCING_RESULT_TTL", 10))
+COALESCING_POLL_INTERVAL = float(os.getenv("COALESCING_POLL_INTERVAL", 0.1))
+
+
+def prompt_key(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+
+
+class _Call:
+    """Chamada em andamento no processo; os seguidores esperam pelo evento"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.followers = 0
+
+
+class RequestCoalescer:
+    """
+    Singleflight por chave.
+
+    O primeiro chamador de uma chave (líder) executa a função; chamadores concorrentes com a
+    mesma chave recebem o mesmo resultado (ou a mesma exceção). Nada é guardado depois que a
+    chamada termina: reaproveitar resultados antigos é papel dos caches.
+    """
+
+    LOCK_PREFIX = "autou:coalesce:lock:"
+    RESULT_PREFIX = "autou:coalesce:result:"
+
+    def __init__(self, redis_client=None, lock_ttl: int = COALESCING_LOCK_TTL,
+                 result_ttl: int = COALESCING_RESULT_TTL, poll_interval: float = COALESCING_POLL_INTERVAL):
+        self.redis = redis_client
+        self.lock_ttl = lock_ttl
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self.stats = {'calls': 0, 'leaders': 0, 'coalesced': 0, 'coalesced_shared': 0, 'shared_timeouts': 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, key: str, amount: int = 1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def run(self, key: str, fn: Callable[[], Any], deadline: Deadline = None) -> Any:
+        """Executa `fn` uma única vez por chave entre os chamadores concorrentes"""
+        self._count('calls')
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.followers += 1
+
+        if not leader:
+            # Seguidor: esperar o líder dentro do prazo da requisição
+            if call.done.wait(deadline.remaining() if deadline is not None else None):
+                self._count('coalesced')
+                if call.error is not None:
+                    raise call.error
+                return call.result
+            # Prazo esgotado antes do líder terminar: seguir sem resultado (o chamador usa template)
+            return None
+
+        try:
+            call.result = self._run_shared(key, fn, deadline)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def _run_shared(self, key: str, fn: Callable[[], Any], deadline: Deadline = None) -> Any:
+        """Líder do processo: com Redis, só um worker chama o modelo; os demais leem o resultado"""
+        if self.redis is None:
+            self._count('leaders')
+            return fn()
+
+        lock_key, result_key = self.LOCK_PREFIX + key, self.RESULT_PREFIX + key
+        try:
+            acquired = self.redis.set(lock_key, "1", ex=self.lock_ttl, nx=True)
+        except Exception as e:
+            print(f"Erro no lock de coalescência compartilhado: {e}")
+            self._count('leaders')
+            return fn()
+
+        if not acquired:
+            found, result = self._wait_shared(lock_key, result_key, deadline)
+            if found:
+                self._count('coalesced_shared')
+                return result
+            self._count('shared_timeouts')
+
+        self._count('leaders')
+        try:
+            result = fn()
+            try:
+                self.redis.set(result_key, json.dumps({'result': result}, ensure_ascii=False), ex=self.result_ttl)
+            except Exception as e:
+                print(f"Erro ao publicar resultado coalescido: {e}")
+            return result
+        finally:
+            if acquired:
+                try:
+                    self.redis.delete(lock_key)
+                except Exception as e:
+                    print(f"Erro ao liberar lock de coalescência: {e}")
+
+    def _wait_shared(self, lock_key: str, result_key: str, deadline: Deadline = None):
+        """Aguarda o resultado do worker líder; (False, None) se o lock sumir sem resultado ou o prazo acabar"""
+        wait_until = time.monotonic() + self.lock_ttl
+        while True:
+            try:
+                raw = self.redis.get(result_key)
+                if raw is not None:
+                    return True, json.loads(raw)['result']
+                if not self.redis.get(lock_key):
+                    # Lock liberado (ou expirado) sem resultado publicado: o líder falhou
+                    raw = self.redis.get(result_key)
+                    return (True, json.loads(raw)['result']) if raw is not None else (False, None)
+            except Exception as e:
+                print(f"Erro ao aguardar resultado coalescido: {e}")
+                return False, None
+
+            remaining = wait_until - time.monotonic()
+            if deadline is not None:
+                remaining = min(remaining, deadline.remaining())
+            if remaining <= 0:
+                return False, None
+            time.sleep(min(self.poll_interval, remaining))
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self.stats)
+        with self._lock:
+            stats['in_flight'] = len(self._calls)
+            stats['waiting'] = sum(call.followers for call in self._calls.values())
+        stats['saved_calls'] = stats['coalesced'] + stats['coalesced_shared']
+        stats['shared'] = self.redis is not None
+        return stats
+
+
+@lru_cache(maxsize=1)
+def get_request_coalescer() -> RequestCoalescer:
+    return RequestCoalescer(redis_client=get_redis_client() if GENERATION_COALESCING_SHARED else None)
@@ -0,0 +1,160 @@
+"""
+Cache persistente de respostas sugeridas (tabela response_cache)
+Chave: hash do prompt resolvido + hash do email normalizado; sobrevive a reinícios e é
+compartilhado por todos os workers que usam o mesmo banco
+"""
+
+import hashlib
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, Optional
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from models.response_cache import ResponseCacheEntry
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "True").lower() == "true"
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", 7 * 24 * 3600))  # 7 dias
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 10000))
+# A limpeza (expirados + excesso pelo uso mais antigo) roda a cada N gravações no processo
+RESPONSE_CACHE_EVICT_EVERY = int(os.getenv("RESPONSE_CACHE_EVICT_EVERY", 100))
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# Contadores do processo (o conteúdo do cache fica no banco)
+_stats = {'hits': 0, 'misses': 0, 'writes': 0, 'evicted': 0, 'invalidated': 0}
+_stats_lock = threading.Lock()
+
+
+def _count(key: str, amount: int = 1):
+    with _stats_lock:
+        _stats[key] += amount
+
+
+def prompt_hash(prompt_template: str) -> str:
+    return hashlib.sha256(prompt_template.encode('utf-8')).hexdigest()
+
+
+def email_fingerprint(email_content: str) -> str:
+    """Hash do email normalizado (espaços e maiúsculas não diferenciam respostas)"""
+    normalized = _WHITESPACE_RE.sub(' ', email_content).strip().lower()
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+def make_key(prompt_template: str, email_content: str) -> str:
+    return hashlib.sha256(
+        f"{prompt_hash(prompt_template)}:{email_fingerprint(email_content)}".encode('utf-8')
+    ).hexdigest()
+
+
+class ResponseCacheService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get(self, prompt_template: str, email_content: str) -> Optional[str]:
+        """Resposta gravada para o prompt e o email (None se ausente ou expirada)"""
+        now = time.time()
+        try:
+            entry = self.db.query(ResponseCacheEntry).filter(
+                ResponseCacheEntry.cache_key == make_key(prompt_template, email_content),
+                ResponseCacheEntry.expires_at > now
+            ).first()
+            if entry is None:
+                _count('misses')
+                return None
+            
+            self.db.query(ResponseCacheEntry).filter(ResponseCacheEntry.id == entry.id).update(
+                {'hits': ResponseCacheEntry.hits + 1, 'last_used_at': now}, synchronize_session=False
+            )
+            self.db.commit()
+            _count('hits')
+            return entry.suggested_response
+        except Exception as e:
+            print(f"Erro ao ler cache de respostas: {e}")
+            self.db.rollback()
+            return None
+
+    def set(self, prompt_template: str, email_content: str, suggested_response: str):
+        if not suggested_response:
+            return
+        now = time.time()
+        cache_key = make_key(prompt_template, email_content)
+        try:
+            updated = self.db.query(ResponseCacheEntry).filter(ResponseCacheEntry.cache_key == cache_key).update(
+                {'suggested_response': suggested_response, 'expires_at': now + RESPONSE_CACHE_TTL, 'last_used_at': now},
+                synchronize_session=False
+            )
+            if not updated:
+                self.db.add(ResponseCacheEntry(
+                    cache_key=cache_key,
+                    prompt_hash=prompt_hash(prompt_template),
+                    suggested_response=suggested_response,
+                    hits=0,
+                    expires_at=now + RESPONSE_CACHE_TTL,
+                    last_used_at=now
+                ))
+            self.db.commit()
+        except IntegrityError:
+            # Outro worker gravou a mesma chave ao mesmo tempo
+            self.db.rollback()
+            return
+        except Exception as e:
+            print(f"Erro ao gravar cache de respostas: {e}")
+            self.db.rollback()
+            return
+        
+        _count('writes')
+        if _stats['writes'] % RESPONSE_CACHE_EVICT_EVERY == 0:
+            self.evict()
+
+    def evict(self) -> int:
+        """Remove entradas expiradas e, acima do limite, as usadas há mais tempo"""
+        try:
+            removed = self.db.query(ResponseCacheEntry).filter(
+                ResponseCacheEntry.expires_at <= time.time()
+            ).delete(synchronize_session=False)
+            
+            excess = self.db.query(ResponseCacheEntry).count() - RESPONSE_CACHE_MAX_ENTRIES
+            if excess > 0:
+                oldest = [row.id for row in self.db.query(ResponseCacheEntry.id).order_by(
+                    ResponseCacheEntry.last_used_at
+                ).limit(excess)]
+                removed += self.db.query(ResponseCacheEntry).filter(
+                    ResponseCacheEntry.id.in_(oldest)
+                ).delete(synchronize_session=False)
+            self.db.commit()
+        except Exception as e:
+            print(f"Erro na limpeza do cache de respostas: {e}")
+            self.db.rollback()
+            return 0
+        _count('evicted', removed)
+        return removed
+
+    def invalidate(self, prompt_template: Optional[str] = None) -> int:
+        """Remove as respostas de um prompt (ou todas, sem prompt)"""
+        try:
+            query = self.db.query(ResponseCacheEntry)
+            if prompt_template is not None:
+                query = query.filter(ResponseCacheEntry.prompt_hash == prompt_hash(prompt_template))
+            removed = query.delete(synchronize_session=False)
+            self.db.commit()
+        except Exception as e:
+            print(f"Erro ao invalidar cache de respostas: {e}")
+            self.db.rollback()
+            return 0
+        _count('invalidated', removed)
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        with _stats_lock:
+            stats = dict(_stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        try:
+            stats['entries'] = self.db.query(ResponseCacheEntry).count()
+        except Exception as e:
+            print(f"Erro ao contar cache de respostas: {e}")
+            stats['entries'] = None
+        stats.update(enabled=RESPONSE_CACHE_ENABLED, ttl=RESPONSE_CACHE_TTL, max_entries=RESPONSE_CACHE_MAX_ENTRIES)
+        return stats
@@ -0,0 +1,21 @@
+"""
+Base dos serviços que gravam registros na sessão recebida
+Com autocommit (padrão), cada gravação é confirmada na hora; sem autocommit (UnitOfWork),
+as inserções só recebem flush e o commit é de quem chamou.
+"""
+
+from sqlalchemy.orm import Session
+
+
+class SessionService:
+    def __init__(self, db: Session, autocommit: bool = True):
+        self.db = db
+        self.autocommit = autocommit
+
+    def _save(self, instance):
+        self.db.add(instance)
+        if self.autocommit:
+            self.db.commit()
+            self.db.refresh(instance)
+        else:
+            self.db.flush()  # Obter o ID sem encerrar a transação
@@ -0,0 +1,53 @@
+"""
+Unidade de trabalho para o caminho de gravação da classificação
+Email, classificação, histórico e fingerprint são gravados com flush (para obter os IDs)
+e confirmados em um único commit, em vez de um commit + refresh por registro
+"""
+
+from sqlalchemy.orm import Session
+from .email_service import EmailService
+from .classification_service import ClassificationService
+from .historico_service import HistoricoService
+from .near_duplicate_service import NearDuplicateService
+
+
+class UnitOfWork:
+    """
+    Serviços que compartilham a sessão sem commit próprio.
+
+    Uso:
+        with UnitOfWork(db) as uow:
+            email = uow.emails.create_email(email_data)
+            ...
+    Ao sair do bloco sem exceção, faz o commit; com exceção, desfaz tudo.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.emails = EmailService(db, autocommit=False)
+        self.classifications = ClassificationService(db, autocommit=False)
+        self.historico = HistoricoService(db, autocommit=False)
+        self.fingerprints = NearDuplicateService(db, autocommit=False)
+        self.committed = False
+
+    def commit(self):
+        self.db.commit()
+        self.committed = True
+        # Só emails efetivamente gravados entram no índice de quase-duplicatas e no histórico
+        self.fingerprints.index_pending()
+        self.historico.enqueue_pending()
+
+    def rollback(self):
+        self.db.rollback()
+        self.fingerprints.pending.clear()
+        self.historico.pending.clear()
+
+    def __enter__(self) -> "UnitOfWork":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is not None:
+            self.rollback()
+        elif not self.committed:
+            self.commit()
+        return False
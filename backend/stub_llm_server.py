@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Servidor local compatível com a API OpenAI (chat/completions) para testar a geração
+sem acessar o Hugging Face Router.
+
+Uso:
+    python stub_llm_server.py --port 8099 --latency 0.2 --fail-model meta-llama/Llama-3.1-8B-Instruct
+    HF_TOKEN=stub HF_BASE_URL=http://127.0.0.1:8099/v1 python run.py
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import time
+import uuid
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+app = FastAPI(title="Stub LLM Server")
+settings = {
+    'latency': 0.0,
+    'fail_models': set(),
+    'slow_models': {},
+    'rate_limit_every': 0,
+    'retry_after': 1,
+    'token_delay': 0.05
+}
+request_counter = itertools.count(1)
+
+
+def completion(model: str, content: str) -> dict:
+    return {
+        'id': f"chatcmpl-{uuid.uuid4().hex}",
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': model,
+        'choices': [{
+            'index': 0,
+            'message': {'role': 'assistant', 'content': content},
+            'finish_reason': 'stop'
+        }],
+        'usage': {'prompt_tokens': 0, 'completion_tokens': len(content.split()), 'total_tokens': len(content.split())}
+    }
+
+
+async def completion_chunks(model: str, content: str):
+    """Resposta em streaming (stream=true): um chunk SSE por palavra"""
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    words = content.split(' ')
+    for index, word in enumerate(words):
+        chunk = {
+            'id': completion_id,
+            'object': 'chat.completion.chunk',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{
+                'index': 0,
+                'delta': {'content': word if index == 0 else ' ' + word},
+                'finish_reason': 'stop' if index == len(words) - 1 else None
+            }]
+        }
+        yield f"data: {json.dumps(chunk)}\n\n"
+        await asyncio.sleep(settings['token_delay'])
+    yield "data: [DONE]\n\n"
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    model = body.get('model', 'stub')
+    number = next(request_counter)
+
+    await asyncio.sleep(settings['slow_models'].get(model, settings['latency']))
+
+    if settings['rate_limit_every'] and number % settings['rate_limit_every'] == 0:
+        return JSONResponse(
+            status_code=429,
+            content={'error': {'message': 'Rate limit reached', 'type': 'rate_limit'}},
+            headers={'retry-after': str(settings['retry_after'])}
+        )
+    if model in settings['fail_models']:
+        return JSONResponse(status_code=503, content={'error': {'message': f'Model {model} unavailable'}})
+
+    prompt = body['messages'][-1]['content']
+    content = (
+        f"Resposta gerada por {model} (max_tokens={body.get('max_tokens')}). "
+        f"Recebemos sua mensagem de {len(prompt)} caracteres e retornaremos em breve."
+    )
+    if body.get('stream'):
+        return StreamingResponse(completion_chunks(model, content), media_type="text/event-stream")
+    return completion(model, content)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor OpenAI-compatível para testes locais")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--latency', type=float, default=0.0, help="Atraso (s) de cada resposta")
+    parser.add_argument('--fail-model', action='append', default=[], help="Modelo que sempre responde 503")
+    parser.add_argument('--slow-model', action='append', default=[], help="modelo=segundos com atraso próprio")
+    parser.add_argument('--rate-limit-every', type=int, default=0, help="Responde 429 a cada N requisições")
+    parser.add_argument('--retry-after', type=float, default=1, help="Valor do header retry-after nos 429")
+    parser.add_argument('--token-delay', type=float, default=0.05, help="Intervalo (s) entre chunks no streaming")
+    args = parser.parse_args()
+
+    settings.update(
+        latency=args.latency,
+        fail_models=set(args.fail_model),
+        slow_models={m: float(s) for m, s in (item.rsplit('=', 1) for item in args.slow_model)},
+        rate_limit_every=args.rate_limit_every,
+        retry_after=args.retry_after,
+        token_delay=args.token_delay
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import os
+import socket
+import sys
+import threading
+import time
+
+import pytest
+
+# Os testes importam os módulos do backend como os scripts (services, models, config)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def stub_url():
+    """stub_llm_server.py rodando em uma thread (API compatível com OpenAI)"""
+    import uvicorn
+    import stub_llm_server
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(stub_llm_server.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.02)
+    yield f"http://127.0.0.1:{port}/v1"
+    server.should_exit = True
+    thread.join(timeout=5)
+
+
+@pytest.fixture
+def stub_settings():
+    """Comportamento do stub por teste (latência, 429, falhas), restaurado ao final"""
+    import stub_llm_server
+
+    original = dict(stub_llm_server.settings)
+    stub_llm_server.settings.update(
+        latency=0.0, fail_models=set(), slow_models={}, rate_limit_every=0, retry_after=1, token_delay=0.0
+    )
+    yield stub_llm_server.settings
+    stub_llm_server.settings.clear()
+    stub_llm_server.settings.update(original)
@@ -0,0 +1,149 @@
+import json
+
+import pytest
+
+from services import classification_cache
+from services.classification_cache import ClassificationCache, LRUCache
+from services.redis_client import InMemoryRedis
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(classification_cache.time, "monotonic", fake)
+    monkeypatch.setattr("services.redis_client.time.time", fake)
+    return fake
+
+
+@pytest.fixture
+def fresh_ruleset_version():
+    classification_cache.get_ruleset_version.cache_clear()
+    yield
+    classification_cache.get_ruleset_version.cache_clear()
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(max_size=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "a" passa a ser o mais recente
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.evictions == 1
+    assert len(cache) == 2
+
+
+def test_lru_entries_expire_after_ttl(clock):
+    cache = LRUCache(max_size=10, ttl=5)
+    cache.set("a", 1)
+
+    clock.now += 4.9
+    assert cache.get("a") == 1
+    clock.now += 0.2
+    assert cache.get("a") is None
+    assert cache.expirations == 1
+    assert len(cache) == 0
+
+
+def test_redis_tier_serves_other_processes_and_promotes_to_local():
+    redis = InMemoryRedis()
+    writer = ClassificationCache(max_size=10, ttl=60, redis_client=redis)
+    reader = ClassificationCache(max_size=10, ttl=60, redis_client=redis)
+    key = writer.make_key("Qual o status do pedido?", prompt_version=1)
+    writer.set(key, {"category": "Produtivo", "confidence": 0.9})
+
+    assert json.loads(redis.get(key)) == {"category": "Produtivo", "confidence": 0.9}
+    assert reader.get(key) == {"category": "Produtivo", "confidence": 0.9}
+    assert reader.get(key) == {"category": "Produtivo", "confidence": 0.9}
+    assert (reader.redis_hits, reader.hits, reader.misses) == (1, 1, 0)
+
+
+def test_redis_entries_expire_with_cache_ttl(clock):
+    redis = InMemoryRedis()
+    cache = ClassificationCache(max_size=10, ttl=60, redis_client=redis)
+    key = cache.make_key("Feliz natal!")
+    cache.set(key, {"category": "Improdutivo"})
+    cache.clear()
+
+    clock.now += 61
+    assert cache.get(key) is None
+    assert cache.misses == 1
+
+
+def test_redis_errors_fall_back_to_miss():
+    class BrokenRedis:
+        def get(self, key):
+            raise ConnectionError("redis fora do ar")
+
+        def set(self, *args, **kwargs):
+            raise ConnectionError("redis fora do ar")
+
+    cache = ClassificationCache(max_size=10, ttl=60, redis_client=BrokenRedis())
+    key = cache.make_key("texto")
+    cache.set(key, {"category": "Produtivo"})
+    cache.clear()
+    assert cache.get(key) is None
+
+
+def test_key_ignores_whitespace_but_not_case():
+    cache = ClassificationCache(max_size=10, ttl=60)
+    assert cache.make_key("Status  do\n pedido") == cache.make_key("Status do pedido")
+    assert cache.make_key("STATUS do pedido") != cache.make_key("Status do pedido")
+
+
+def test_key_changes_with_prompt_version():
+    cache = ClassificationCache(max_size=10, ttl=60)
+    assert cache.make_key("Status do pedido", prompt_version=1) != cache.make_key("Status do pedido", prompt_version=2)
+
+
+def test_key_changes_with_ruleset(monkeypatch, fresh_ruleset_version):
+    cache = ClassificationCache(max_size=10, ttl=60)
+    before = cache.make_key("Status do pedido")
+
+    monkeypatch.setattr(classification_cache, "FALLBACK_KEYWORDS", {"nova": ["regra"]})
+    classification_cache.get_ruleset_version.cache_clear()
+
+    assert cache.make_key("Status do pedido") != before
+
+
+class TrainedModel:
+    def __init__(self, version: str):
+        self.version = version
+
+    def fingerprint(self) -> str:
+        return self.version
+
+
+def test_key_changes_with_linear_model_version(monkeypatch, fresh_ruleset_version):
+    cache = ClassificationCache(max_size=10, ttl=60)
+    monkeypatch.setattr(classification_cache, "LINEAR_CLASSIFIER_MODE", "tie_breaker")
+    monkeypatch.setattr(classification_cache, "get_linear_classifier", lambda: TrainedModel("20260101000000"))
+    before = cache.make_key("Status do pedido")
+
+    # Novo treino (train_linear_classifier.py) com as mesmas regras
+    monkeypatch.setattr(classification_cache, "get_linear_classifier", lambda: TrainedModel("20260201000000"))
+    classification_cache.get_ruleset_version.cache_clear()
+
+    assert cache.make_key("Status do pedido") != before
+
+
+def test_linear_model_is_ignored_when_disabled(monkeypatch, fresh_ruleset_version):
+    cache = ClassificationCache(max_size=10, ttl=60)
+    monkeypatch.setattr(classification_cache, "LINEAR_CLASSIFIER_MODE", "off")
+    before = cache.make_key("Status do pedido")
+
+    monkeypatch.setattr(classification_cache, "get_linear_classifier", lambda: TrainedModel("20260201000000"))
+    classification_cache.get_ruleset_version.cache_clear()
+
+    assert cache.make_key("Status do pedido") == before
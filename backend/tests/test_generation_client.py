@@ -0,0 +1,110 @@
+"""
+Cliente de geração contra o stub_llm_server.py (servidor local compatível com a API OpenAI)
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from services.generation_client import DeadlineExceeded, Deadline, GenerationClient, GenerationError
+from services.generation_scheduler import HedgedScheduler
+
+MODEL = "stub/model-a"
+FALLBACK_MODEL = "stub/model-b"
+
+
+@pytest.fixture
+def client(stub_url, stub_settings):
+    return GenerationClient("stub", base_url=stub_url, connect_timeout=1, read_timeout=2)
+
+
+def test_complete_returns_model_text(client):
+    assert client.complete(MODEL, "Olá", max_tokens=64).startswith(f"Resposta gerada por {MODEL} (max_tokens=64)")
+
+
+def test_rate_limit_is_reported_with_retry_after(client, stub_settings):
+    stub_settings.update(rate_limit_every=1, retry_after=7)
+
+    with pytest.raises(GenerationError) as error:
+        client.complete(MODEL, "Olá")
+
+    assert error.value.rate_limited
+    assert error.value.status_code == 429
+    assert error.value.retry_after == 7
+    assert error.value.model == MODEL
+
+
+def test_read_timeout_becomes_generation_error(stub_url, stub_settings):
+    stub_settings.update(latency=1.0)
+    client = GenerationClient("stub", base_url=stub_url, connect_timeout=1, read_timeout=0.2)
+
+    start = time.monotonic()
+    with pytest.raises(GenerationError, match="Timeout") as error:
+        client.complete(MODEL, "Olá")
+
+    assert not isinstance(error.value, DeadlineExceeded)
+    assert time.monotonic() - start < 0.9
+
+
+def test_deadline_bounds_the_call(client, stub_settings):
+    stub_settings.update(latency=1.0)
+
+    start = time.monotonic()
+    with pytest.raises(GenerationError):
+        client.complete(MODEL, "Olá", deadline=Deadline(0.3))
+
+    assert time.monotonic() - start < 0.9
+
+
+def test_expired_deadline_skips_the_call(client):
+    deadline = Deadline(0)
+    with pytest.raises(DeadlineExceeded):
+        client.complete(MODEL, "Olá", deadline=deadline)
+
+
+def test_stream_stops_when_deadline_expires(client, stub_settings):
+    stub_settings.update(token_delay=0.2)
+
+    async def consume():
+        chunks = []
+        with pytest.raises(DeadlineExceeded):
+            async for chunk in client.astream(MODEL, "Olá", deadline=Deadline(0.5)):
+                chunks.append(chunk)
+        return chunks
+
+    chunks = asyncio.run(consume())
+    assert 0 < len(chunks) < 10
+
+
+def test_stream_returns_full_text(client):
+    async def consume():
+        return "".join([chunk async for chunk in client.astream(MODEL, "Olá")])
+
+    assert asyncio.run(consume()) == client.complete(MODEL, "Olá")
+
+
+def test_scheduler_moves_to_next_model_after_rate_limit(client, stub_settings):
+    stub_settings.update(rate_limit_every=1)
+    scheduler = HedgedScheduler(hedge_delay=5, max_parallel=2)
+    calls = []
+
+    def call(model):
+        calls.append(model)
+        if model == FALLBACK_MODEL:
+            stub_settings.update(rate_limit_every=0)
+        return client.complete(model, "Olá")
+
+    result = scheduler.run([MODEL, FALLBACK_MODEL], call)
+
+    assert calls == [MODEL, FALLBACK_MODEL]
+    assert FALLBACK_MODEL in result
+    assert scheduler.get_stats()['failures'] == 1
+
+
+def test_scheduler_raises_when_deadline_expires(client, stub_settings):
+    stub_settings.update(latency=1.0)
+    scheduler = HedgedScheduler(hedge_delay=5, max_parallel=1)
+
+    with pytest.raises(DeadlineExceeded):
+        scheduler.run([MODEL], lambda model: client.complete(model, "Olá"), deadline=Deadline(0.3))
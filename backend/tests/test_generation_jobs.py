@@ -0,0 +1,65 @@
+"""
+Fila de geração assíncrona: encerramento da API com jobs ainda na fila
+"""
+
+import time
+
+import services.generation_job_service as generation_job_service
+from services.generation_job_service import COMPLETED, FAILED, GenerationJobService
+
+
+class FakeSession:
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class SlowAIService:
+    def __init__(self, db):
+        pass
+
+    def generate_response(self, email_content, category, analysis, deadline):
+        time.sleep(0.2)
+        return f"Resposta para {email_content}"
+
+
+class RecordingClassificationService:
+    saved = {}
+
+    def __init__(self, db):
+        pass
+
+    def update_suggested_response(self, classification_id, suggested_response):
+        self.saved[classification_id] = suggested_response
+
+
+def test_shutdown_finishes_running_job_and_fails_queued(monkeypatch):
+    monkeypatch.setattr(generation_job_service, "SessionLocal", FakeSession)
+    monkeypatch.setattr(generation_job_service, "AIService", SlowAIService)
+    monkeypatch.setattr(generation_job_service, "ClassificationService", RecordingClassificationService)
+    service = GenerationJobService(workers=1)
+
+    job_ids = [service.submit([number], f"email {number}", "Produtivo") for number in range(3)]
+    time.sleep(0.05)  # O primeiro job já está em execução
+    service.shutdown()
+
+    jobs = [service.get_job(job_id) for job_id in job_ids]
+    assert [job['status'] for job in jobs] == [COMPLETED, FAILED, FAILED]
+    assert jobs[0]['suggested_response'] == "Resposta para email 0"
+    assert all(job['finished_at'] for job in jobs)
+    assert service.get_stats()['in_flight'] == 0
+
+
+def test_submit_after_shutdown_starts_a_new_pool(monkeypatch):
+    monkeypatch.setattr(generation_job_service, "SessionLocal", FakeSession)
+    monkeypatch.setattr(generation_job_service, "AIService", SlowAIService)
+    monkeypatch.setattr(generation_job_service, "ClassificationService", RecordingClassificationService)
+    service = GenerationJobService(workers=1)
+    service.shutdown()
+
+    job_id = service.submit([1], "email", "Produtivo")
+    service.shutdown()
+
+    assert service.get_job(job_id)['status'] == COMPLETED
@@ -0,0 +1,41 @@
+"""
+Fila do histórico com write-behind: devolução do lote quando o banco está indisponível
+"""
+
+from services.historico_writer import HistoricoWriter
+
+
+def event(number: int) -> dict:
+    return {'email_id': number, 'classification_id': number, 'action_type': 'created',
+            'user_agent': None, 'ip_address': None, 'created_at': None}
+
+
+def unavailable_database(writer: HistoricoWriter, arriving: list):
+    """Simula o banco fora do ar; `arriving` chega à fila enquanto o lote está sendo gravado"""
+    def insert(rows):
+        writer._queue.extend(arriving)
+        raise ConnectionError("banco indisponível")
+    return insert
+
+
+def test_failed_batch_returns_to_the_front_of_the_queue():
+    writer = HistoricoWriter(batch_size=3, max_pending=10)
+    writer._queue.extend(event(number) for number in range(5))
+    writer._insert = unavailable_database(writer, [event(5)])
+
+    assert writer.flush() == 0
+    assert [row['email_id'] for row in writer._queue] == [0, 1, 2, 3, 4, 5]
+    assert writer.stats['errors'] == 1
+    assert writer.stats['dropped'] == 0
+
+
+def test_full_queue_keeps_new_events_and_counts_discarded():
+    writer = HistoricoWriter(batch_size=3, max_pending=5)
+    writer._queue.extend(event(number) for number in range(5))
+    # Dois eventos novos durante a tentativa: só há lugar para um dos três do lote
+    writer._insert = unavailable_database(writer, [event(5), event(6)])
+
+    writer.flush()
+
+    assert [row['email_id'] for row in writer._queue] == [2, 3, 4, 5, 6]
+    assert writer.stats['dropped'] == 2
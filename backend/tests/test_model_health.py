@@ -0,0 +1,46 @@
+"""
+Sondagem do circuito (half_open) em FreeAIService._call_model: liberada em qualquer erro
+"""
+
+import pytest
+
+import services.free_ai_service as free_ai_service
+from services.free_ai_service import FreeAIService
+from services.generation_client import GenerationError
+from services.model_health import HALF_OPEN, ModelHealthTracker
+
+MODEL = "stub/probe-model"
+
+
+class FailingRateLimiter:
+    def __init__(self, error: Exception):
+        self.error = error
+
+    def acquire(self, deadline=None):
+        raise self.error
+
+    def generation_config(self, slack):
+        return {'max_tokens': 64, 'temperature': 0.7}
+
+
+@pytest.fixture
+def tracker(monkeypatch):
+    """Modelo em half_open: só uma sondagem por vez"""
+    tracker = ModelHealthTracker()
+    health = tracker._health(MODEL)
+    health.set_state(HALF_OPEN, "teste")
+    monkeypatch.setattr(free_ai_service, "get_model_health_tracker", lambda: tracker)
+    return tracker
+
+
+@pytest.mark.parametrize("error, expected", [
+    (RuntimeError("falha inesperada"), RuntimeError),
+    (GenerationError("recusado antes da chamada", MODEL), GenerationError),
+])
+def test_error_before_the_call_frees_the_probe(monkeypatch, tracker, error, expected):
+    monkeypatch.setattr(free_ai_service, "get_rate_limiter", lambda: FailingRateLimiter(error))
+
+    with pytest.raises(expected):
+        FreeAIService()._call_model(None, MODEL, "Olá")
+
+    assert tracker._health(MODEL).probe_in_flight is False
@@ -0,0 +1,30 @@
+import re
+
+import pytest
+
+from services.pattern_engine import CompiledPatternEngine, _literal_prefix
+
+
+@pytest.mark.parametrize("pattern, prefix", [
+    ("pagamento de", "pagamento de"),
+    ("ab+c", "ab"),
+    ("colou?r", "colo"),
+    ("ab*c", "a"),
+    ("ab{0,2}c", "a"),
+    ("abc|xyz", ""),
+    ("a(b|c)d", "a"),
+    (r"\bboleto", ""),
+])
+def test_literal_prefix(pattern, prefix):
+    assert _literal_prefix(pattern) == prefix
+
+
+@pytest.mark.parametrize("pattern, text", [
+    ("colou?r", "qual a color do produto"),
+    ("ab*c", "codigo ac123"),
+    ("reembolso|estorno", "pedido de estorno"),
+])
+def test_scan_matches_re_search(pattern, text):
+    engine = CompiledPatternEngine({"ns": {"group": [pattern]}})
+    assert re.search(pattern, text, re.IGNORECASE)
+    assert engine.scan(text).has("ns", "group", 0)
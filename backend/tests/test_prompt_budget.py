@@ -0,0 +1,44 @@
+"""
+Limpeza do email antes do prompt: assinaturas
+"""
+
+from services.prompt_budget import strip_signature
+
+
+def test_closing_followed_by_name_is_removed():
+    text = "Bom dia,\nPreciso da segunda via do boleto.\nAtenciosamente,\nAna Souza\nGerente de Compras\nTel: (11) 4002-8922"
+
+    assert strip_signature(text) == "Bom dia,\nPreciso da segunda via do boleto.\nAtenciosamente,\nAna Souza"
+
+
+def test_delimiter_at_the_end_is_removed():
+    text = "Oi,\nSegue o comprovante do pagamento.\n--\nCarlos Lima\ncarlos@empresa.com.br"
+
+    assert strip_signature(text) == "Oi,\nSegue o comprovante do pagamento."
+
+
+def test_mobile_footer_is_removed():
+    text = "Pode confirmar o horário da reunião?\n\nEnviado do meu iPhone"
+
+    assert strip_signature(text) == "Pode confirmar o horário da reunião?"
+
+
+def test_closing_in_the_middle_keeps_the_rest():
+    text = "Oi,\nObrigado!\nAinda aguardo o reembolso do pedido 4432...\nPodem verificar hoje?\nAna"
+
+    result = strip_signature(text)
+
+    assert "Podem verificar hoje?" in result
+    assert result == text
+
+
+def test_delimiter_separating_items_is_kept():
+    text = "Bom dia\n\nSegue o relatório:\n--\nitem 1\nitem 2\nQual o prazo?"
+
+    assert strip_signature(text) == text
+
+
+def test_text_without_signature_is_unchanged():
+    text = "Olá, gostaria de saber o status do chamado 123."
+
+    assert strip_signature(text) == text
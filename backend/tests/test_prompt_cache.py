@@ -0,0 +1,63 @@
+"""
+Cache de prompts do processo: valores resolvidos antes de um descarte não voltam ao cache
+"""
+
+from services.hybrid_prompt_service import PromptCache
+
+
+class FakeQuery:
+    def __init__(self, rows, during_load=None):
+        self.rows = rows
+        self.during_load = during_load
+
+    def filter(self, *args):
+        return self
+
+    def order_by(self, *args):
+        return self
+
+    def scalar(self):
+        return 0
+
+    def all(self):
+        if self.during_load:
+            self.during_load()
+        return self.rows
+
+
+class FakeSession:
+    def __init__(self, rows, during_load=None):
+        self.rows = rows
+        self.during_load = during_load
+
+    def query(self, *args):
+        return FakeQuery(self.rows, self.during_load)
+
+
+def test_set_after_invalidate_is_discarded():
+    cache = PromptCache()
+    token = cache.token()
+
+    cache.invalidate()
+    cache.set("meetings_generation", "prompt antigo", token)
+
+    assert cache.get("meetings_generation") is None
+
+
+def test_set_with_current_token_is_kept():
+    cache = PromptCache()
+    cache.invalidate()
+
+    cache.set("meetings_generation", "prompt atual", cache.token())
+
+    assert cache.get("meetings_generation") == "prompt atual"
+
+
+def test_load_racing_invalidate_does_not_store_stale_prompts():
+    cache = PromptCache()
+    rows = [("response_generation", "productive", "prompt antigo")]
+
+    loaded = cache.load(FakeSession(rows, during_load=cache.invalidate))
+
+    assert loaded == {("response_generation", "productive"): "prompt antigo"}
+    assert cache.get_stats()['db_prompts'] is None
@@ -0,0 +1,57 @@
+"""
+Resposta em streaming (astream_response): só respostas completas entram no cache persistente
+"""
+
+import asyncio
+
+import pytest
+
+import services.free_ai_service as free_ai_service
+from services.free_ai_service import FreeAIService
+from services.generation_client import Deadline, GenerationClient
+
+EMAIL = "Podemos marcar a reunião do projeto para quinta-feira?"
+
+
+class NoCachedResponse:
+    def get(self, prompt_template, email_content):
+        return None
+
+
+@pytest.fixture
+def saved(monkeypatch, stub_url, stub_settings):
+    """Aponta a geração para o stub e registra as gravações no cache persistente"""
+    client = GenerationClient("stub", base_url=stub_url, connect_timeout=1, read_timeout=2)
+    calls = []
+    monkeypatch.setattr(free_ai_service, "get_generation_client", lambda: client)
+    monkeypatch.setattr(free_ai_service, "HUGGINGFACE_GENERATION_MODELS", ["stub/stream-model"])
+    monkeypatch.setattr(free_ai_service, "save_cached_response", lambda *args: calls.append(args))
+    return calls
+
+
+def stream(deadline: Deadline = None) -> str:
+    service = FreeAIService()
+    service.response_cache = NoCachedResponse()
+
+    async def collect():
+        return "".join([chunk async for chunk in service.astream_response(EMAIL, "Produtivo", "meetings", deadline)])
+
+    return asyncio.run(collect())
+
+
+def test_complete_stream_is_cached(saved):
+    text = stream()
+
+    assert text.startswith("Resposta gerada por stub/stream-model")
+    assert len(saved) == 1
+    assert saved[0][1] == EMAIL
+    assert saved[0][2] == text.strip()
+
+
+def test_partial_stream_is_not_cached(saved, stub_settings):
+    stub_settings.update(token_delay=0.1)
+
+    text = stream(Deadline(0.35))
+
+    assert text and not text.endswith("em breve.")
+    assert saved == []
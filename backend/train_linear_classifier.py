@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Treinamento offline do classificador linear (TF-IDF com hashing + regressão logística)
+
+Uso:
+  python train_linear_classifier.py                      # treina com as classificações do banco
+  python train_linear_classifier.py --input dados.jsonl  # treina com arquivo JSONL
+  python train_linear_classifier.py --label-with-rules --input emails.jsonl
+
+Cada linha do JSONL deve ter "content", "category" e opcionalmente "subcategory".
+Com --label-with-rules, os rótulos vêm do classificador por regras atual (apenas "content").
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+
+# Adiciona o diretório backend ao path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.linear_classifier import LINEAR_MODEL_PATH, DEFAULT_N_FEATURES, train_linear_classifier
+
+
+def load_from_database():
+    """Carrega emails já classificados (não excluídos) do banco de dados"""
+    from config.database import SessionLocal
+    from models.email import Email
+    from models.classification import Classification
+
+    db = SessionLocal()
+    try:
+        rows = db.query(
+            Email.content, Classification.category, Classification.subcategory
+        ).join(
+            Classification, Classification.email_id == Email.id
+        ).filter(
+            Email.is_deleted == False,
+            Classification.is_deleted == False
+        ).all()
+        return [(content, category, subcategory) for content, category, subcategory in rows]
+    finally:
+        db.close()
+
+
+def load_from_file(path: str, label_with_rules: bool):
+    """Carrega exemplos de um arquivo JSONL"""
+    if label_with_rules:
+        from services.free_ai_service import FreeAIService
+        classifier = FreeAIService()
+
+    examples = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if label_with_rules:
+                analysis = classifier.analyze_email(item['content'])
+                examples.append((item['content'], analysis.category, analysis.subcategory))
+            else:
+                examples.append((item['content'], item['category'], item.get('subcategory')))
+    return examples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Treina o classificador linear local")
+    parser.add_argument("--input", help="Arquivo JSONL de treino (padrão: banco de dados)")
+    parser.add_argument("--label-with-rules", action="store_true", help="Rotular --input com o classificador por regras")
+    parser.add_argument("--output", default=LINEAR_MODEL_PATH, help="Diretório do artefato")
+    parser.add_argument("--features", type=int, default=DEFAULT_N_FEATURES, help="Número de colunas do hashing")
+    parser.add_argument("--epochs", type=int, default=10)
+    parser.add_argument("--learning-rate", type=float, default=0.5)
+    parser.add_argument("--holdout", type=float, default=0.1, help="Fração reservada para validação")
+    args = parser.parse_args()
+
+    if args.input:
+        examples = load_from_file(args.input, args.label_with_rules)
+    else:
+        examples = load_from_database()
+
+    if len({category for _, category, _ in examples}) < 2:
+        print(" São necessários exemplos de pelo menos duas categorias para treinar")
+        return
+
+    random.Random(42).shuffle(examples)
+    holdout_size = int(len(examples) * args.holdout)
+    validation, training = examples[:holdout_size], examples[holdout_size:]
+    print(f"Treinando com {len(training)} exemplos ({len(validation)} para validação)...")
+
+    texts, categories, subcategories = zip(*training)
+    model = train_linear_classifier(
+        texts, categories, subcategories,
+        n_features=args.features, epochs=args.epochs, learning_rate=args.learning_rate
+    )
+
+    if validation:
+        predictions = model.predict_batch([content for content, _, _ in validation])
+        category_hits = sum(p['category'] == c for p, (_, c, _) in zip(predictions, validation))
+        labelled = [(p, s) for p, (_, _, s) in zip(predictions, validation) if s]
+        subcategory_hits = sum(p['subcategory'] == s for p, s in labelled)
+        print(f"Acurácia (categoria): {category_hits / len(validation):.3f}")
+        if labelled:
+            print(f"Acurácia (subcategoria): {subcategory_hits / len(labelled):.3f}")
+
+    model.save(args.output)
+    print(f"Modelo salvo em {args.output} (versão {model.version})")
+
+
+if __name__ == "__main__":
+    main()
@@ -19,6 +19,8 @@ export const HistorySection: React.FC = () => {
   const [emails, setEmails] = useState<HistoricoItem[]>([]);
   const [loading, setLoading] = useState<boolean>(true);
   const [selectedEmail, setSelectedEmail] = useState<HistoricoItem | null>(null);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState<boolean>(false);
 
   useEffect(() => {
     loadEmails();
@@ -26,8 +28,9 @@ export const HistorySection: React.FC = () => {
 
   const loadEmails = async (): Promise<void> => {
     try {
-      const data = await emailService.getHistorico();
-      setEmails(data);
+      const page = await emailService.getHistoricoPage();
+      setEmails(page.items);
+      setNextCursor(page.nextCursor);
     } catch (error) {
       console.error('Erro ao carregar histórico:', error);
     } finally {
@@ -35,6 +38,20 @@ export const HistorySection: React.FC = () => {
     }
   };
 
+  const loadMore = async (): Promise<void> => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const page = await emailService.getHistoricoPage(nextCursor);
+      setEmails((current) => [...current, ...page.items]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error('Erro ao carregar mais itens do histórico:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const formatDate = (dateString: string): string => {
     return new Date(dateString).toLocaleString('pt-BR');
   };
@@ -103,6 +120,16 @@ export const HistorySection: React.FC = () => {
                 </div>
               );
             })}
+
+            {nextCursor && (
+              <button
+                onClick={loadMore}
+                disabled={loadingMore}
+                className="w-full bg-white/10 hover:bg-white/20 disabled:opacity-50 text-white rounded-lg py-3 transition-colors"
+              >
+                {loadingMore ? 'Carregando...' : 'Carregar mais'}
+              </button>
+            )}
           </div>
         )}
       </div>
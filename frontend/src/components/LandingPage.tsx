@@ -51,6 +51,7 @@ interface ClassificationResult {
     created_at: string;
     updated_at: string;
   };
+  response_stream_url?: string | null;
 }
 
 const LandingPage: React.FC = () => {
@@ -71,6 +72,8 @@ const LandingPage: React.FC = () => {
   const [isLoading, setIsLoading] = useState<boolean>(false);
   
   const [isGeneratingNewResponse, setIsGeneratingNewResponse] = useState<boolean>(false);
+  // Estado da resposta sugerida chegando em streaming
+  const [isStreamingResponse, setIsStreamingResponse] = useState<boolean>(false);
   
   const [classificationResult, setClassificationResult] = useState<ClassificationResult | null>(null);
   
@@ -148,7 +151,8 @@ const LandingPage: React.FC = () => {
           content: emailContent,
           subject: emailSubject,
           sender: emailSender,
-          recipient: emailRecipient
+          recipient: emailRecipient,
+          streamResponse: true
         });
       } else {
         if (!selectedFile) {
@@ -160,12 +164,20 @@ const LandingPage: React.FC = () => {
         result = await emailService.uploadFileEmail(selectedFile, {
           subject: emailSubject,
           sender: emailSender,
-          recipient: emailRecipient
+          recipient: emailRecipient,
+          streamResponse: true
         });
       }
 
       setClassificationResult(result);
       
+      // Resposta sugerida chega em streaming enquanto os resultados já são exibidos
+      if (result.response_stream_url) {
+        streamSuggestedResponse(result.classification.id).catch((error) => {
+          console.error('Erro ao gerar resposta:', error);
+        });
+      }
+      
       // Scroll automático para os resultados após um pequeno delay
       setTimeout(() => {
         const resultsSection = document.getElementById('results-section');
@@ -193,29 +205,39 @@ const LandingPage: React.FC = () => {
   };
 
 
+  const streamSuggestedResponse = async (classificationId: number, regenerate: boolean = false): Promise<void> => {
+    const updateResponse = (update: (current: string) => string): void => {
+      setClassificationResult(prev => prev && prev.classification.id === classificationId ? {
+        ...prev,
+        classification: {
+          ...prev.classification,
+          suggested_response: update(prev.classification.suggested_response || '')
+        }
+      } : prev);
+    };
+
+    setIsStreamingResponse(true);
+    updateResponse(() => '');
+    try {
+      const fullResponse = await emailService.streamSuggestedResponse(
+        classificationId,
+        (text) => updateResponse(current => current + text),
+        regenerate
+      );
+      updateResponse(() => fullResponse);
+    } finally {
+      setIsStreamingResponse(false);
+    }
+  };
+
   const generateNewResponse = async (): Promise<void> => {
     if (!classificationResult) return;
     
     setIsGeneratingNewResponse(true);
     
     try {
-      // Fazer uma nova chamada para gerar resposta
-      const result = await emailService.uploadTextEmail({
-        content: classificationResult.email.content,
-        subject: classificationResult.email.subject || '',
-        sender: classificationResult.email.sender || '',
-        recipient: classificationResult.email.recipient || ''
-      });
-      
-      // Atualizar apenas a resposta sugerida
-      setClassificationResult(prev => prev ? {
-        ...prev,
-        classification: {
-          ...prev.classification,
-          suggested_response: result.classification.suggested_response
-        }
-      } : null);
-      
+      // Gerar nova resposta para a mesma classificação (substitui a gravada)
+      await streamSuggestedResponse(classificationResult.classification.id, true);
     } catch (error) {
       console.error('Erro ao gerar nova resposta:', error);
       alert('Erro ao gerar nova resposta. Tente novamente.');
@@ -731,17 +753,17 @@ const LandingPage: React.FC = () => {
                     </div>
 
                     {/* Suggested Response */}
-                    {classification.suggested_response && (
+                    {(classification.suggested_response || isStreamingResponse) && (
                       <div className="mb-8">
                         <div className="flex items-center justify-between mb-4">
                           <h3 className="text-xl font-bold text-white">Resposta Sugerida</h3>
                           <div className="flex items-center space-x-2">
                             <button
                               onClick={generateNewResponse}
-                              disabled={isGeneratingNewResponse}
+                              disabled={isGeneratingNewResponse || isStreamingResponse}
                               className="flex items-center space-x-2 px-3 py-1 bg-blue-600/20 hover:bg-blue-600/30 border border-blue-500/30 rounded-lg text-blue-400 text-sm transition-colors disabled:opacity-50 disabled:cursor-not-allowed"
                             >
-                              {isGeneratingNewResponse ? (
+                              {isGeneratingNewResponse || isStreamingResponse ? (
                                 <>
                                   <Loader2 className="h-4 w-4 animate-spin" />
                                   <span>Gerando...</span>
@@ -777,7 +799,9 @@ const LandingPage: React.FC = () => {
                         </div>
                         
                         <div className="bg-white/10 rounded-lg p-4">
-                          <p className="text-white whitespace-pre-wrap">{classification.suggested_response}</p>
+                          <p className="text-white whitespace-pre-wrap">
+                            {classification.suggested_response || (isStreamingResponse && 'Gerando resposta...')}
+                          </p>
                         </div>
                       </div>
                     )}
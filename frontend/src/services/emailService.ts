@@ -14,12 +14,14 @@ interface EmailData {
   subject?: string;
   sender?: string;
   recipient?: string;
+  streamResponse?: boolean;
 }
 
 interface EmailMetadata {
   subject?: string;
   sender?: string;
   recipient?: string;
+  streamResponse?: boolean;
 }
 
 interface ClassificationResult {
@@ -47,6 +49,7 @@ interface ClassificationResult {
     created_at: string;
     updated_at: string;
   };
+  response_stream_url?: string | null;
 }
 
 interface HistoricoItem {
@@ -62,6 +65,11 @@ interface HistoricoItem {
   created_at: string;
 }
 
+interface HistoricoPage {
+  items: HistoricoItem[];
+  nextCursor: string | null;
+}
+
 export const emailService = {
   async uploadTextEmail(emailData: EmailData): Promise<ClassificationResult> {
     const formData = new FormData();
@@ -69,6 +77,7 @@ export const emailService = {
     if (emailData.subject) formData.append('subject', emailData.subject);
     if (emailData.sender) formData.append('sender', emailData.sender);
     if (emailData.recipient) formData.append('recipient', emailData.recipient);
+    if (emailData.streamResponse) formData.append('stream_response', 'true');
 
     const response = await api.post('/emails/upload-text', formData, {
       headers: {
@@ -84,6 +93,7 @@ export const emailService = {
     if (metadata.subject) formData.append('subject', metadata.subject);
     if (metadata.sender) formData.append('sender', metadata.sender);
     if (metadata.recipient) formData.append('recipient', metadata.recipient);
+    if (metadata.streamResponse) formData.append('stream_response', 'true');
 
     const response = await api.post('/emails/upload-file', formData, {
       headers: {
@@ -93,6 +103,32 @@ export const emailService = {
     return response.data;
   },
 
+  // Recebe a resposta sugerida trecho a trecho (SSE); resolve com o texto completo já gravado
+  streamSuggestedResponse(
+    classificationId: number,
+    onToken: (text: string) => void,
+    regenerate: boolean = false
+  ): Promise<string> {
+    const url = `${API_BASE_URL}/emails/classifications/${classificationId}/response-stream`
+      + (regenerate ? '?regenerate=true' : '');
+
+    return new Promise((resolve, reject) => {
+      const source = new EventSource(url);
+      source.addEventListener('token', (event) => {
+        onToken(JSON.parse((event as MessageEvent).data).text);
+      });
+      source.addEventListener('done', (event) => {
+        source.close();
+        resolve(JSON.parse((event as MessageEvent).data).suggested_response);
+      });
+      source.addEventListener('error', (event) => {
+        source.close();
+        const data = (event as MessageEvent).data;
+        reject(new Error(data ? JSON.parse(data).detail : 'Conexão de streaming encerrada'));
+      });
+    });
+  },
+
   async getEmails(skip: number = 0, limit: number = 100): Promise<any[]> {
     const response = await api.get('/emails', {
       params: { skip, limit },
@@ -107,6 +143,17 @@ export const emailService = {
     return response.data;
   },
 
+  // Paginação por cursor: o cursor da próxima página vem no cabeçalho X-Next-Cursor
+  async getHistoricoPage(cursor: string | null = null, limit: number = 50): Promise<HistoricoPage> {
+    const response = await api.get('/historico', {
+      params: cursor ? { cursor, limit } : { limit },
+    });
+    return {
+      items: response.data,
+      nextCursor: response.headers['x-next-cursor'] ?? null,
+    };
+  },
+
   async getEmailWithClassification(emailId: number): Promise<ClassificationResult> {
     const response = await api.get(`/emails/${emailId}`);
     return response.data;